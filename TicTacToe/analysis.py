@@ -0,0 +1,106 @@
+"""Multi-PV analysis: the best few moves of a position, with scores, from one search
+
+    lines = analyze(game, state, n=3)                       # alpha-beta, game.timer seconds
+    lines = analyze(game, state, n=3, engine='mcts', seconds=1)
+    for line in lines:
+        print(line.move, line.score, line.pv, line.visits)
+
+For alpha-beta the root moves are searched as in alpha_beta_cutoff, except
+that alpha is the n-th best value found so far rather than the best, so the
+n best moves come out with exact scores and the search costs little more
+than finding one move. It is deepened until the time runs out, and every
+line gets its principal variation. score is the alpha_beta_cutoff value for
+the side to move and visits is None.
+
+For MCTS the lines are the root children with the most visits; score is the
+child's win rate in the tree's own scoring, from 0 to 1, and pv follows the
+most visited child down the tree."""
+
+import copy
+import math
+import sys
+import time
+from collections import namedtuple
+
+from games import EvalCache, SearchTimeout, alpha_beta_cutoff, cutoff_searchers
+from monteCarlo import MCTS
+from searchTrace import principal_variation
+
+Line = namedtuple('Line', 'move, score, pv, visits')
+
+
+def multipv_search(game, pos, n):
+    """alpha_beta_cutoff at depth game.d, keeping the n best root moves.
+    Return [(score, move)] best first, ties in root order; the first move is the
+    one alpha_beta_cutoff plays."""
+    _, min_value = cutoff_searchers(game, pos)
+    actions = list(game.moveOrder(pos) if game.moveOrder else game.actions(pos))
+    top = []  # (-score, root index, move)
+    for i, action in enumerate(actions):
+        alpha = -top[-1][0] if len(top) == n else -math.inf
+        pos.make(action)
+        value = min_value(pos, alpha, math.inf, game.d)
+        pos.unmake()
+        if len(top) < n or value > alpha:
+            top.append((-value, i, action))
+            top.sort()
+            del top[n:]
+    return [(-negative, move) for negative, _, move in top]
+
+
+def analyze(game, state, n=3, engine='alphabeta', seconds=None, depth=None):
+    """Return up to n Lines for state, best first, from one search.
+    seconds defaults to game.timer (1 when unlimited); depth, for alpha-beta,
+    searches that one depth instead of deepening. game itself is left untouched."""
+    game = copy.copy(game)
+    game.clock = game.stats = game.deadline = None
+    game.evalCache = EvalCache()  # analysis may run in a thread beside the game's own search
+    if seconds is None:
+        seconds = game.timer if game.timer > 0 else 1.0
+    if engine == 'mcts':
+        return analyze_mcts(game, state, n, seconds)
+    pos = game.position(state)
+    if not pos.moves:
+        return []
+    if depth is not None:
+        game.d = depth
+        found = multipv_search(game, pos, n)
+    else:
+        found = []
+        game.deadline = time.perf_counter() + seconds
+        game.d = 0
+        while game.d + 1 < game.maxDepth:
+            game.d += 1
+            ply = len(pos.history)
+            try:
+                found = multipv_search(game, pos, n)
+            except SearchTimeout:
+                pos.rewind(ply)
+                game.d -= 1
+                break
+            if game.d >= len(pos.moves):
+                break
+        game.deadline = None
+        if not found:
+            game.d = 0  # not even depth 1 finished in time: rank by a one-ply search
+            found = multipv_search(game, pos, n)
+    return [Line(move, score, principal_variation(game, pos, alpha_beta_cutoff, move, game.d)[0], None)
+            for score, move in found]
+
+
+def analyze_mcts(game, state, n, seconds):
+    search = MCTS(game, state)
+    search.monteCarloPlayer(seconds)
+    children = sorted(search.root.children, key=lambda nd: nd.visitCount, reverse=True)[:n]
+    lines = []
+    for child in children:
+        pv = [child.state.move]
+        node = child
+        while node.children:
+            node = max(node.children, key=lambda nd: nd.visitCount)
+            if node.visitCount == 0:
+                break
+            pv.append(node.state.move)
+        value = child.winScore / (child.visitCount * sys.maxsize) if child.visitCount else 0.0
+        lines.append(Line(child.state.move, (1 + max(-1.0, min(1.0, value))) / 2, pv, child.visitCount))
+    return lines
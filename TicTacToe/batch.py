@@ -0,0 +1,210 @@
+"""Batch analysis: many positions from a file, analysed over a process pool
+
+    python batch.py positions.txt --engine alphabeta --timer 0.5 --lines 3 \
+        --workers 4 --out results.jsonl
+    cat positions.txt | python batch.py - --engine mcts --timer 1
+
+Positions are read one per line, in either of two forms:
+
+    5:4 3,3 2,2 3,4             compact: size[:k] then the moves played,
+                                1-based x,y, X first; a bare move list is 3x3
+    {"to_move": "O", "x_positions": [[1, 1]], "o_positions": [], "h": 3, "v": 3, "k": 3}
+                                the keyword arguments of games.gen_state, as JSON
+
+k defaults to the board size. Blank lines and lines starting with # are
+skipped. Every position gets one JSON result line, written in input order:
+its input line number, the move and score the engine found, the principal
+variation and the seconds taken, with the top --lines moves when more than
+one is asked for. A position that cannot be parsed, or is already over,
+gets a record with "error" or "over" instead, and one for which the search
+found no move has "move": null.
+
+alphabeta and mcts go through analysis.analyze, so their results carry
+scores; the other single-process engines (random, minmax) only give a move.
+At most --window positions are in flight at a time, so memory stays bounded
+however long the input is; the throughput in positions/s goes to stderr
+at the end. MCTS is seeded per position from --seed, so a run can be
+repeated."""
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis import analyze
+from games import TicTacToe, gen_state
+from players import PLAYERS
+
+ENGINES = ('alphabeta', 'mcts', 'minmax', 'random')  # smp and ybw run their own pools
+
+
+def parse_position(text):
+    """Return (size, k, to_move, x_positions, o_positions, moves) for an input line;
+    moves is the order of play, or None when the input does not give one.
+    Raise ValueError if the line is not a position."""
+    text = text.strip()
+    if text.startswith('{'):
+        spec = json.loads(text)
+        size = spec.get('h', 3)
+        if spec.get('v', size) != size:
+            raise ValueError('the board must be square')
+        x_positions = [tuple(cell) for cell in spec.get('x_positions') or []]
+        o_positions = [tuple(cell) for cell in spec.get('o_positions') or []]
+        to_move = spec.get('to_move', 'X')
+        if to_move not in ('X', 'O'):
+            raise ValueError('to_move must be X or O')
+        k, moves = spec.get('k', size), None
+    else:
+        tokens = text.split()
+        size = k = 3
+        if tokens and ',' not in tokens[0]:
+            size, _, k = tokens.pop(0).partition(':')
+            size = int(size)
+            k = int(k) if k else size
+        moves = [tuple(int(v) for v in token.split(',')) for token in tokens]
+        x_positions, o_positions = moves[0::2], moves[1::2]
+        to_move = 'X' if len(moves) % 2 == 0 else 'O'
+    cells = x_positions + o_positions
+    if any(len(cell) != 2 for cell in cells):
+        raise ValueError('cells are x,y pairs')
+    if len(set(cells)) != len(cells):
+        raise ValueError('a cell is taken twice')
+    if any(not (1 <= x <= size and 1 <= y <= size) for x, y in cells):
+        raise ValueError('a cell is off the {0}x{0} board'.format(size))
+    return size, k, to_move, x_positions, o_positions, moves
+
+
+def read_positions(lines):
+    """Yield (line number, text) for the position lines of an iterable of lines."""
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if text and not text.startswith('#'):
+            yield number, text
+
+
+# ______________________________________________________________________________
+# Worker side
+
+_games = {}
+
+
+def build_state(game, to_move, x_positions, o_positions, moves):
+    """Return the GameState, replaying moves when they are known so that a
+    finished game is recognised; otherwise the stones are checked for a line."""
+    if moves is not None:
+        state = game.initial
+        for move in moves:
+            if game.terminal_test(state):
+                raise ValueError('moves after the end of the game')
+            state = game.result(state, move)
+        return state
+    state = gen_state(None, to_move, x_positions, o_positions, game.size, game.size)
+    for player, stones in (('X', x_positions), ('O', o_positions)):
+        for stone in stones:
+            utility = game.compute_utility(state.board, stone, player)
+            if utility:
+                return state._replace(utility=utility)
+    return state
+
+
+def analyze_one(job):
+    """Run in a worker: analyse one position and return its result record."""
+    number, text, engine, seconds, depth, lines, seed = job
+    record = {'line': number, 'input': text}
+    try:
+        size, k, to_move, x_positions, o_positions, moves = parse_position(text)
+        if (size, k) not in _games:
+            _games[(size, k)] = TicTacToe(size, k)
+        game = _games[(size, k)]
+        state = build_state(game, to_move, x_positions, o_positions, moves)
+    except (ValueError, TypeError) as e:
+        record['error'] = str(e)
+        return record
+    record.update(size=size, k=game.k, to_move=state.to_move)
+    if game.terminal_test(state):
+        record.update(over=True, utility=state.utility)
+        return record
+    random.seed(seed * 1000003 + number)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine in ('alphabeta', 'mcts'):
+            found = analyze(game, state, lines, engine, seconds, depth)
+            if found:
+                record.update(move=found[0].move, score=found[0].score, pv=found[0].pv)
+            else:
+                record.update(move=None, score=None, pv=[])  # e.g. MCTS out of time before its first playout
+            if lines > 1:
+                record['lines'] = [line._asdict() for line in found]
+        else:
+            game.timer = seconds
+            game.d = -1 if depth is None else depth
+            record['move'] = PLAYERS[engine](game, state)
+            game.d = -1
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+# ______________________________________________________________________________
+# Driver
+
+def analyze_batch(positions, engine='alphabeta', seconds=1.0, depth=None, lines=1,
+                  workers=None, window=None, seed=0):
+    """Yield one result record per (line number, text) in positions, in input order.
+    positions is consumed lazily: at most window (default 4 per worker) are in flight."""
+    workers = max(1, workers or os.cpu_count() or 1)
+    window = max(1, window or 4 * workers)
+    pool = ProcessPoolExecutor(workers)
+    pending = collections.deque()
+    try:
+        for number, text in positions:
+            pending.append(pool.submit(analyze_one, (number, text, engine, seconds, depth, lines, seed)))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse a file of positions over a process pool.')
+    parser.add_argument('positions', help='input file, one position per line; - for stdin')
+    parser.add_argument('--engine', default='alphabeta', choices=ENGINES)
+    parser.add_argument('--timer', type=float, default=1.0, help='seconds per position')
+    parser.add_argument('--depth', type=int, default=None, help='fixed alpha-beta depth instead of the timer')
+    parser.add_argument('--lines', type=int, default=1, help='best moves to report per position')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core)')
+    parser.add_argument('--window', type=int, default=None, help='positions in flight (default: 4 per worker)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='-', help='JSONL file for the results; - for stdout')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.positions == '-' else open(args.positions)
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    count = errors = 0
+    start = time.perf_counter()
+    try:
+        for record in analyze_batch(read_positions(source), args.engine, args.timer, args.depth,
+                                    args.lines, args.workers, args.window, args.seed):
+            out.write(json.dumps(record) + '\n')
+            count += 1
+            errors += 'error' in record
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print('{} positions in {:.2f}s ({:.1f} positions/s), {} errors'.format(
+        count, elapsed, count / elapsed if elapsed else 0.0, errors), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
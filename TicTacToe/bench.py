@@ -0,0 +1,356 @@
+"""Benchmark suite: searchers and game primitives on fixed positions, 3x3 to 9x9
+
+    python bench.py                          # everything, printed as a table
+    python bench.py --sizes 3 4 5 --only alpha_beta mcts
+    python bench.py --save baseline.json     # record a baseline
+    python bench.py --compare baseline.json  # speedups against it
+    python bench.py --queues 1000 10000      # utils priority queue micro-benchmarks
+    python bench.py --imports                # cold-start import times
+
+Positions come from a seeded generator, so every run searches the same set:
+per size, a few middle-game positions (a third of the board filled) and a few
+endgame positions with only a handful of empty cells left, none of them won.
+The cases are
+
+    minmax, alpha_beta          full-width search on the endgame positions
+    alpha_beta_cutoff d=N       fixed cutoff depth, eval1 at the leaves
+    mcts n=N                    N playouts per move
+    result, compute_utility,    the primitives, over every move of
+    eval1                       every middle-game position
+
+The whole suite takes a few minutes; --sizes and --only pick a subset.
+Each case is repeated --repeat times, MCTS with the same playout seed. The
+report gives the time per move (per call for the primitives) of the fastest
+repetition, nodes per second (playouts for MCTS, calls for the primitives),
+the coefficient of variation of the repetition times, and the peak memory
+allocated during one extra run under tracemalloc.
+--compare marks cases more than --tolerance slower than the baseline and
+exits with status 1 if there are any.
+
+--queues times utils.PriorityQueue against utils.IndexedPriorityQueue on
+queues of the given lengths, per operation: push and pop every item, then
+membership tests, priority changes (delete and re-append for
+PriorityQueue, update for the indexed one) and deletions on a full queue.
+
+--imports times cold starts in fresh interpreters: the engine (protocol.py),
+a search worker (games and players, what a pool process needs) and the GUI
+module's imports. It reports the import time, the whole process time and
+whether NumPy, Tk or multiprocessing were loaded; --save and --compare
+work on these results too."""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from games import GameState, SearchPosition, TicTacToe, alpha_beta, alpha_beta_cutoff, minmax
+from monteCarlo import MCTS
+from utils import IndexedPriorityQueue, PriorityQueue
+
+SIZES = (3, 4, 5, 6, 7, 8, 9)
+K = {3: 3, 4: 3, 5: 4, 6: 4, 7: 5, 8: 5, 9: 5}  # stones in a row to win, per board size
+ENDGAME_EMPTY = {'minmax': 8, 'alpha_beta': 10}  # empty cells left in the full-search positions
+IMPORTS = {  # cold-start targets for --imports
+    'engine': 'import protocol',
+    'worker': 'import games, players',
+    'gui': 'import runpy; runpy.run_path("tic-tac-toe.py", run_name="gui")',
+}
+HEAVY = ('numpy', 'tkinter', 'multiprocessing')
+
+
+def make_positions(game, stones, count, seed):
+    """Return count GameStates with the given number of stones, none of them won.
+    Stones go on the cells of a seeded shuffle, skipping moves that would win."""
+    rng = random.Random(seed)
+    states = []
+    for _ in range(count):
+        pos = SearchPosition(game, game.initial)
+        cells = list(game.initial.moves)
+        rng.shuffle(cells)
+        for cell in cells:
+            if len(pos.board) == stones:
+                break
+            pos.make(cell)
+            if pos.utility != 0:
+                pos.unmake()
+        if len(pos.board) == stones:
+            states.append(GameState(to_move=pos.to_move, move=pos.move, utility=0,
+                                    board=dict(pos.board), moves=list(pos.moves)))
+    return states
+
+
+class Case:
+    """One benchmark: run() searches or evaluates every position once and
+    returns (nodes, moves)."""
+
+    def __init__(self, name, game, states, run):
+        self.name = name
+        self.game = game
+        self.states = states
+        self.run = run
+
+    @property
+    def key(self):
+        return '{} @{}x{}k{}'.format(self.name, self.game.size, self.game.size, self.game.k)
+
+
+def search_case(name, game, states, search, depth=-1):
+    def run():
+        game.d = depth
+        game.deadline = None
+        game.evalCache.clear()  # every repetition starts cold
+        nodes = 0
+        for state in states:
+            pos = game.position(state)
+            search(game, pos)
+            nodes += pos.nodes
+        return nodes, len(states)
+    return Case(name, game, states, run)
+
+
+def mcts_case(game, states, iterations, seed):
+    def run():
+        random.seed(seed)
+        for state in states:
+            MCTS(game, state).monteCarloPlayer(math.inf, iterations=iterations)
+        return iterations * len(states), len(states)
+    return Case('mcts n={}'.format(iterations), game, states, run)
+
+
+def primitive_cases(game, states):
+    """Cases for result, compute_utility and eval1, with their inputs built up front."""
+    pairs = [(state, move) for state in states for move in state.moves]
+    placed = []
+    for state, move in pairs:
+        board = dict(state.board)
+        board[move] = state.to_move
+        placed.append((board, move, state.to_move))
+    children = [game.result(state, move) for state, move in pairs]
+
+    def result():
+        for state, move in pairs:
+            game.result(state, move)
+        return len(pairs), len(pairs)
+
+    def compute_utility():
+        for board, move, player in placed:
+            game.compute_utility(board, move, player)
+        return len(placed), len(placed)
+
+    def eval1():
+        for child in children:
+            game.eval1(child)
+        return len(children), len(children)
+
+    return [Case('result', game, states, result), Case('compute_utility', game, states, compute_utility),
+            Case('eval1', game, states, eval1)]
+
+
+def build_cases(sizes, depths, iterations, count, seed):
+    cases = []
+    for size in sizes:
+        game = TicTacToe(size, K.get(size, min(size, 5)))
+        middle = make_positions(game, max(2, size * size // 3), count, seed + size)
+        cases += primitive_cases(game, middle)
+        for name, search in (('minmax', minmax), ('alpha_beta', alpha_beta)):
+            stones = size * size - ENDGAME_EMPTY[name]
+            endgame = make_positions(game, max(0, stones), count, seed + size)
+            if endgame:
+                cases.append(search_case(name, game, endgame, search))
+        for depth in depths:
+            cases.append(search_case('alpha_beta_cutoff d={}'.format(depth), game, middle, alpha_beta_cutoff, depth))
+        for n in iterations:
+            cases.append(mcts_case(game, middle, n, seed))
+    return cases
+
+
+def measure(case, repeat):
+    """Time case.run() repeat times, then once more under tracemalloc for the peak memory."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        nodes, moves = case.run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    case.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best, mean = min(times), statistics.fmean(times)
+    return {'nodes': nodes, 'moves': moves, 'seconds': best, 'meanSeconds': mean,
+            'timePerMove': best / moves if moves else 0.0,
+            'nodesPerSec': nodes / best if best else 0.0,
+            'cv': statistics.pstdev(times) / mean if mean else 0.0,
+            'peakBytes': peak}
+
+
+def queue_benchmarks(lengths, repeat, seed, out=sys.stdout):
+    """Time the operations of both priority queues on queues of each length; per-operation times."""
+    print('{:<24} {:>8} {:>14} {:>14} {:>8}'.format('queue operation', 'n', 'PriorityQueue', 'indexed', 'speedup'),
+          file=out)
+    for n in lengths:
+        rng = random.Random(seed + n)
+        priority = {item: rng.random() for item in range(n)}
+        probes = rng.sample(range(n), min(n, 500))  # the O(n) operations of PriorityQueue get a sample
+
+        def push_pop(queue):
+            queue.extend(priority)
+            while queue:
+                queue.pop()
+            return 2 * n
+
+        def contains(queue):
+            for item in probes:
+                item in queue
+            return len(probes)
+
+        def change(queue):
+            for item in probes:
+                priority[item] /= 2
+                if isinstance(queue, IndexedPriorityQueue):
+                    queue.update(item)
+                else:
+                    del queue[item]
+                    queue.append(item)
+            return len(probes)
+
+        def delete(queue):
+            for item in probes:
+                del queue[item]
+            return len(probes)
+
+        for name, op, full in (('push+pop', push_pop, False), ('contains', contains, True),
+                               ('change priority', change, True), ('delete', delete, True)):
+            times = []
+            for cls in (PriorityQueue, IndexedPriorityQueue):
+                best = math.inf
+                for _ in range(repeat):
+                    queue = cls('min', priority.__getitem__)
+                    if full:
+                        queue.extend(priority)
+                    start = time.perf_counter()
+                    ops = op(queue)
+                    best = min(best, (time.perf_counter() - start) / ops)
+                times.append(best)
+            print('{:<24} {:>8} {:>14} {:>14} {:>7.1f}x'.format(
+                name, n, format_time(times[0]), format_time(times[1]), times[0] / times[1]), file=out)
+
+
+def import_benchmarks(repeat, out=sys.stdout):
+    """Time each IMPORTS target in fresh interpreters; return results keyed like the search cases."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = ('import sys, time, json; start = time.perf_counter(); {}; '
+             'print(json.dumps([time.perf_counter() - start, len(sys.modules), [m for m in {!r} if m in sys.modules]]))')
+    results = {}
+    print('{:<14} {:>12} {:>12} {:>8}  {}'.format('cold start', 'import', 'process', 'modules', 'loaded'), file=out)
+    for name, statement in IMPORTS.items():
+        times, walls = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            done = subprocess.run([sys.executable, '-c', probe.format(statement, HEAVY)], cwd=here,
+                                  capture_output=True, text=True)
+            walls.append(time.perf_counter() - start)
+            if done.returncode != 0:
+                break
+            seconds, modules, loaded = json.loads(done.stdout.strip().splitlines()[-1])
+            times.append(seconds)
+        if not times:
+            print('{:<14} failed: {}'.format(name, done.stderr.strip().splitlines()[-1]), file=out)
+            continue
+        best = min(times)
+        results['import {}'.format(name)] = {'seconds': best, 'timePerMove': best, 'processSeconds': min(walls),
+                                             'modules': modules, 'loaded': loaded}
+        print('{:<14} {:>12} {:>12} {:>8}  {}'.format(name, format_time(best), format_time(min(walls)), modules,
+                                                    ', '.join(loaded) or '-'), file=out)
+    return results
+
+
+def format_time(seconds):
+    if seconds >= 1:
+        return '{:.3f} s'.format(seconds)
+    if seconds >= 1e-3:
+        return '{:.3f} ms'.format(seconds * 1e3)
+    return '{:.3f} us'.format(seconds * 1e6)
+
+
+def compare(results, baseline, tolerance, out=sys.stdout):
+    """Print the speedup of every case also in baseline; return the keys that got slower."""
+    slower = []
+    print('\n{:<34} {:>12} {:>12} {:>8}'.format('against baseline', 'before', 'now', 'speedup'), file=out)
+    for key, now in results.items():
+        before = baseline.get(key)
+        if before is None or not now['timePerMove']:
+            continue
+        speedup = before['timePerMove'] / now['timePerMove']
+        flag = ''
+        if speedup < 1 - tolerance:
+            flag = '  SLOWER'
+            slower.append(key)
+        print('{:<34} {:>12} {:>12} {:>7.2f}x{}'.format(key, format_time(before['timePerMove']),
+                                                       format_time(now['timePerMove']), speedup, flag), file=out)
+    return slower
+
+
+def run_cases(args):
+    cases = build_cases(args.sizes, args.depths, args.iterations, args.positions, args.seed)
+    if args.only:
+        cases = [c for c in cases if any(c.name.startswith(prefix) for prefix in args.only)]
+
+    results = {}
+    print('{:<34} {:>8} {:>12} {:>14} {:>7} {:>11}'.format('case', 'moves', 'time/move', 'nodes/s', 'cv', 'peak'))
+    for case in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = measure(case, args.repeat)
+        results[case.key] = r
+        print('{:<34} {:>8} {:>12} {:>14,.0f} {:>6.1%} {:>8.1f} KiB'.format(
+            case.key, r['moves'], format_time(r['timePerMove']), r['nodesPerSec'], r['cv'], r['peakBytes'] / 1024),
+            flush=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the searchers and game primitives.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--depths', nargs='+', type=int, default=[1, 2], help='alpha_beta_cutoff depths')
+    parser.add_argument('--iterations', nargs='+', type=int, default=[100, 400], help='MCTS playouts per move')
+    parser.add_argument('--positions', type=int, default=2, help='positions per size and set')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='run the cases whose name starts with one of these')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown allowed against the baseline')
+    parser.add_argument('--queues', nargs='+', type=int, help='run the priority queue benchmarks at these lengths')
+    parser.add_argument('--imports', action='store_true', help='run the cold-start import benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.queues:
+        queue_benchmarks(args.queues, args.repeat, args.seed)
+        return 0
+    if args.imports:
+        results = import_benchmarks(args.repeat)
+    else:
+        results = run_cases(args)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'repeat': args.repeat, 'seed': args.seed, 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
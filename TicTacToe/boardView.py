@@ -0,0 +1,124 @@
+"""Board widgets for the Tk GUI: a grid of Buttons, or a single Canvas for large boards
+
+Both views show cell (x, y) with x = 1 on the bottom row and y = 1 on the
+left, call onCell(x, y) when a free cell is clicked, and offer the same
+mark/clear/reset/disable/enable methods to tic-tac-toe.py, plus
+hint/clear_hints for the hint overlay."""
+
+from tkinter import BOTTOM, LEFT, Button, Canvas, Frame
+
+
+class ButtonBoard:
+    """One Tk Button per cell, packed in a Frame per row."""
+
+    def __init__(self, root, size, onCell):
+        self.size = size
+        self.frames = []
+        self.buttons = {}
+        self.hints = set()
+        for x in range(1, size + 1):
+            frame = Frame(root)
+            for y in range(1, size + 1):
+                button = Button(frame, bg="yellow", height=1, width=2, text=" ", padx=2, pady=2,
+                                command=lambda x=x, y=y: onCell(x, y))
+                button.pack(side=LEFT)
+                self.buttons[(x, y)] = button
+            frame.pack(side=BOTTOM)  # row x = 1 ends up at the bottom
+            self.frames.append(frame)
+
+    def mark(self, x, y, sym, color):
+        self.buttons[(x, y)].config(text=sym, state='disabled', disabledforeground=color)
+
+    def clear(self, x, y):
+        self.buttons[(x, y)].config(text=" ", state='normal')
+
+    def reset(self):
+        self.hints = set()
+        for button in self.buttons.values():
+            button.config(text=" ", state='normal', fg="black")
+
+    def disable(self):
+        self.clear_hints()
+        for button in self.buttons.values():
+            button.config(state='disabled')
+
+    def hint(self, x, y, text):
+        """Show text in gray on the free cell (x, y)."""
+        self.hints.add((x, y))
+        self.buttons[(x, y)].config(text=text, fg="gray")
+
+    def clear_hints(self):
+        for cell in self.hints:
+            self.buttons[cell].config(text=" ", fg="black")
+        self.hints = set()
+
+    def enable(self):
+        """Re-enable the free cells after disable()."""
+        for button in self.buttons.values():
+            if button['text'] == " ":
+                button.config(state='normal')
+
+
+class CanvasBoard:
+    """All cells drawn on one Canvas. A click maps to its cell with two divisions,
+    and only the cells that changed are redrawn, so large boards stay fast."""
+
+    def __init__(self, root, size, onCell, cell=None):
+        self.size = size
+        self.cell = cell or max(16, min(40, 760 // size))
+        self.onCell = onCell
+        self.marks = {}  # (x, y) -> canvas text item of the cells showing a mark
+        self.enabled = True
+        side = self.cell * size
+        self.canvas = Canvas(root, width=side, height=side, bg="yellow", highlightthickness=0)
+        for i in range(size + 1):
+            self.canvas.create_line(0, i * self.cell, side, i * self.cell)
+            self.canvas.create_line(i * self.cell, 0, i * self.cell, side)
+        self.canvas.bind('<Button-1>', self.clicked)
+        self.canvas.pack(side=BOTTOM)
+
+    def cell_at(self, px, py):
+        """Return the (x, y) cell under canvas pixel (px, py), or None outside the board."""
+        row, col = int(py) // self.cell, int(px) // self.cell
+        if 0 <= row < self.size and 0 <= col < self.size:
+            return self.size - row, col + 1
+        return None
+
+    def clicked(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if self.enabled and cell is not None and cell not in self.marks:
+            self.onCell(*cell)
+
+    def mark(self, x, y, sym, color):
+        if (x, y) in self.marks:
+            self.canvas.delete(self.marks[(x, y)])
+        cx = (y - 0.5) * self.cell
+        cy = (self.size - x + 0.5) * self.cell
+        self.marks[(x, y)] = self.canvas.create_text(cx, cy, text=sym, fill=color,
+                                                     font=('Helvetica', max(8, self.cell // 2), 'bold'))
+
+    def clear(self, x, y):
+        if (x, y) in self.marks:
+            self.canvas.delete(self.marks.pop((x, y)))
+
+    def reset(self):
+        for item in self.marks.values():
+            self.canvas.delete(item)
+        self.marks = {}
+        self.clear_hints()
+        self.enabled = True
+
+    def disable(self):
+        self.clear_hints()
+        self.enabled = False
+
+    def hint(self, x, y, text):
+        """Show text in gray on the free cell (x, y)."""
+        self.canvas.create_text((y - 0.5) * self.cell, (self.size - x + 0.5) * self.cell, text=text,
+                                fill="gray", font=('Helvetica', max(7, self.cell // 3)), tags='hint')
+
+    def clear_hints(self):
+        self.canvas.delete('hint')
+
+    def enable(self):
+        self.enabled = True
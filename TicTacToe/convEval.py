@@ -0,0 +1,138 @@
+"""Vectorized threat evaluation for large boards, using NumPy sliding windows"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class ConvEvaluator:
+    """Evaluate a TicTacToe state with array operations instead of k_in_row.
+
+    X and O occupancy are kept as (size, size) arrays indexed [x-1, y-1].
+    Every window of k cells in the four directions is summed at once, and a
+    window is open for a player if the opponent has no stone in it. The
+    evaluation counts open windows holding k-1 and k-2 stones; cell_scores()
+    spreads all open windows back onto the cells they cover, which gives a
+    score for every empty cell in one pass.
+
+    An instance is callable like eval1, so it can be used as game.evaluator
+    for alpha_beta_cutoff, and as game.moveOrder through ordered_moves()."""
+
+    def __init__(self, game, weights=None):
+        self.game = game
+        self.givenWeights = weights
+        self.size = self.k = None
+        self.fit()
+
+    def fit(self):
+        """Set up for the game's current size and k. Every entry point calls it, so the
+        evaluator follows a change of game.k between games."""
+        game = self.game
+        if (game.size, game.k) == (self.size, self.k):
+            return
+        self.size = game.size
+        self.k = k = game.k
+        # weights[m] is the value of an open window with m stones in it
+        weights = self.givenWeights
+        if weights is None:
+            weights = np.zeros(k + 1)
+            weights[k - 1] = 10
+            if k >= 2:
+                weights[k - 2] += 1
+        self.weights = np.asarray(weights, dtype=float)
+        if len(self.weights) != k + 1:
+            raise ValueError('weights must have k + 1 entries')
+        self.orderWeights = 4.0 ** np.arange(k + 1)
+
+    def occupancy(self, board):
+        """Return the X and O occupancy arrays for a board dict."""
+        xs = np.zeros((self.size, self.size), dtype=np.int8)
+        os_ = np.zeros((self.size, self.size), dtype=np.int8)
+        if board:
+            cells = np.array(list(board.keys())) - 1
+            isX = np.array([p == 'X' for p in board.values()])
+            xs[cells[isX, 0], cells[isX, 1]] = 1
+            os_[cells[~isX, 0], cells[~isX, 1]] = 1
+        return xs, os_
+
+    def windows(self, a):
+        """Return the stone counts of every k-window of a, one array per direction:
+        along y, along x, along the diagonal and along the anti-diagonal."""
+        k = self.k
+        if k > self.size:
+            empty = np.zeros((0, 0), dtype=np.int64)
+            return empty, empty, empty, empty
+        boxes = sliding_window_view(a, (k, k))
+        flipped = sliding_window_view(a[:, ::-1], (k, k))
+        return (sliding_window_view(a, k, axis=1).sum(axis=-1),
+                sliding_window_view(a, k, axis=0).sum(axis=-1),
+                np.einsum('ijkk->ij', boxes),
+                np.einsum('ijkk->ij', flipped))
+
+    def counts(self, state):
+        """Return, for X and for O, how many open windows hold m stones, for m in 0..k."""
+        self.fit()
+        xs, os_ = self.occupancy(state.board)
+        xCount = np.zeros(self.k + 1, dtype=np.int64)
+        oCount = np.zeros(self.k + 1, dtype=np.int64)
+        for xw, ow in zip(self.windows(xs), self.windows(os_)):
+            xCount += np.bincount(xw[ow == 0], minlength=self.k + 1)
+            oCount += np.bincount(ow[xw == 0], minlength=self.k + 1)
+        return xCount, oCount
+
+    def __call__(self, state):
+        """Score state for the side to move, with the same conventions as eval1."""
+        self.fit()
+        if state.utility == self.k:
+            return float('inf') if state.to_move == 'X' else float('-inf')
+        elif state.utility == -self.k:
+            return float('-inf') if state.to_move == 'X' else float('inf')
+        xCount, oCount = self.counts(state)
+        score = float(self.weights @ (xCount - oCount))
+        return score if state.to_move == 'X' else -score
+
+    def cell_scores(self, state):
+        """Return a (size, size) array scoring every cell by the open windows through it,
+        for both players. Occupied cells score -inf."""
+        self.fit()
+        k, size = self.k, self.size
+        xs, os_ = self.occupancy(state.board)
+        scores = np.zeros((size, size))
+        if k > size:
+            return np.where(xs + os_ > 0, -np.inf, scores)
+        w = self.orderWeights
+        row, col, diag, anti = [np.where(ow == 0, w[xw], 0) + np.where(xw == 0, w[ow], 0)
+                                for xw, ow in zip(self.windows(xs), self.windows(os_))]
+        span = size - k + 1
+        flipped = np.zeros((size, size))
+        for t in range(k):
+            scores[:, t:t + span] += row
+            scores[t:t + span, :] += col
+            scores[t:t + span, t:t + span] += diag
+            flipped[t:t + span, t:t + span] += anti
+        scores += flipped[:, ::-1]
+        scores[(xs + os_) > 0] = -np.inf
+        return scores
+
+    def move_scores(self, state, moves):
+        """Return the cell scores of the given empty cells as a 1-D array."""
+        idx = np.array(moves) - 1
+        return self.cell_scores(state)[idx[:, 0], idx[:, 1]]
+
+    def ordered_moves(self, state):
+        """Return state.moves sorted from the most to the least promising cell."""
+        moves = list(state.moves)
+        if not moves:
+            return moves
+        order = np.argsort(-self.move_scores(state, moves), kind='stable')
+        return [moves[i] for i in order]
+
+    def priors(self, state):
+        """Return a {move: probability} dict proportional to the cell scores."""
+        moves = list(state.moves)
+        if not moves:
+            return {}
+        values = self.move_scores(state, moves)
+        total = values.sum()
+        if total <= 0:
+            return {m: 1 / len(moves) for m in moves}
+        return dict(zip(moves, (values / total).tolist()))
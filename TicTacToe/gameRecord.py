@@ -0,0 +1,253 @@
+"""Compact binary game records, written as a stream and read through mmap
+
+    with RecordWriter('games.ttr') as out:
+        out.write(game.size, game.k, moves, winner, scores=None, times=None)
+    with RecordReader('games.ttr') as records:
+        print(len(records), records[123].moves)
+        for size, k, winner, plies in records.headers():
+            ...
+    python gameRecord.py games.ttr [--show N]
+
+A file starts with the magic bytes TTTR and a version byte, followed by one
+record per game:
+
+    varint      length of the rest of the record
+    byte        board size
+    byte        k
+    byte        flags: winner in bits 0-1 (0 draw, 1 X, 2 O),
+                bit 2 scores present, bit 3 times present
+    varint      number of moves n
+    n varints   the moves, as cell numbers (x - 1) * size + (y - 1); one
+                byte each up to 11x11
+    n float32   per-move scores, little-endian, NaN for none (bit 2)
+    n varints   per-move times in microseconds (bit 3)
+
+Games always start from the empty board, X first. The writer also keeps
+path + '.idx', the 64-bit offset of every record, so the reader can go to
+game number n directly; an index that is missing or does not match the
+file is rebuilt by skipping through the length prefixes. Iterating decodes
+one game at a time from the mapped file, and headers() reads only the
+fixed fields, so millions of games can be scanned in bounded memory."""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+MAGIC = b'TTTR\x01'
+WINNERS = (None, 'X', 'O')  # winner code -> winner; None is a draw
+SCORES, TIMES = 4, 8  # flag bits
+
+GameRecord = namedtuple('GameRecord', 'size, k, winner, moves, scores, times')
+
+
+def put_varint(out, n):
+    """Append the unsigned LEB128 encoding of n to the bytearray out."""
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def get_varint(buf, i):
+    """Decode the varint at buf[i]; return (value, index after it)."""
+    n = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def encode(size, k, moves, winner=None, scores=None, times=None):
+    """Return the bytes of one record, its length prefix included."""
+    flags = WINNERS.index(winner)
+    body = bytearray((size, k, 0))
+    put_varint(body, len(moves))
+    for x, y in moves:
+        put_varint(body, (x - 1) * size + y - 1)
+    if scores is not None:
+        flags |= SCORES
+        body += struct.pack('<{}f'.format(len(moves)), *(math.nan if s is None else s for s in scores))
+    if times is not None:
+        flags |= TIMES
+        for seconds in times:
+            put_varint(body, max(0, round(seconds * 1e6)))
+    body[2] = flags
+    record = bytearray()
+    put_varint(record, len(body))
+    return bytes(record + body)
+
+
+def scan_offsets(buf, start=len(MAGIC)):
+    """Return array('Q') of the record offsets in buf, following the length prefixes."""
+    offsets = array('Q')
+    i, end = start, len(buf)
+    while i < end:
+        offsets.append(i)
+        length, j = get_varint(buf, i)
+        i = j + length
+    return offsets
+
+
+class RecordWriter:
+    """Write game records to path as they come, with the offset index in path + '.idx'.
+    append=True continues an existing file."""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        if append and os.path.exists(path):
+            with RecordReader(path) as existing:  # checks the file, and rebuilds a stale index
+                self.count = len(existing)
+            self.file = open(path, 'ab')
+            self.index = open(path + '.idx', 'ab')
+        else:
+            self.count = 0
+            self.file = open(path, 'wb')
+            self.file.write(MAGIC)
+            self.index = open(path + '.idx', 'wb')
+        self.offset = self.file.tell()
+
+    def write(self, size, k, moves, winner=None, scores=None, times=None):
+        """Append one game: moves as (x, y) from the empty board, winner 'X', 'O' or None
+        for a draw, optional per-move scores (None for no score) and times in seconds."""
+        record = encode(size, k, moves, winner, scores, times)
+        self.file.write(record)
+        self.index.write(struct.pack('<Q', self.offset))
+        self.offset += len(record)
+        self.count += 1
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordReader:
+    """Read-only, memory-mapped access to a record file: len(), [n] and iteration."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buf[:len(MAGIC)] != MAGIC:
+            self.buf.close()
+            raise ValueError('{} is not a game record file'.format(path))
+        self.offsets = self.load_index()
+
+    def load_index(self):
+        """The offsets from path + '.idx' if it matches the file, else rebuilt and saved."""
+        try:
+            with open(self.path + '.idx', 'rb') as f:
+                offsets = array('Q', f.read())
+        except (OSError, ValueError):
+            offsets = None
+        if offsets is not None:
+            end = self.end_of(offsets[-1]) if offsets else len(MAGIC)
+            if end == len(self.buf):
+                return offsets
+        offsets = scan_offsets(self.buf)
+        try:
+            with open(self.path + '.idx', 'wb') as f:
+                offsets.tofile(f)
+        except OSError:
+            pass  # a read-only directory: keep the index in memory
+        return offsets
+
+    def end_of(self, offset):
+        if offset >= len(self.buf):
+            return -1
+        length, i = get_varint(self.buf, offset)
+        return i + length
+
+    def decode(self, offset):
+        buf = self.buf
+        _, i = get_varint(buf, offset)
+        size, k, flags = buf[i], buf[i + 1], buf[i + 2]
+        n, i = get_varint(buf, i + 3)
+        moves = []
+        for _ in range(n):
+            cell, i = get_varint(buf, i)
+            moves.append((cell // size + 1, cell % size + 1))
+        scores = times = None
+        if flags & SCORES:
+            scores = [None if math.isnan(s) else s for s in struct.unpack_from('<{}f'.format(n), buf, i)]
+            i += 4 * n
+        if flags & TIMES:
+            times = []
+            for _ in range(n):
+                micros, i = get_varint(buf, i)
+                times.append(micros / 1e6)
+        return GameRecord(size, k, WINNERS[flags & 3], moves, scores, times)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, n):
+        return self.decode(self.offsets[n])
+
+    def __iter__(self):
+        """Decode the games in file order, one at a time."""
+        i, end = len(MAGIC), len(self.buf)
+        while i < end:
+            yield self.decode(i)
+            length, j = get_varint(self.buf, i)
+            i = j + length
+
+    def headers(self):
+        """Yield (size, k, winner, plies) per game, without decoding the moves."""
+        buf = self.buf
+        i, end = len(MAGIC), len(buf)
+        while i < end:
+            length, j = get_varint(buf, i)
+            yield buf[j], buf[j + 1], WINNERS[buf[j + 2] & 3], get_varint(buf, j + 3)[0]
+            i = j + length
+
+    def close(self):
+        self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a game record file.')
+    parser.add_argument('path')
+    parser.add_argument('--show', type=int, nargs='*', default=[], help='print these games')
+    args = parser.parse_args(argv)
+
+    with RecordReader(args.path) as records:
+        tally = {}
+        for size, k, winner, plies in records.headers():
+            games, wins, moves = tally.get((size, k), (0, {}, 0))
+            wins[winner] = wins.get(winner, 0) + 1
+            tally[(size, k)] = (games + 1, wins, moves + plies)
+        print('{}: {} games, {} bytes ({:.1f} bytes/game)'.format(
+            args.path, len(records), len(records.buf), len(records.buf) / max(1, len(records))))
+        for (size, k), (games, wins, moves) in sorted(tally.items()):
+            print('  {0}x{0} k{1}: {2} games, X {3} O {4} draws {5}, {6:.1f} plies/game'.format(
+                size, k, games, wins.get('X', 0), wins.get('O', 0), wins.get(None, 0), moves / games))
+        for n in args.show:
+            print(n, records[n])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
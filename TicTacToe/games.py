@@ -1,14 +1,16 @@
 """Games or Adversarial Search (Chapter 5)"""
 
 import copy
+import math
 import random
 from collections import namedtuple
-import numpy as np
 import time
 
+from utils import Cache
+
 GameState = namedtuple('GameState', 'to_move, move, utility, board, moves')
 
-def gen_state(move = '(1, 1)', to_move='X', x_positions=[], o_positions=[], h=3, v=3):
+def gen_state(move = '(1, 1)', to_move='X', x_positions=None, o_positions=None, h=3, v=3):
     """
         move = the move that has lead to this state,
         to_move=Whose turn is to move
@@ -16,6 +18,8 @@ def gen_state(move = '(1, 1)', to_move='X', x_positions=[], o_positions=[], h=3,
         o_position=positions on board occupied by O player,
         (optionally) number of rows, columns and how many consecutive X's or O's required to win,
     """
+    x_positions = x_positions or []
+    o_positions = o_positions or []
     moves = set([(x, y) for x in range(1, h + 1) for y in range(1, v + 1)]) - set(x_positions) - set(o_positions)
     moves = list(moves)
     board = {}
@@ -26,144 +30,436 @@ def gen_state(move = '(1, 1)', to_move='X', x_positions=[], o_positions=[], h=3,
     return GameState(to_move=to_move, move=move, utility=0, board=board, moves=moves)
 
 
+ZOBRIST_SIDE = 0x5bd1e9955bd1e995 >> 1  # flips with every move, so the key tells the side to move
+
+
+def zobrist_table(size):
+    """Return {cell: (X key, O key)} of 63-bit random keys, the same in every process."""
+    rng = random.Random('zobrist-{}'.format(size))
+    return {(x, y): (rng.getrandbits(63) ^ ZOBRIST_SIDE, rng.getrandbits(63) ^ ZOBRIST_SIDE)
+            for x in range(1, size + 1) for y in range(1, size + 1)}
+
+
+def zobrist_key(table, board, to_move):
+    """The Zobrist hash of board with to_move to move, as SearchPosition keeps it."""
+    key = 0
+    for cell, player in board.items():
+        key ^= table[cell][0 if player == 'X' else 1]
+    if to_move != ('X' if len(board) % 2 == 0 else 'O'):
+        key ^= ZOBRIST_SIDE
+    return key
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search once game.deadline has passed."""
+
+
+# ______________________________________________________________________________
+# Mutable positions for search
+
+class SearchPosition:
+    """A mutable position with the same fields as GameState. make(move) and
+    unmake() update the board, the empty cells, the side to move and the
+    cached utility in place, so a search walks the tree without building
+    a new GameState for every node.
+
+    moves is kept as a list with a position map; make() swaps the taken
+    cell with the last one and unmake() swaps it back, so the list is
+    restored exactly and a caller may keep iterating over it.
+
+    The position also counts, for every window of k cells, the X and O
+    stones in it, and how many windows are still winnable by each player.
+    When neither player can complete a window the game is a dead draw;
+    pruned counts the nodes terminal_test() cut off for that reason.
+
+    key is the Zobrist hash of the board and the side to move, kept up to
+    date by make() and unmake(); equal positions have equal keys in every
+    process, so it can index shared or persistent tables."""
+
+    __slots__ = ('game', 'to_move', 'move', 'utility', 'board', 'moves', 'index', 'history',
+                 'cellWindows', 'xCount', 'oCount', 'liveX', 'liveO', 'pruned', 'nodes',
+                 'zobrist', 'key')
+
+    def __init__(self, game, state):
+        self.game = game
+        self.to_move = state.to_move
+        self.move = state.move
+        self.utility = state.utility
+        self.board = dict(state.board)
+        self.moves = list(state.moves)
+        self.index = {m: i for i, m in enumerate(self.moves)}
+        self.history = []
+        windows, self.cellWindows = game.windows()
+        self.xCount = [sum(self.board.get(c) == 'X' for c in w) for w in windows]
+        self.oCount = [sum(self.board.get(c) == 'O' for c in w) for w in windows]
+        self.liveX = self.oCount.count(0)  # windows with no O that X may still complete
+        self.liveO = self.xCount.count(0)
+        self.pruned = 0
+        self.nodes = 0  # moves made on this position, i.e. nodes searched
+        self.zobrist = game.zobrist()
+        self.key = zobrist_key(self.zobrist, self.board, self.to_move)
+
+    def make(self, move):
+        """Play move for the side to move."""
+        self.nodes += 1
+        moves, index = self.moves, self.index
+        i = index.pop(move)
+        last = moves.pop()
+        if i < len(moves):
+            moves[i] = last
+            index[last] = i
+        player = self.to_move
+        self.board[move] = player
+        # a window reaching k stones is exactly what compute_utility looks for
+        k = self.game.k
+        won = False
+        if player == 'X':
+            count = self.xCount
+            for w in self.cellWindows.get(move, ()):
+                if count[w] == 0:
+                    self.liveO -= 1
+                count[w] += 1
+                if count[w] == k:
+                    won = True
+            self.key ^= self.zobrist[move][0]
+        else:
+            count = self.oCount
+            for w in self.cellWindows.get(move, ()):
+                if count[w] == 0:
+                    self.liveX -= 1
+                count[w] += 1
+                if count[w] == k:
+                    won = True
+            self.key ^= self.zobrist[move][1]
+        self.history.append((move, i, self.move, self.utility))
+        self.move = move
+        self.utility = (k if player == 'X' else -k) if won else 0
+        self.to_move = 'O' if player == 'X' else 'X'
+
+    def unmake(self):
+        """Take back the last move made."""
+        move, i, self.move, self.utility = self.history.pop()
+        moves, index = self.moves, self.index
+        player = self.to_move = self.board.pop(move)
+        if player == 'X':
+            count = self.xCount
+            for w in self.cellWindows.get(move, ()):
+                count[w] -= 1
+                if count[w] == 0:
+                    self.liveO += 1
+            self.key ^= self.zobrist[move][0]
+        else:
+            count = self.oCount
+            for w in self.cellWindows.get(move, ()):
+                count[w] -= 1
+                if count[w] == 0:
+                    self.liveX += 1
+            self.key ^= self.zobrist[move][1]
+        if i < len(moves):
+            last = moves[i]
+            index[last] = len(moves)
+            moves.append(last)
+            moves[i] = move
+        else:
+            moves.append(move)
+        index[move] = i
+
+    def rewind(self, ply):
+        """Unmake moves until only ply of them are left in the history."""
+        while len(self.history) > ply:
+            self.unmake()
+
+    def dead_draw(self):
+        """True if no window of k cells can still be completed by either player."""
+        return self.liveX == 0 and self.liveO == 0
+
+    def __repr__(self):
+        return '<SearchPosition to_move={} move={} utility={}>'.format(self.to_move, self.move, self.utility)
+
+
+class EvalCache(Cache):
+    """A bounded cache of leaf evaluations, keyed by SearchPosition.key.
+
+    alpha_beta_cutoff looks leaves up here before calling the evaluation
+    function, so the positions evaluated at depth d are not evaluated again
+    at depth d + 1 of iterative deepening, nor when a transposition reaches
+    them by another move order. It holds plain values, not search bounds.
+    Eviction is utils.Cache's, by policy 'lru', 'lfu' or 'clock'. The cache
+    is emptied when the board size, k or game.evaluator it was filled for
+    changes."""
+
+    def __init__(self, maxsize=1 << 16, policy='lru'):
+        self.context = None
+        super().__init__(maxsize, policy=policy)
+
+    def wrap(self, game, evaluate, stats=None):
+        """Return evaluate(state) looking up and filling this cache;
+        with stats, the lookups and hits also go to stats.ttProbes and ttHits."""
+        context = (game.size, game.k, game.evaluator)
+        if context != self.context:
+            self.clear()
+            self.context = context
+        get, put = self.get, self.put
+
+        def cached_evaluate(state):
+            key = state.key
+            value = get(key)
+            if stats is not None:
+                stats.ttProbes += 1
+            if value is not None:
+                if stats is not None:
+                    stats.ttHits += 1
+                return value
+            value = evaluate(state)
+            put(key, value)
+            return value
+
+        return cached_evaluate
+
+    def __repr__(self):
+        return '<EvalCache {} {}/{} entries, hit rate {:.1%}>'.format(
+            self.policy, len(self), self.maxsize, self.hit_rate)
+
+
 # ______________________________________________________________________________
 # MinMax Search
 def minmax(game, state):
     """Given a state in a game, calculate the best move by searching
     forward all the way to the terminal states. [Figure 5.3]"""
+    state = game.position(state)
     player = game.to_move(state)
+    terminal_test = game.terminal_test
+    if game.stats is not None:
+        terminal_test, _ = game.stats.wrap(state, terminal_test, None)
 
     def max_value(state):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
-        v = -np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = -math.inf
         for a in game.actions(state):
-            v = max(v, min_value(game.result(state, a)))
+            state.make(a)
+            v = max(v, min_value(state))
+            state.unmake()
         return v
     
 
     def min_value(state):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
-        v = np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = math.inf
         for a in game.actions(state):
-            v = min(v, max_value(game.result(state, a)))
+            state.make(a)
+            v = min(v, max_value(state))
+            state.unmake()
         return v
 
     # Body of minmax:
-    return max(game.actions(state), key=lambda a: min_value(game.result(state, a)), default=None)
+    best = -math.inf
+    best_action = None
+    ply = len(state.history)
+    try:
+        for a in game.actions(state):
+            state.make(a)
+            v = min_value(state)
+            state.unmake()
+            if v > best:
+                best = v
+                best_action = a
+    except SearchTimeout:
+        # stopped from outside (game.stop()): keep the best root move found so far
+        state.rewind(ply)
+
+    return best_action
 
 def minmax_cutoff(game, state):
     """Given a state in a game, calculate the best move by searching
     forward to the cutoff depth. Use evaluation function at the cutoff."""
+    state = game.position(state)
     player = game.to_move(state)
+    terminal_test = game.terminal_test
+    if game.stats is not None:
+        terminal_test, _ = game.stats.wrap(state, terminal_test, None)
     testCutoff=None
     eval=None
 
     def max_value(state, d):
         if testCutoff(state, d):
             return eval(state, game)
-        v = -np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = -math.inf
         for a in game.actions(state):
-            v = max(v, min_value(game.result(state, a), d + 1))
+            state.make(a)
+            v = max(v, min_value(state, d + 1))
+            state.unmake()
         return v
 
     def min_value(state, d):
         if testCutoff(state, d):
             return eval(state, game)
-        v = np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = math.inf
         for a in game.actions(state):
-            v = min(v, max_value(game.result(state, a), d + 1))
+            state.make(a)
+            v = min(v, max_value(state, d + 1))
+            state.unmake()
+        return v
+
+    def root_value(a):
+        state.make(a)
+        v = min_value(state, game.d)
+        state.unmake()
         return v
 
-    testCutoff = testCutoff or (lambda state, depth: depth > game.d or game.terminal_test(state))
+    testCutoff = testCutoff or (lambda state, depth: depth > game.d or terminal_test(state))
     eval = eval or (lambda state, game: game.utility(state, player))
 
     #return max(game.actions(state), key=lambda a: min_value(game.result(state, a), 1))
-    return max(game.actions(state), key=lambda a: min_value(game.result(state, a), game.d), default=None)
+    return max(game.actions(state), key=root_value, default=None)
 
 # ______________________________________________________________________________
 def alpha_beta(game, state):
     """Search game to determine best action; use alpha-beta pruning.
     This version searches all the way to the leaves."""
+    state = game.position(state)
     player = game.to_move(state)
+    stats = game.stats
+    terminal_test = game.terminal_test
+    if stats is not None:
+        terminal_test, _ = stats.wrap(state, terminal_test, None)
 
     # Functions used by alpha_beta
     def max_value(state, alpha, beta):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
-        v = -np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = -math.inf
         for move in game.actions(state):
-            v = max(v, min_value(game.result(state, move), alpha, beta))
+            state.make(move)
+            v = max(v, min_value(state, alpha, beta))
+            state.unmake()
             if v >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
                 return v
             alpha = max(alpha, v)
         return v
 
     def min_value(state, alpha, beta):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
-        v = np.inf
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = math.inf
         for move in game.actions(state):
-            v = min(v, max_value(game.result(state, move), alpha, beta))
+            state.make(move)
+            v = min(v, max_value(state, alpha, beta))
+            state.unmake()
             if v <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
                 return v
             beta = min(beta, v)
         return v
 
     # Body of alpha_beta_search:
-    alpha = -np.inf
-    beta = np.inf
+    alpha = -math.inf
+    beta = math.inf
     best_action = None
 
-    for action in game.actions(state):
-        value = min_value(game.result(state, action), alpha, beta)
-        if value > alpha:
-            alpha = value
-            best_action = action
+    ply = len(state.history)
+    try:
+        for action in game.actions(state):
+            state.make(action)
+            value = min_value(state, alpha, beta)
+            state.unmake()
+            if value > alpha:
+                alpha = value
+                best_action = action
+    except SearchTimeout:
+        # stopped from outside (game.stop()): keep the best root move found so far
+        state.rewind(ply)
 
     return best_action
 
-def alpha_beta_cutoff(game, state):
-    """Search game to determine best action; use alpha-beta pruning.
-    This version cuts off search and uses an evaluation function."""
-    player = game.to_move(state)
+def cutoff_searchers(game, state, player=None):
+    """Return the max_value and min_value functions of alpha_beta_cutoff for a search
+    rooted at the SearchPosition state, valued for player (default: the side to move).
+    ybw.py calls min_value on root children in other processes."""
+    player = player or game.to_move(state)
+    stats = game.stats
+    terminal_test = game.terminal_test
+    evaluate = game.evaluator or game.eval1
+    if game.evalCache is not None:
+        evaluate = game.evalCache.wrap(game, evaluate, stats)
+    if stats is not None:  # outside the cache, so stats.evals counts the hits too
+        terminal_test, evaluate = stats.wrap(state, terminal_test, evaluate)
 
     # Functions used by alpha_beta
     def max_value(state, alpha, beta, depth):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
         if depth == 0:
-            return game.eval1(state)
-        v = -np.inf
+            return evaluate(state)
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = -math.inf
         for a in game.actions(state):
-            v = max(v, min_value(game.result(state, a), alpha, beta, depth - 1))
+            state.make(a)
+            v = max(v, min_value(state, alpha, beta, depth - 1))
+            state.unmake()
             if v >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
                 return v
             alpha = max(alpha, v)
         return v
         
     def min_value(state, alpha, beta, depth):
-        if game.terminal_test(state):
+        if terminal_test(state):
             return game.utility(state, player)
         if depth == 0:
-            return game.eval1(state)
-        v = np.inf
+            return evaluate(state)
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        v = math.inf
         for a in game.actions(state):
-            v = min(v, max_value(game.result(state, a), alpha, beta, depth - 1))
+            state.make(a)
+            v = min(v, max_value(state, alpha, beta, depth - 1))
+            state.unmake()
             if v <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
                 return v
             beta = min(beta, v)
         return v
 
+    return max_value, min_value
+
+
+def alpha_beta_cutoff(game, state):
+    """Search game to determine best action; use alpha-beta pruning.
+    This version cuts off search and uses an evaluation function."""
+    state = game.position(state)
+    max_value, min_value = cutoff_searchers(game, state)
+
     # Body of alpha_beta_cutoff_search starts here:
     # The default test cuts off at depth d or at a terminal state
-    alpha = -np.inf
-    beta = np.inf
+    alpha = -math.inf
+    beta = math.inf
     best_action = None
 
-    for action in game.actions(state):
-        value = min_value(game.result(state, action), alpha, beta, game.d)
+    actions = game.moveOrder(state) if game.moveOrder else game.actions(state)
+    for action in actions:
+        state.make(action)
+        value = min_value(state, alpha, beta, game.d)
+        state.unmake()
         if value > alpha:
             alpha = value
             best_action = action
@@ -197,33 +493,111 @@ def random_player(game, state):
     return random.choice(game.actions(state)) if game.actions(state) else None
 
 
+def in_worker_process():
+    """True in a process started by multiprocessing, e.g. a Pool or ProcessPoolExecutor worker.
+    The parallel players search in-process there: a daemonic worker may not start
+    processes, and a pool worker exits without running atexit hooks."""
+    import multiprocessing  # only the parallel players ask, and they load it anyway
+    return multiprocessing.current_process().daemon or multiprocessing.parent_process() is not None
+
+
+def iterative_deepening(game, pos, search):
+    """Run search(game, pos) at cutoff depth game.d = 1, 2, ... until the time runs out.
+    Time comes from game.clock when it is set, otherwise from the flat game.timer.
+    game.deadline aborts an iteration that would overrun; the move of the deepest
+    completed iteration is returned, and the deadline the caller had is put back."""
+    clock = game.clock
+    stats = game.stats
+    previous = game.deadline
+    if clock is not None:
+        game.deadline = clock.start(game, pos)
+    else:
+        game.deadline = time.perf_counter() + game.timer
+    move = None
+    game.d = 0
+    try:
+        while game.d + 1 < game.maxDepth:
+            game.d += 1
+            ply = len(pos.history)
+            started = time.perf_counter()
+            try:
+                move = search(game, pos)
+            except SearchTimeout:
+                pos.rewind(ply)
+                game.d -= 1
+                if stats is not None:
+                    stats.add_time('aborted', time.perf_counter() - started)
+                break
+            if stats is not None:
+                stats.depth = game.d
+                stats.iteration(game, pos, search, move, time.perf_counter() - started)
+            if game.d >= len(pos.moves):
+                break  # the whole remaining game fits in this depth
+            if clock is not None:
+                if not clock.check(move):
+                    break
+            elif time.perf_counter() >= game.deadline:
+                break
+    finally:
+        game.deadline = previous
+        if clock is not None:
+            clock.stop()
+    return move if move is not None else random_player(game, pos)
+
+
 def alpha_beta_player(game, state):
     """uses alphaBeta prunning with minmax, or with cutoff version, for AI player"""
     # if len(state.moves) > game.k / 2:
     
     """Use a method to speed up at the start to avoid search down a long tree with not much outcome.
     Hint: for speedup use random_player for start of the game when you see search time is too long"""
-    if( game.timer < 0):
+    pos = game.position(state)
+    if game.stats is not None:
+        game.stats.begin('alphabeta', pos)
+    cache = game.searchCache
+    hit = cache.lookup(game, pos) if cache is not None else None
+    if hit is not None and hit.solved:
+        if game.stats is not None:
+            game.stats.finish(hit.move, pos)
+        return hit.move
+    if( game.timer < 0 and game.clock is None):
         game.d = -1
-        return alpha_beta(game, state)
+        previous = game.deadline
+        try:
+            if cache is not None:
+                search = cache.searcher(hit, keep_best=True)
+                move = search(game, pos)
+                if not search.stopped:
+                    cache.store(game, pos, move, search.score, len(pos.moves), solved=True)
+            else:
+                move = alpha_beta(game, pos)
+        finally:
+            game.deadline = previous  # a stop() during the search must not stop the next one
+        game.nodes = pos.nodes
+        move = move if move is not None else random_player(game, state)
+        if game.stats is not None:
+            game.stats.finish(move, pos)
+        return move
     
 
-    if len(state.moves) > game.k * game.k - game.k - 1:
-        return random_player(game, state)
-
-    start = time.perf_counter()
-    end = start + game.timer
-    """use the above timer to implement iterative deepening using alpha_beta_cutoff() version"""
-    move = None
-    while time.perf_counter() < start + game.timer:
-        if time.perf_counter() >= end:
-            break
-        game.d += 1
-        if game.d >= game.maxDepth:
-            break
-        move = alpha_beta_cutoff(game, state)
-        
+    if game.clock is None and len(state.moves) > game.k * game.k - game.k - 1:
+        move = random_player(game, state)
+        if game.stats is not None:
+            game.stats.finish(move, pos)
+        return move
+
+    """use the timer (or game.clock) to implement iterative deepening using alpha_beta_cutoff() version"""
+    if cache is not None:
+        search = cache.searcher(hit)
+        move = iterative_deepening(game, pos, search)
+        if game.d > 0:
+            cache.store(game, pos, move, search.score, game.d, solved=game.d >= len(pos.moves))
+    else:
+        move = iterative_deepening(game, pos, alpha_beta_cutoff)
 
+    game.nodes = pos.nodes
+    if game.stats is not None:
+        game.stats.finish(move, pos)
     print("iterative deepening to depth: ", game.d)
     game.d = 0
     return move
@@ -232,28 +606,37 @@ def alpha_beta_player(game, state):
 def minmax_player (game, state):
     """uses minmax or minmax with cutoff depth, for AI player"""
 
-    if(game.timer < 0):
+    pos = game.position(state)
+    if game.stats is not None:
+        game.stats.begin('minmax', pos)
+    if(game.timer < 0 and game.clock is None):
         game.d = -1
-        return minmax(game, state)
-
-    if len(state.moves) > game.k * game.k - game.k - 1:
-        return random_player(game, state)
+        previous = game.deadline
+        try:
+            move = minmax(game, pos)
+        finally:
+            game.deadline = previous  # a stop() during the search must not stop the next one
+        game.nodes = pos.nodes
+        move = move if move is not None else random_player(game, state)
+        if game.stats is not None:
+            game.stats.finish(move, pos)
+        return move
+
+    if game.clock is None and len(state.moves) > game.k * game.k - game.k - 1:
+        move = random_player(game, state)
+        if game.stats is not None:
+            game.stats.finish(move, pos)
+        return move
     
     """Use a method to speed up at the start to avoid search down a long tree with not much outcome.
     Hint:for speedup use random_player for start of the game when you see search time is too long"""
 
 
-    start = time.perf_counter()
-    end = start + game.timer
-    """use the above timer to implement iterative deepening using minmax_cutoff() version"""
-    move = None
-
-    
-    while time.perf_counter() < game.timer + start:
-        if time.perf_counter() >= end:
-            break
-        game.d += 1
-        move = minmax_cutoff(game, state)
+    """use the timer (or game.clock) to implement iterative deepening using minmax_cutoff() version"""
+    move = iterative_deepening(game, pos, minmax_cutoff)
+    game.nodes = pos.nodes
+    if game.stats is not None:
+        game.stats.finish(move, pos)
     print("iterative deepening to depth: ", game.d)
     game.d = 0
     return move
@@ -279,6 +662,10 @@ class Game:
         """Return the state that results from making a move from a state."""
         raise NotImplementedError
 
+    def position(self, state):
+        """Return a mutable position for state that supports make/unmake."""
+        raise NotImplementedError
+
     def utility(self, state, player):
         """Return the value of this final state to player."""
         raise NotImplementedError
@@ -325,6 +712,17 @@ class TicTacToe(Game):
         self.d = -1 # d is cutoff depth. Default is -1 meaning no depth limit. It is controlled usually by timer
         self.maxDepth = size * size # max depth possible is width X height of the board
         self.timer = t #timer  in seconds for opponent's search time limit. -1 means unlimited
+        self.evaluator = None # optional leaf evaluator used by alpha_beta_cutoff in place of eval1
+        self.moveOrder = None # optional function state -> ordered moves, used at the root of alpha_beta_cutoff
+        self.windowCache = {}
+        self.zobristCache = {}
+        self.clock = None # optional timeControl.TimeManager; overrides timer when set
+        self.deadline = None # absolute perf_counter() time at which a running search raises SearchTimeout
+        self.nodes = 0 # nodes searched by the last player move (MCTS: playouts)
+        self.stats = None # optional stats.SearchStats, filled in by every search when set
+        self.workers = None # processes used by lazySMP.smp_player; None means one per core
+        self.evalCache = EvalCache() # leaf evaluations of alpha_beta_cutoff by position key; None disables it
+        self.searchCache = None # optional searchCache.SearchCache of root results kept on disk across runs
         moves = [(x, y) for x in range(1, size + 1)
                  for y in range(1, size + 1)]
         self.initial = GameState(to_move='X', move=None, utility=0, board={}, moves=moves)
@@ -334,6 +732,11 @@ class TicTacToe(Game):
                  for y in range(1, self.size + 1)]
         self.initial = GameState(to_move='X', move=None, utility=0, board={}, moves=moves)
 
+    def stop(self):
+        """Ask a running search to stop; called from another thread it makes the
+        player return the best move found so far."""
+        self.deadline = 0.0
+
     def actions(self, state):
         """Legal moves are any square not yet taken."""
         return state.moves
@@ -358,13 +761,49 @@ class TicTacToe(Game):
                          utility=self.compute_utility(board, move, state.to_move),
                          board=board, moves=moves)
 
+    def position(self, state):
+        """Wrap state in a SearchPosition; positions are returned unchanged."""
+        return state if isinstance(state, SearchPosition) else SearchPosition(self, state)
+
     def utility(self, state, player):
         """Return the value to player; 1 for win, -1 for loss, 0 otherwise."""
         return state.utility if player == 'X' else -state.utility
 
     def terminal_test(self, state):
-        """A state is terminal if it is won or lost or there are no empty squares."""
-        return state.utility != 0 or len(state.moves) == 0
+        """A state is terminal if it is won or lost or there are no empty squares.
+        A SearchPosition is also terminal once no line can be completed by either side."""
+        if state.utility != 0 or len(state.moves) == 0:
+            return True
+        if isinstance(state, SearchPosition) and state.liveX == 0 and state.liveO == 0:
+            state.pruned += 1
+            return True
+        return False
+
+    def windows(self):
+        """Return every line of k cells on the board as a tuple of cells, and a dict
+        mapping each cell to the indices of the windows through it. Cached per k,
+        since k may be changed between games."""
+        key = (self.size, self.k)
+        if key not in self.windowCache:
+            size, k = self.size, self.k
+            windows = []
+            for (dx, dy) in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                for x in range(1, size + 1):
+                    for y in range(1, size + 1):
+                        if 1 <= x + dx * (k - 1) <= size and 1 <= y + dy * (k - 1) <= size:
+                            windows.append(tuple((x + dx * i, y + dy * i) for i in range(k)))
+            cellWindows = {}
+            for w, cells in enumerate(windows):
+                for cell in cells:
+                    cellWindows.setdefault(cell, []).append(w)
+            self.windowCache[key] = (windows, cellWindows)
+        return self.windowCache[key]
+
+    def zobrist(self):
+        """Return the Zobrist keys of this board size, see zobrist_table()."""
+        if self.size not in self.zobristCache:
+            self.zobristCache[self.size] = zobrist_table(self.size)
+        return self.zobristCache[self.size]
 
     def display(self, state):
         board = state.board
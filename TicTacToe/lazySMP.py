@@ -0,0 +1,360 @@
+"""Lazy SMP: iterative-deepening alpha-beta in several processes sharing one transposition table
+
+    python lazySMP.py --size 5 --k 4 --timer 2 --workers 1 2 4
+
+Every process searches the same root with table_search(), alpha_beta_cutoff
+with a transposition table, and they cooperate only through the table: a
+position one process has searched is a cutoff or a good first move for the
+others. The helpers shuffle the root moves and every other one starts a depth
+deeper, so they spread over different parts of the tree. The main process
+plays the move of the deepest iteration any process completed.
+
+The table lives in multiprocessing.shared_memory and is read and written
+without locks. An entry is two 64-bit words, check = key ^ data and data; a
+reader recomputes key ^ data and treats a mismatch, e.g. an entry torn by a
+concurrent write, as a miss. All processes evaluate with eval1, whose
+integer scores the table stores exactly; game.evaluator is not used here.
+
+With one process the table is ordinary memory. smp_player uses just one
+inside a pool worker (games.in_worker_process), and its engines keep their
+pools until close_engines(), which the service and tournament call when
+they end."""
+
+import argparse
+import atexit
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from games import SearchTimeout, TicTacToe, gen_state, in_worker_process, random_player
+
+EXACT, LOWER, UPPER = 0, 1, 2
+SCORE_BIAS = 1 << 37  # scores take the top 38 bits of an entry
+SCORE_INF = SCORE_BIAS - 1
+
+
+class TranspositionTable:
+    """2**bits entries of (depth, bound, score, best move) in shared memory, indexed by Zobrist key,
+    or in private memory with shared=False. Word 0 holds the id of the running search;
+    helpers stop when it changes."""
+
+    def __init__(self, bits=18, name=None, shared=True):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        length = 8 * (1 + 2 * (self.mask + 1))
+        self.owner = name is None
+        if not shared:
+            self.shm = None
+            self.buf = bytearray(length)
+        else:
+            if name is None:
+                self.shm = shared_memory.SharedMemory(create=True, size=length)
+            else:
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.buf = self.shm.buf
+        self.words = memoryview(self.buf).cast('Q')
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def name(self):
+        return None if self.shm is None else self.shm.name
+
+    def probe(self, key):
+        """Return (depth, flag, score, move index or None) stored for key, or None."""
+        self.probes += 1
+        i = 1 + ((key & self.mask) << 1)
+        data = self.words[i + 1]
+        if self.words[i] ^ data != key:
+            return None
+        self.hits += 1
+        score = (data >> 26) - SCORE_BIAS
+        if score == SCORE_INF:
+            score = math.inf
+        elif score == -SCORE_INF:
+            score = -math.inf
+        move = (data >> 10) & 0xffff
+        return data & 0xff, (data >> 8) & 3, score, move - 1 if move else None
+
+    def store(self, key, depth, flag, score, move):
+        """Keep the entry for key unless one for the same key from a deeper search is there.
+        Only integer and infinite scores fit; others are not stored."""
+        if score == math.inf:
+            score = SCORE_INF
+        elif score == -math.inf:
+            score = -SCORE_INF
+        elif score != int(score) or abs(score) >= SCORE_INF:
+            return
+        i = 1 + ((key & self.mask) << 1)
+        words = self.words
+        old = words[i + 1]
+        if words[i] ^ old == key and old & 0xff > depth:
+            return
+        data = min(depth, 0xff) | flag << 8 | (0 if move is None else move + 1) << 10 | (int(score) + SCORE_BIAS) << 26
+        words[i + 1] = data
+        words[i] = key ^ data
+
+    def clear(self):
+        self.buf[8:] = bytes(len(self.buf) - 8)
+
+    def close(self):
+        self.words.release()
+        if self.shm is not None:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+
+
+def table_salt(game, player):
+    """A key offset per (size, k, root player): table values depend on all three."""
+    return random.Random('tt-{}-{}-{}'.format(game.size, game.k, player)).getrandbits(63)
+
+
+def table_search(game, pos, table, searchId=None, rng=None):
+    """alpha_beta_cutoff at depth game.d from pos, with the same values, reading and
+    writing table. rng shuffles the root moves; the search raises SearchTimeout past
+    game.deadline, or when table word 0 stops being searchId. Return (move, score)."""
+    player = pos.to_move
+    salt = table_salt(game, player)
+    evaluate = game.eval1
+    size = game.size
+    words = table.words
+
+    def value(state, alpha, beta, depth, maximizing):
+        if game.terminal_test(state):
+            return game.utility(state, player)
+        if depth == 0:
+            return evaluate(state)
+        if game.deadline is not None and time.perf_counter() > game.deadline:
+            raise SearchTimeout
+        if searchId is not None and words[0] != searchId:
+            raise SearchTimeout
+        key = state.key ^ salt
+        entry = table.probe(key)
+        moves = state.moves
+        if entry is not None:
+            stored, flag, score, i = entry
+            if stored >= depth and (flag == EXACT or (flag == LOWER and score >= beta) or
+                                    (flag == UPPER and score <= alpha)):
+                return score
+            if i is not None and (i // size + 1, i % size + 1) in state.index:
+                first = (i // size + 1, i % size + 1)
+                moves = [first] + [m for m in moves if m != first]
+        lower, upper = alpha, beta
+        best = None
+        v = -math.inf if maximizing else math.inf
+        for a in list(moves):
+            state.make(a)
+            w = value(state, alpha, beta, depth - 1, not maximizing)
+            state.unmake()
+            if maximizing:
+                if best is None or w > v:
+                    v, best = w, a
+                if v >= beta:
+                    break
+                alpha = max(alpha, v)
+            else:
+                if best is None or w < v:
+                    v, best = w, a
+                if v <= alpha:
+                    break
+                beta = min(beta, v)
+        flag = UPPER if v <= lower else LOWER if v >= upper else EXACT
+        table.store(key, depth, flag, v, (best[0] - 1) * size + best[1] - 1)
+        return v
+
+    moves = list(pos.moves)
+    if rng is not None:
+        rng.shuffle(moves)
+    entry = table.probe(pos.key ^ salt)
+    if entry is not None and entry[3] is not None:
+        first = (entry[3] // size + 1, entry[3] % size + 1)
+        if first in pos.index:
+            moves = [first] + [m for m in moves if m != first]
+    alpha = -math.inf
+    best = None
+    for a in moves:
+        pos.make(a)
+        v = value(pos, alpha, math.inf, game.d, False)
+        pos.unmake()
+        if best is None or v > alpha:
+            alpha, best = v, a
+    if best is not None:
+        table.store(pos.key ^ salt, game.d + 1, EXACT, alpha, (best[0] - 1) * size + best[1] - 1)
+    return best, alpha
+
+
+def deepen(game, pos, table, start=1, searchId=None, rng=None):
+    """Iterative deepening with table_search from depth start; return (depth, move, score)
+    of the deepest completed iteration, depth 0 if none completed."""
+    result = (0, None, None)
+    d = start
+    while d < game.maxDepth:
+        game.d = d
+        ply = len(pos.history)
+        try:
+            move, score = table_search(game, pos, table, searchId, rng)
+        except SearchTimeout:
+            pos.rewind(ply)
+            break
+        result = (d, move, score)
+        if d >= len(pos.moves) or abs(score) == math.inf:
+            break  # the whole game fits in this depth, or the result is decided
+        d += 1
+    return result
+
+
+# ______________________________________________________________________________
+# Helper processes
+
+_tables = {}
+_games = {}
+
+
+def helper_search(size, k, state, seconds, tableName, bits, searchId, helper):
+    """Run in a helper process: deepen() on state for seconds (None: no limit);
+    return (depth, move, score, nodes)."""
+    if tableName not in _tables:
+        _tables[tableName] = TranspositionTable(bits, tableName)
+    table = _tables[tableName]
+    if (size, k) not in _games:
+        _games[(size, k)] = TicTacToe(size, k)
+    game = _games[(size, k)]
+    game.deadline = None if seconds is None else time.perf_counter() + seconds
+    pos = game.position(state)
+    rng = random.Random(searchId * 1000 + helper)
+    depth, move, score = deepen(game, pos, table, 1 + helper % 2, searchId, rng)
+    game.deadline = None
+    return depth, move, score, pos.nodes
+
+
+class LazySMP:
+    """A Lazy SMP engine: workers - 1 helper processes plus the calling process,
+    one shared table. Keep one engine for a whole session so the pool and the
+    table stay warm; close() releases both, and unlinks the shared memory."""
+
+    def __init__(self, workers=None, bits=18):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.table = TranspositionTable(bits, shared=self.workers > 1)
+        try:
+            self.pool = ProcessPoolExecutor(self.workers - 1) if self.workers > 1 else None
+        except BaseException:
+            self.table.close()
+            raise
+        self.searches = 0
+        self.last = None  # (depth, move, score, nodes, helper) of the last search
+
+    def search(self, game, state):
+        """Return the move of the deepest iteration completed by any process."""
+        pos = game.position(state)
+        clock = game.clock
+        if clock is not None:
+            clock.start(game, pos)
+            seconds = clock.soft
+        else:
+            seconds = game.timer if game.timer > 0 else None
+        self.searches += 1
+        searchId = self.searches
+        self.table.words[0] = searchId
+        started = time.perf_counter()
+        futures = []
+        if self.pool is not None:
+            futures = [self.pool.submit(helper_search, game.size, game.k, state, seconds,
+                                        self.table.name, self.table.bits, searchId, helper)
+                       for helper in range(1, self.workers)]
+        game.deadline = None if seconds is None else started + seconds
+        try:
+            depth, move, score = deepen(game, pos, self.table)
+        finally:
+            game.deadline = None
+        # the main search is done: stop the helpers, and take a deeper result if one finished
+        self.table.words[0] = 0
+        best = (depth, move, score, pos.nodes, 0)
+        nodes = pos.nodes
+        done, _ = wait(futures, timeout=1.0)
+        for helper, future in enumerate(futures, 1):
+            if future in done and future.exception() is None:
+                hDepth, hMove, hScore, hNodes = future.result()
+                nodes += hNodes
+                if hDepth > best[0] and hMove is not None:
+                    best = (hDepth, hMove, hScore, hNodes, helper)
+        if clock is not None:
+            clock.stop()
+        self.last = best[:3] + (nodes, best[4])
+        game.d = best[0]
+        game.nodes = nodes
+        return best[1] if best[1] is not None else random_player(game, state)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+
+
+_engines = {}
+
+
+def smp_player(game, state):
+    """Lazy SMP as a player function, with game.workers processes (None: one per core),
+    or only this one inside a pool worker. The engines stay up until close_engines()."""
+    workers = 1 if in_worker_process() else game.workers or os.cpu_count() or 1
+    if workers not in _engines:
+        _engines[workers] = LazySMP(workers)
+    engine = _engines[workers]
+    stats = game.stats
+    if stats is not None:
+        stats.begin('smp', state)
+        probes, hits = engine.table.probes, engine.table.hits
+    move = engine.search(game, state)
+    print("lazy SMP depth: ", game.d, " nodes: ", game.nodes, " from process ", engine.last[4])
+    if stats is not None:
+        stats.depth = game.d
+        stats.nodes = game.nodes
+        stats.ttProbes = engine.table.probes - probes
+        stats.ttHits = engine.table.hits - hits
+        stats.finish(move)
+    return move
+
+
+@atexit.register
+def close_engines():
+    """Shut down the pools and release the tables of the smp_player engines."""
+    for engine in _engines.values():
+        engine.close()
+    _engines.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Depth reached by Lazy SMP for a number of processes.')
+    parser.add_argument('--size', type=int, default=5)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--timer', type=float, default=2.0)
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--stones', type=int, default=4, help='stones placed before the search')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    cells = [(x, y) for x in range(1, args.size + 1) for y in range(1, args.size + 1)]
+    rng.shuffle(cells)
+    stones = cells[:args.stones]
+    state = gen_state(None, 'X', stones[0::2], stones[1::2], args.size, args.size)
+    for workers in args.workers:
+        game = TicTacToe(args.size, args.k, args.timer)
+        engine = LazySMP(workers)
+        started = time.perf_counter()
+        move = engine.search(game, state)
+        elapsed = time.perf_counter() - started
+        depth, _, score, nodes, helper = engine.last
+        print('{} process(es): depth {} move {} score {} in {:.2f}s, {} nodes ({:.0f}/s), from process {}'.format(
+            workers, depth, move, score, elapsed, nodes, nodes / elapsed, helper))
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -32,36 +32,124 @@ class MCTS:
         self.state = state
         self.game = game
         self.exploreFactor = math.sqrt(2)
+        self.iterations = 0
+        self.stopped = False
+        self.pondered = 0.0  # seconds of search this tree received while pondering
+
+    def stop(self):
+        """Ask a running monteCarloPlayer() to return its current best move."""
+        self.stopped = True
+
+    def reroot(self, move):
+        """Make the child reached by move the new root, keeping its subtree.
+        Return False (and leave the tree alone) if that child was never expanded."""
+        for child in self.root.children:
+            if child.state.move == move:
+                child.parent = None
+                self.root = child
+                self.state = child.state
+                self.stopped = False
+                return True
+        return False
 
     def isTerminalState(self, utility, moves):
         return utility != 0 or len(moves) == 0
 
-    def monteCarloPlayer(self, timelimit=4):
-        """Entry point for Monte Carlo search"""
+    def monteCarloPlayer(self, timelimit=4, iterations=None):
+        """Entry point for Monte Carlo search. If the game has a clock
+        (timeControl.TimeManager) it decides the time instead of timelimit.
+        iterations, if given, also stops the search after that many playouts."""
         start = time.perf_counter()
+        limit = math.inf if iterations is None else self.iterations + iterations
         end = start + timelimit
+        stats = getattr(self.game, 'stats', None)
+        cache = getattr(self.game, 'searchCache', None)
+        hit = cache.lookup(self.game, self.state) if cache is not None else None
+        if hit is not None and hit.solved:
+            # searched to the end by an earlier alpha-beta search, maybe in another run
+            if stats is not None:
+                stats.begin('mcts', self.state)
+                stats.finish(hit.move)
+            return hit.move
+        clock = getattr(self.game, 'clock', None)
+        if clock is not None:
+            end = clock.start(self.game, self.state)
+            nextCheck = start + clock.soft / 10
+        if stats is not None:
+            stats.begin('mcts', self.state)
+            first = self.iterations
 
         """Use timer above to apply iterative deepening"""
-        while time.perf_counter() < end:
-             #count = 100  # use this and the next line for debugging. Just disable previous while and enable these 2 lines
-            # while count >= 0:
-            #     count -= 1
-            # SELECT stage use selectNode()
-            node = self.selectNode(self.root)
-
-            if not self.isTerminalState(node.state.utility, node.state.moves):
-                self.expandNode(node)
-
-            # SIMULATE stage using simuplateRandomPlay()
-            node = random.choice(node.children) if len(node.children) > 0 else node
-            result = self.simulateRandomPlay(node)
-
-            # BACKUP stage using backPropagation
-            self.backPropagation(node, result)
-
-        winnerNode = self.root.getChildWithMaxScore()
-        assert (winnerNode is not None)
-        return winnerNode.state.move
+        while time.perf_counter() < end and self.iterations < limit and not self.stopped:
+            self.iterations += 1
+            if stats is not None:
+                self.timedIteration(stats)
+            else:
+                 #count = 100  # use this and the next line for debugging. Just disable previous while and enable these 2 lines
+                # while count >= 0:
+                #     count -= 1
+                # SELECT stage use selectNode()
+                node = self.selectNode(self.root)
+
+                if not self.isTerminalState(node.state.utility, node.state.moves):
+                    self.expandNode(node)
+
+                # SIMULATE stage using simuplateRandomPlay()
+                node = random.choice(node.children) if len(node.children) > 0 else node
+                result = self.simulateRandomPlay(node)
+
+                # BACKUP stage using backPropagation
+                self.backPropagation(node, result)
+
+            # ask the clock every tenth of the soft budget whether the best move has settled
+            if clock is not None and time.perf_counter() >= nextCheck and self.root.children:
+                if not clock.check(self.root.getChildWithMaxScore().state.move, predicted=0):
+                    break
+                nextCheck = time.perf_counter() + clock.soft / 10
+
+        if clock is not None:
+            clock.stop()
+        if not self.root.children:
+            move = random_player(self.game, self.state)  # stopped before the first expansion
+        else:
+            winnerNode = self.root.getChildWithMaxScore()
+            assert (winnerNode is not None)
+            move = winnerNode.state.move
+        if stats is not None:
+            stats.iterations = self.iterations - first
+            stats.treeSize, stats.maxDepth = self.treeShape()
+            stats.nodes = stats.treeSize
+            stats.root(self)
+            stats.finish(move)
+        return move
+
+    def timedIteration(self, stats):
+        """One select/expand/simulate/backup iteration, timing each phase into stats."""
+        t0 = time.perf_counter()
+        node = self.selectNode(self.root)
+        t1 = time.perf_counter()
+        if not self.isTerminalState(node.state.utility, node.state.moves):
+            self.expandNode(node)
+        t2 = time.perf_counter()
+        node = random.choice(node.children) if len(node.children) > 0 else node
+        result = self.simulateRandomPlay(node)
+        t3 = time.perf_counter()
+        self.backPropagation(node, result)
+        t4 = time.perf_counter()
+        phases = stats.phases
+        for phase, seconds in (('select', t1 - t0), ('expand', t2 - t1), ('simulate', t3 - t2), ('backprop', t4 - t3)):
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def treeShape(self):
+        """Return the number of nodes in the tree and its depth below the root."""
+        size, depth = 0, 0
+        stack = [(self.root, 0)]
+        while stack:
+            nd, d = stack.pop()
+            size += 1
+            depth = max(depth, d)
+            stack.extend((child, d + 1) for child in nd.children)
+        return size, depth
     
     """selection stage function. walks down the tree using findBestNodeWithUCT()"""
     def selectNode(self, nd):
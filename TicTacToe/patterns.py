@@ -0,0 +1,140 @@
+"""Pattern lookup tables for line-segment scoring
+
+Every k-window of cells is encoded as a base-3 number (0 empty, 1 X, 2 O,
+first cell most significant) and looked up in a table generated once per
+k and weight vector. Tables are cached in memory and on disk, so the
+evaluation of a state becomes a sum of table lookups over its windows."""
+
+import hashlib
+import os
+from array import array
+
+# 3 ** 13 entries is about 6MB on disk; larger k needs too big a table
+MAX_K = 13
+
+CODES = {'X': 1, 'O': 2}
+
+_tables = {}
+
+
+def cache_dir():
+    """Directory holding the generated tables; TICTACTOE_CACHE overrides the default."""
+    return os.environ.get('TICTACTOE_CACHE') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'tictactoe')
+
+
+def default_weights(k):
+    """Value of an open window holding m stones, for m in 0..k."""
+    return [0] + [4 ** (m - 1) for m in range(1, k + 1)]
+
+
+def build_table(k, weights):
+    """Return an array scoring every k-window from X's point of view: weights[m] for
+    a window with m X's and no O, -weights[m] for m O's and no X, 0 otherwise."""
+    size = 3 ** k
+    xs = array('b', bytes(size))
+    os_ = array('b', bytes(size))
+    for i in range(1, size):
+        rest, digit = divmod(i, 3)
+        xs[i] = xs[rest] + (digit == 1)
+        os_[i] = os_[rest] + (digit == 2)
+    return array('i', (weights[x] if not o else -weights[o] if not x else 0
+                       for x, o in zip(xs, os_)))
+
+
+def pattern_table(k, weights=None):
+    """Return the pattern table for k, loading it from disk or generating and saving it."""
+    if not 1 <= k <= MAX_K:
+        raise ValueError('pattern tables support 1 <= k <= {}, got {}'.format(MAX_K, k))
+    weights = tuple(default_weights(k) if weights is None else weights)
+    if len(weights) != k + 1:
+        raise ValueError('weights must have k + 1 entries')
+    key = (k, weights)
+    if key in _tables:
+        return _tables[key]
+
+    digest = hashlib.sha1(repr(weights).encode()).hexdigest()[:12]
+    path = os.path.join(cache_dir(), 'patterns_k{}_{}.bin'.format(k, digest))
+    table = array('i')
+    try:
+        with open(path, 'rb') as f:
+            table.fromfile(f, 3 ** k)
+    except (OSError, EOFError):
+        table = build_table(k, weights)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp, 'wb') as f:
+                table.tofile(f)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only cache only costs us the regeneration next time
+    _tables[key] = table
+    return table
+
+
+def board_lines(size, k):
+    """Return every maximal row, column and diagonal of at least k cells, as lists of (x, y)."""
+    lines = []
+    for x in range(1, size + 1):
+        lines.append([(x, y) for y in range(1, size + 1)])
+    for y in range(1, size + 1):
+        lines.append([(x, y) for x in range(1, size + 1)])
+    for start in range(-(size - 1), size):
+        diag = [(x, x - start) for x in range(1, size + 1) if 1 <= x - start <= size]
+        anti = [(x, start + size + 1 - x) for x in range(1, size + 1) if 1 <= start + size + 1 - x <= size]
+        lines.extend(line for line in (diag, anti) if len(line) >= k)
+    return [line for line in lines if len(line) >= k]
+
+
+class PatternEvaluator:
+    """Evaluate a TicTacToe state by table lookups over all of its k-windows.
+
+    Each line of the board is scanned once with a rolling base-3 index, so a
+    window costs one multiply-add and one lookup. An instance is callable
+    like eval1 and can be set as game.evaluator."""
+
+    def __init__(self, game, weights=None):
+        self.game = game
+        self.givenWeights = weights
+        self.size = self.k = None
+        self.fit()
+
+    def fit(self):
+        """Set up for the game's current size and k, so a change of game.k between
+        games switches to the table and lines of the new k."""
+        game = self.game
+        if (game.size, game.k) == (self.size, self.k):
+            return
+        self.table = pattern_table(game.k, self.givenWeights)
+        self.size = game.size
+        self.k = game.k
+        self.lines = board_lines(game.size, game.k)
+        self.high = 3 ** (game.k - 1)
+
+    def score(self, board):
+        """Sum the table over every window of board, from X's point of view."""
+        self.fit()
+        table, k, high = self.table, self.k, self.high
+        get = board.get
+        total = 0
+        for line in self.lines:
+            codes = [CODES.get(get(cell), 0) for cell in line]
+            index = 0
+            for c in codes[:k]:
+                index = index * 3 + c
+            total += table[index]
+            for i in range(k, len(codes)):
+                index = (index - codes[i - k] * high) * 3 + codes[i]
+                total += table[index]
+        return total
+
+    def __call__(self, state):
+        """Score state for the side to move, with the same conventions as eval1."""
+        self.fit()
+        if state.utility == self.k:
+            return float('inf') if state.to_move == 'X' else float('-inf')
+        elif state.utility == -self.k:
+            return float('-inf') if state.to_move == 'X' else float('inf')
+        score = self.score(state.board)
+        return score if state.to_move == 'X' else -score
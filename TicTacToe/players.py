@@ -0,0 +1,45 @@
+"""The engines by name, as player functions player(game, state) -> move"""
+
+import sys
+
+from games import random_player, minmax_player, alpha_beta_player
+from monteCarlo import MCTS
+
+
+def mcts_player(game, state):
+    """MCTS as a player function, searching for game.timer seconds (4 if unlimited)."""
+    search = MCTS(game, state)
+    move = search.monteCarloPlayer(game.timer if game.timer > 0 else 4)
+    game.nodes = search.iterations
+    return move
+
+
+def smp_player(game, state):
+    """lazySMP.smp_player; the module, with its process pool and shared memory, loads on first use."""
+    from lazySMP import smp_player
+    return smp_player(game, state)
+
+
+def ybw_player(game, state):
+    """ybw.ybw_player, loaded on first use like smp_player."""
+    from ybw import ybw_player
+    return ybw_player(game, state)
+
+
+def close_engines():
+    """Shut down the process pools and shared memory of the parallel engines that were used;
+    call it when the engines are no longer needed, e.g. when a service or tournament ends."""
+    if 'lazySMP' in sys.modules:
+        sys.modules['lazySMP'].close_engines()
+    if 'ybw' in sys.modules:
+        sys.modules['ybw'].close_splitters()
+
+
+PLAYERS = {
+    'random': random_player,
+    'minmax': minmax_player,
+    'alphabeta': alpha_beta_player,
+    'mcts': mcts_player,
+    'smp': smp_player,
+    'ybw': ybw_player,
+}
@@ -0,0 +1,142 @@
+"""Pondering: keep the engine searching while the human is thinking"""
+
+import copy
+import threading
+import time
+
+from games import EvalCache
+from monteCarlo import MCTS
+
+
+def likely_replies(game, state):
+    """Order the replies to state by how many live lines they touch, weighted by
+    the stones already in those lines: a cheap guess at what the opponent plays."""
+    pos = game.position(state)
+    windows, cellWindows = game.windows()
+
+    def weight(cell):
+        score = 0
+        for w in cellWindows.get(cell, ()):
+            x, o = pos.xCount[w], pos.oCount[w]
+            if x == 0 or o == 0:
+                score += 1 + (x + o) * (x + o)
+        return score
+
+    return sorted(pos.moves, key=weight, reverse=True)
+
+
+class Ponderer:
+    """Search in a background thread during the opponent's turn.
+
+    For the alpha-beta and minmax players start() searches the most likely
+    replies one after the other (at most maxReplies of them) and remembers
+    the engine's answer to each. For MCTS it keeps growing a tree rooted at
+    the opponent's turn, which covers all replies at once. take(move) stops
+    the thread when the opponent has moved and returns what was prepared for
+    that move: the answer, an MCTS whose root is the reply's subtree, or None
+    on a miss. The MCTS tree stops growing at maxNodes nodes (about a
+    kilobyte each), as maxReplies bounds the alpha-beta pondering. hits,
+    misses and saved (seconds of search already done when the reply
+    arrived) are kept for report()."""
+
+    def __init__(self, maxReplies=4, maxNodes=100000):
+        self.maxReplies = maxReplies
+        self.maxNodes = maxNodes
+        self.thread = None
+        self.game = self.original = None
+        self.search = None
+        self.answers = {}
+        self.searchTimes = {}
+        self.started = 0
+        self.stopped = False
+        self.hits = self.misses = 0
+        self.saved = 0.0
+
+    def start(self, game, state, player=None):
+        """Ponder on state, where the opponent is to move. player is the engine's
+        player function (e.g. alpha_beta_player); None ponders with MCTS."""
+        self.stop()
+        self.original = game
+        # a copy keeps the search depth, deadline and clock of the real game untouched
+        self.game = copy.copy(game)
+        self.game.clock = None
+        self.game.deadline = None
+        self.game.stats = None  # pondering is not part of the move's statistics
+        self.game.evalCache = EvalCache()  # the real game's cache is not shared across threads
+        self.answers = {}
+        self.searchTimes = {}
+        self.stopped = False
+        self.started = time.perf_counter()
+        if player is None:
+            self.search = MCTS(self.game, state)
+            target = self.ponder_mcts
+        else:
+            self.search = None
+            target = lambda: self.ponder_replies(state, player)
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+
+    def ponder_replies(self, state, player):
+        for reply in likely_replies(self.game, state)[:self.maxReplies]:
+            if self.stopped:
+                return
+            after = self.game.result(state, reply)
+            if self.game.terminal_test(after):
+                continue
+            begin = time.perf_counter()
+            answer = player(self.game, after)
+            if self.stopped:
+                return  # the search was cut short; its answer is not trustworthy
+            self.answers[reply] = answer
+            self.searchTimes[reply] = time.perf_counter() - begin
+
+    def ponder_mcts(self):
+        # an iteration expands one leaf into at most one child per empty cell
+        iterations = self.maxNodes // max(1, len(self.search.state.moves))
+        self.search.monteCarloPlayer(timelimit=float('inf'), iterations=iterations)
+
+    def stop(self):
+        """Stop the pondering thread and wait for it."""
+        self.stopped = True
+        while self.thread is not None and self.thread.is_alive():
+            # the player may reset game.deadline when it starts a search, so keep asking
+            self.game.stop()
+            if self.search is not None:
+                self.search.stop()
+            self.thread.join(0.01)
+        self.thread = None
+
+    def take(self, move):
+        """The opponent played move: stop pondering and return the prepared result or None.
+        For the alpha-beta players that is the engine's move; for MCTS an MCTS object
+        rooted after move, with its search time credited in its 'pondered' attribute."""
+        if self.thread is None and self.search is None and not self.answers:
+            return None
+        elapsed = time.perf_counter() - self.started
+        self.stop()
+        result = None
+        if self.search is not None:
+            search, self.search = self.search, None
+            root = search.root
+            share = next((c.visitCount for c in root.children if c.state.move == move), 0)
+            if search.reroot(move):
+                search.game = self.original
+                search.iterations = 0
+                search.pondered = elapsed * share / max(1, root.visitCount)
+                self.saved += search.pondered
+                result = search
+        elif move in self.answers:
+            self.saved += self.searchTimes[move]
+            result = self.answers[move]
+        self.answers = {}
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def report(self):
+        """Return a one-line summary of the hit rate and the time saved."""
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return "ponder hits: {}/{} ({:.0%}), time saved: {:.2f}s".format(self.hits, total, rate, self.saved)
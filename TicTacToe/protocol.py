@@ -0,0 +1,245 @@
+"""Headless engine speaking a line-based protocol over stdin/stdout
+
+The commands follow the Gomoku (Piskvork) protocol, with 0-based "x,y"
+coordinates where x is the row and y the column:
+
+    START size          new game on a size x size board     -> OK
+    RESTART             new game, same board                -> OK
+    INFO key value      settings, see below                 -> (nothing)
+    BEGIN               the engine moves first              -> x,y
+    TURN x,y            the opponent played x,y             -> x,y
+    BOARD               set a position: lines "x,y,field"   -> x,y
+                        (field 1 = engine, 2 = opponent), then DONE
+    TAKEBACK x,y        take back the last move x,y         -> OK
+    ABOUT               engine information
+    END                 quit
+
+INFO keys: timeout_turn, timeout_match and time_left in milliseconds,
+k (stones in a row to win) and engine (random, minmax, alphabeta, mcts, smp, ybw).
+A positive timeout_match plays with a timeControl.TimeManager, which starts
+every game with the full match budget; time_left sets what it has left.
+INFO may come before or after START. k can only change while the board is
+empty.
+
+The process stays up across games. Game objects are kept per (size, k),
+so their line tables and evaluator caches survive between games. Player
+output goes to stderr, keeping stdout for protocol replies only.
+
+    python protocol.py [--trace FILE [--profile]] [--cache DIR]
+
+--trace appends a searchTrace.SearchTrace line per engine move to FILE;
+--profile adds the cProfile and tracemalloc reports to each line. --cache
+keeps a searchCache.SearchCache in DIR, so root results from earlier runs
+(or from other engine processes sharing DIR) are reused."""
+
+import argparse
+import contextlib
+import sys
+
+from games import TicTacToe, gen_state
+from players import PLAYERS, close_engines
+from session import GameSession
+from timeControl import TimeManager
+
+
+class ProtocolError(Exception):
+    """A command that cannot be carried out; reported as an ERROR line."""
+
+
+class EngineProtocol:
+    """Interpret protocol commands; handle(line) returns the reply, or None."""
+
+    def __init__(self, log=sys.stderr, trace=None, cache=None):
+        self.log = log
+        self.trace = trace  # SearchTrace shared by every game, or None
+        self.cache = cache  # SearchCache shared by every game, or None
+        self.games = {}  # (size, k) -> TicTacToe, kept warm across games
+        self.size = None
+        self.k = 0  # 0: k equals the board size
+        self.engine = 'alphabeta'
+        self.timer = 5.0
+        self.matchTime = 0.0  # timeout_match: the budget of a whole game
+        self.timeLeft = None  # time_left: what is left of it in the current game
+        self.session = None
+        self.boardLines = None  # stones collected between BOARD and DONE
+        self.finished = False
+
+    def game(self):
+        key = (self.size, self.k or self.size)
+        if key not in self.games:
+            self.games[key] = TicTacToe(self.size, key[1], self.timer)
+            self.games[key].stats = self.trace
+            self.games[key].searchCache = self.cache
+        game = self.games[key]
+        game.timer = self.timer
+        return game
+
+    def new_game(self):
+        if self.size is None:
+            raise ProtocolError('no board size: send START first')
+        game = self.game()
+        game.reset()
+        game.clock = None
+        self.timeLeft = None
+        self.session = GameSession(game)
+        self.set_clock()
+
+    def set_clock(self):
+        """Play the current game with a TimeManager while there is a match budget,
+        set to the last time_left once one has been sent."""
+        game = self.session.game
+        if self.matchTime <= 0:
+            game.clock = None
+        elif game.clock is None:
+            game.clock = TimeManager(self.matchTime if self.timeLeft is None else self.timeLeft)
+        elif self.timeLeft is not None:
+            game.clock.remaining = self.timeLeft
+
+    def parse_move(self, text):
+        try:
+            x, y = (int(v) for v in text.split(','))
+        except ValueError:
+            raise ProtocolError('bad coordinates: {}'.format(text))
+        move = (x + 1, y + 1)
+        if not self.session.legal(move):
+            raise ProtocolError('illegal move: {}'.format(text))
+        return move
+
+    def think(self):
+        """Search the current position with the chosen engine, play the move and return it."""
+        if self.session.over():
+            raise ProtocolError('the game is over')
+        player = PLAYERS[self.engine]
+        game = self.session.game
+        with contextlib.redirect_stdout(self.log):
+            move = player(game, self.session.state())
+        self.session.play(move)
+        return '{},{}'.format(move[0] - 1, move[1] - 1)
+
+    def info(self, key, value):
+        key = key.lower()
+        if key == 'timeout_turn':
+            self.timer = max(0.01, int(value) / 1000)
+        elif key == 'timeout_match':
+            self.matchTime = int(value) / 1000
+            if self.session is not None:
+                self.set_clock()
+        elif key == 'time_left':
+            self.timeLeft = int(value) / 1000
+            if self.session is not None:
+                self.set_clock()
+        elif key == 'k':
+            k = int(value)
+            if self.session is not None and (k or self.size) != self.session.game.k:
+                if self.session.board:
+                    raise ProtocolError('k cannot change during a game; send it before the first move')
+                clock = self.session.game.clock
+                self.k = k
+                self.new_game()  # the game object of the new (size, k), on the same clock
+                self.session.game.clock = clock
+            self.k = k
+        elif key == 'engine':
+            if value.lower() not in PLAYERS:
+                raise ProtocolError('unknown engine {}; use one of {}'.format(value, ', '.join(PLAYERS)))
+            self.engine = value.lower()
+        if self.session is not None:
+            self.session.game.timer = self.timer
+
+    def load_board(self):
+        mine, theirs = [], []
+        for line in self.boardLines:
+            try:
+                x, y, field = (int(v) for v in line.split(','))
+            except ValueError:
+                raise ProtocolError('bad board line: {}'.format(line))
+            (mine if field == 1 else theirs).append((x + 1, y + 1))
+        self.boardLines = None
+        # X moves first, so the side with more stones is X
+        if len(mine) == len(theirs):
+            xs, os_, me = mine, theirs, 'X'
+        elif len(theirs) == len(mine) + 1:
+            xs, os_, me = theirs, mine, 'O'
+        else:
+            raise ProtocolError('stone counts {} and {} cannot be a position'.format(len(mine), len(theirs)))
+        self.session.load(gen_state(None, to_move=me, x_positions=xs, o_positions=os_,
+                                    h=self.size, v=self.size))
+
+    def handle(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        if self.boardLines is not None:
+            if line.upper() != 'DONE':
+                self.boardLines.append(line)
+                return None
+            try:
+                self.load_board()
+                return self.think()
+            except ProtocolError as e:
+                return 'ERROR {}'.format(e)
+        command, _, rest = line.partition(' ')
+        command = command.upper()
+        try:
+            if command == 'START':
+                self.size = int(rest)
+                self.new_game()
+                return 'OK'
+            elif command == 'RESTART':
+                self.new_game()
+                return 'OK'
+            elif command == 'INFO':
+                key, _, value = rest.partition(' ')
+                self.info(key, value.strip())
+                return None
+            elif command == 'ABOUT':
+                return 'name="TicTacToe", version="1.0", country="", engines="{}"'.format(','.join(PLAYERS))
+            elif command == 'END':
+                self.finished = True
+                return None
+            if self.session is None:
+                raise ProtocolError('no game: send START first')
+            if command == 'BEGIN':
+                return self.think()
+            elif command == 'TURN':
+                self.session.play(self.parse_move(rest.strip()))
+                return self.think()
+            elif command == 'BOARD':
+                self.boardLines = []
+                return None
+            elif command == 'TAKEBACK':
+                if self.session.played and '{},{}'.format(*(v - 1 for v in self.session.played[-1])) == rest.strip():
+                    self.session.undo()
+                    return 'OK'
+                raise ProtocolError('{} is not the last move'.format(rest.strip()))
+            return 'UNKNOWN {}'.format(command)
+        except (ProtocolError, ValueError) as e:
+            return 'ERROR {}'.format(e)
+
+    def run(self, inp=sys.stdin, out=sys.stdout):
+        """Serve commands from inp until END or end of input."""
+        try:
+            for line in inp:
+                reply = self.handle(line)
+                if reply is not None:
+                    out.write(reply + '\n')
+                    out.flush()
+                if self.finished:
+                    break
+        finally:
+            close_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Headless engine speaking the Piskvork protocol.')
+    parser.add_argument('--trace', help='append a search trace per engine move to this JSONL file')
+    parser.add_argument('--profile', action='store_true', help='profile each traced search')
+    parser.add_argument('--cache', help='directory of the persistent search cache')
+    args = parser.parse_args()
+    if args.trace:
+        from searchTrace import SearchTrace  # cProfile and friends only when tracing
+    trace = SearchTrace(args.trace, profile=args.profile, memory=args.profile) if args.trace else None
+    cache = None
+    if args.cache:
+        from searchCache import SearchCache
+        cache = SearchCache(args.cache)
+    EngineProtocol(trace=trace, cache=cache).run()
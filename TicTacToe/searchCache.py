@@ -0,0 +1,266 @@
+"""Persistent search cache: root results kept on disk and shared across runs and processes
+
+    game.searchCache = SearchCache('~/.cache/tictactoe')
+    python searchCache.py --size 3 --k 3 --games 2 --dir /tmp/cache   # cold vs warm
+
+alpha_beta_player stores the result of every root search: its best move,
+value and depth, and whether the search reached the end of the game, which
+makes the position solved. Before searching it looks the position up; a
+solved position is played at once, and otherwise the cached move is searched
+first. The MCTS root plays solved positions at once as well.
+
+Positions are keyed by the smallest Zobrist key among the eight rotations
+and reflections of the board, so symmetric positions share an entry; the
+move is stored in that canonical orientation and turned back on lookup.
+Each (size, k) has its own file, named with the format VERSION, which is
+bumped whenever eval1 or the layout changes so old values are never read.
+The file is a 64-byte header (magic, VERSION, size, k, bits) followed by
+2**bits buckets of four 16-byte entries, memory-mapped shared so every
+process sees every other's entries. An entry is two 64-bit words, check =
+key ^ data and data; a reader treats a mismatch, e.g. from a write another
+process has half done, as a miss, so reading needs no locks. A store
+flushes the page it wrote to disk at once. Values depend on eval1, so
+nothing is looked up or stored while game.evaluator is set."""
+
+import argparse
+import contextlib
+import io
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from collections import namedtuple
+
+from games import SearchTimeout, TicTacToe, alpha_beta_player, cutoff_searchers, zobrist_key
+
+VERSION = 1
+MAGIC = b'TTTC'
+HEADER = 64  # bytes before the first bucket
+WAYS = 4  # entries per bucket
+SOLVED = 1 << 8
+SCORE_BIAS = 1 << 38  # scores take the top 39 bits of an entry
+SCORE_INF = SCORE_BIAS - 1
+
+Hit = namedtuple('Hit', 'move, score, depth, solved')
+
+# the eight symmetries of an n x n board, as maps of 1-based (x, y)
+TRANSFORMS = (lambda x, y, n: (x, y), lambda x, y, n: (y, n + 1 - x),
+              lambda x, y, n: (n + 1 - x, n + 1 - y), lambda x, y, n: (n + 1 - y, x),
+              lambda x, y, n: (x, n + 1 - y), lambda x, y, n: (n + 1 - x, y),
+              lambda x, y, n: (y, x), lambda x, y, n: (n + 1 - y, n + 1 - x))
+
+
+def symmetries(size):
+    """Return the eight symmetries of the board as {cell: image} dicts, and their inverses."""
+    cells = [(x, y) for x in range(1, size + 1) for y in range(1, size + 1)]
+    forward = [{c: t(c[0], c[1], size) for c in cells} for t in TRANSFORMS]
+    inverse = [{image: c for c, image in f.items()} for f in forward]
+    return forward, inverse
+
+
+class CacheFile:
+    """The memory-mapped table of one (size, k); created, or recreated when its
+    header does not match, on open."""
+
+    def __init__(self, path, size, k, bits=16):
+        self.path = path
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        length = HEADER + (self.mask + 1) * WAYS * 16
+        header = struct.pack('<4sIIII', MAGIC, VERSION, size, k, bits).ljust(HEADER, b'\0')
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.path.getsize(path) != length or os.pread(fd, HEADER, 0) != header:
+                os.ftruncate(fd, 0)  # another version or layout: start afresh
+                os.ftruncate(fd, length)
+                os.pwrite(fd, header, 0)
+            self.mm = mmap.mmap(fd, length, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self.words = memoryview(self.mm).cast('Q')
+        self.probes = 0
+        self.hits = 0
+
+    def slots(self, key):
+        first = HEADER // 8 + ((key & self.mask) * WAYS << 1)
+        return range(first, first + 2 * WAYS, 2)
+
+    def probe(self, key):
+        """Return (move index, score, depth, solved) stored for key, or None."""
+        self.probes += 1
+        words = self.words
+        for i in self.slots(key):
+            data = words[i + 1]
+            if data and words[i] ^ data == key:
+                self.hits += 1
+                score = (data >> 25) - SCORE_BIAS
+                if abs(score) == SCORE_INF:
+                    score = math.copysign(math.inf, score)
+                return ((data >> 9) & 0xffff) - 1, score, data & 0xff, bool(data & SOLVED)
+        return None
+
+    def store(self, key, move, score, depth, solved):
+        """Keep the entry unless the bucket holds a better one for key: solved, or deeper.
+        A new key replaces an empty entry, else the shallowest unsolved one."""
+        if math.isinf(score):
+            score = math.copysign(SCORE_INF, score)
+        elif score != int(score) or abs(score) >= SCORE_INF:
+            return  # only integer scores fit
+        data = min(depth, 0xff) | (SOLVED if solved else 0) | (move + 1) << 9 | (int(score) + SCORE_BIAS) << 25
+        words = self.words
+        victim = None
+        for i in self.slots(key):
+            old = words[i + 1]
+            if old and words[i] ^ old == key:
+                if (old & SOLVED and not solved) or (old & SOLVED) == (data & SOLVED) and old & 0xff > depth:
+                    return
+                victim = i
+                break
+            rank = (not old, not old & SOLVED, -(old & 0xff))
+            if victim is None or rank > best:
+                victim, best = i, rank
+        words[victim + 1] = data
+        words[victim] = key ^ data
+        # an entry never straddles a page, so syncing its page is enough
+        page = victim * 8 & -mmap.PAGESIZE
+        self.mm.flush(page, min(mmap.PAGESIZE, len(self.mm) - page))
+
+    def close(self):
+        self.words.release()
+        self.mm.flush()
+        self.mm.close()
+
+
+class SearchCache:
+    """Root search results for every (size, k), in CacheFiles under directory."""
+
+    def __init__(self, directory, bits=16):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.bits = bits
+        self.files = {}
+        self.symmetries = {}
+
+    def file(self, game):
+        key = (game.size, game.k)
+        if key not in self.files:
+            name = 'search-{0}x{0}-k{1}-v{2}.cache'.format(game.size, game.k, VERSION)
+            self.files[key] = CacheFile(os.path.join(self.directory, name), game.size, game.k, self.bits)
+            self.symmetries[game.size] = symmetries(game.size)
+        return self.files[key]
+
+    def canonical(self, game, state):
+        """Return (key, symmetry) for the orientation of state with the smallest Zobrist key."""
+        table = game.zobrist()
+        keys = [(zobrist_key(table, {f[c]: p for c, p in state.board.items()}, state.to_move), s)
+                for s, f in enumerate(self.symmetries[game.size][0])]
+        return min(keys)
+
+    def lookup(self, game, state):
+        """Return the Hit for state, with the move in the orientation of state, or None."""
+        if game.evaluator is not None:
+            return None
+        table = self.file(game)
+        key, s = self.canonical(game, state)
+        entry = table.probe(key)
+        if entry is None or entry[0] < 0:
+            return None
+        move, score, depth, solved = entry
+        move = self.symmetries[game.size][1][s].get((move // game.size + 1, move % game.size + 1))
+        return Hit(move, score, depth, solved) if move in state.moves else None
+
+    def store(self, game, state, move, score, depth, solved=False):
+        """Record the root result move/score of a search of state to depth."""
+        if game.evaluator is not None or move is None or score is None:
+            return
+        table = self.file(game)
+        key, s = self.canonical(game, state)
+        x, y = self.symmetries[game.size][0][s][move]
+        table.store(key, (x - 1) * game.size + y - 1, score, depth, solved)
+
+    def searcher(self, hit=None, keep_best=False):
+        """The search for alpha_beta_player to run: scored_search, trying the cached move first."""
+        return scored_search(hit.move if hit is not None else None, keep_best)
+
+    def close(self):
+        for table in self.files.values():
+            table.close()
+        self.files = {}
+
+
+def scored_search(first=None, keep_best=False):
+    """Return a search(game, pos) for iterative_deepening: alpha_beta_cutoff with the
+    move first tried first, leaving the root value of its last search in search.score.
+    A SearchTimeout goes on to the caller, which discards the iteration; with keep_best,
+    it ends the search like alpha_beta's, with the best root move found so far, and
+    search.stopped is set so the caller does not take the score for a finished one."""
+    def search(game, pos):
+        _, min_value = cutoff_searchers(game, pos)
+        actions = list(game.moveOrder(pos) if game.moveOrder else game.actions(pos))
+        if first in actions:
+            actions.remove(first)
+            actions.insert(0, first)
+        alpha = -math.inf
+        best_action = None
+        ply = len(pos.history)
+        search.stopped = False
+        try:
+            for action in actions:
+                pos.make(action)
+                value = min_value(pos, alpha, math.inf, game.d)
+                pos.unmake()
+                if value > alpha:
+                    alpha = value
+                    best_action = action
+        except SearchTimeout:
+            if not keep_best:
+                raise
+            # stopped from outside (game.stop()): keep the best root move found so far
+            pos.rewind(ply)
+            search.stopped = True
+        search.score = alpha
+        return best_action
+
+    search.score = None
+    search.stopped = False
+    return search
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Self-play alpha-beta games with a cold and then a warm cache.')
+    parser.add_argument('--size', type=int, default=3)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--timer', type=float, default=-1, help='seconds per move; -1 searches every move fully')
+    parser.add_argument('--games', type=int, default=2, help='games per run')
+    parser.add_argument('--dir', help='cache directory (default: a temporary one)')
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix='searchCache-')
+    try:
+        for run in ('cold', 'warm'):
+            game = TicTacToe(args.size, args.k, args.timer)
+            game.searchCache = SearchCache(directory)
+            start = time.perf_counter()
+            nodes = 0
+            for _ in range(args.games):
+                state = game.initial
+                with contextlib.redirect_stdout(io.StringIO()):
+                    while not game.terminal_test(state):
+                        game.nodes = 0
+                        state = game.result(state, alpha_beta_player(game, state))
+                        nodes += game.nodes
+            elapsed = time.perf_counter() - start
+            table = game.searchCache.file(game)
+            print('{}: {} games in {:.3f}s, {} nodes searched, {}/{} cache hits'.format(
+                run, args.games, elapsed, nodes, table.hits, table.probes))
+            game.searchCache.close()
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Search traces: what a move's search explored, streamed to a JSONL file
+
+Tracing is opt-in: set game.stats = SearchTrace('trace.jsonl'). SearchTrace is
+a stats.SearchStats, so the players drive it exactly as they drive the plain
+statistics and nothing runs when game.stats is None. Every move appends one
+JSON line holding the SearchStats record plus
+
+    board, to_move      the position searched, board as [x, y, player] triples
+    iterations          for iterative deepening, one entry per completed depth:
+                        depth, move, score, pv, nodes and seconds
+    root                for MCTS, the root children by visits: move, visits,
+                        mean score and the tree's playout count
+    profile             with profile=True, the `top` hottest functions of the
+                        search under cProfile: function, calls, tottime, cumtime
+    memory              with memory=True, the peak traced allocation and the
+                        `top` allocating source lines under tracemalloc
+
+The principal variation of an iteration is rebuilt after the iteration by
+letting the searcher choose a move at each ply of the line, one depth less
+at each step; its score is the value of the position at the end of the line,
+the value alpha_beta_cutoff backs up to the root. That costs about as much as
+the iteration itself and counts against the move's time, so trace for
+diagnosis, not for play."""
+
+import io
+import json
+import time
+
+from stats import SearchStats
+
+
+def principal_variation(game, pos, search, first, depth):
+    """Return (pv, score) for the line starting with first that search expects from pos at depth."""
+    saved = game.d, game.deadline, game.stats
+    counts = pos.nodes, pos.pruned  # the rebuild is not part of the search
+    rootScore = getattr(search, 'score', None)  # searchCache.scored_search keeps the root value here
+    game.deadline = game.stats = None
+    player = pos.to_move
+    evaluate = game.evaluator or game.eval1
+    pv = []
+    try:
+        move, d = first, depth
+        while move is not None:
+            pv.append(move)
+            pos.make(move)
+            d -= 1
+            if d < 0 or pos.utility != 0 or not pos.moves:
+                break
+            game.d = d
+            move = search(game, pos)
+        score = game.utility(pos, player) if pos.utility != 0 or not pos.moves else evaluate(pos)
+    finally:
+        for _ in pv:
+            pos.unmake()
+        game.d, game.deadline, game.stats = saved
+        pos.nodes, pos.pruned = counts
+        if hasattr(search, 'score'):
+            search.score = rootScore
+    return pv, score
+
+
+class SearchTrace(SearchStats):
+    """SearchStats that also writes a trace line per move to path (or an open file)."""
+
+    def __init__(self, path, profile=False, memory=False, top=15):
+        self.out = open(path, 'a') if isinstance(path, str) else path
+        self.profile = profile
+        self.memory = memory
+        self.top = top
+        self.profiler = None
+        self.position = None
+        self.trace = {}
+        super().__init__()
+
+    def begin(self, searcher, pos=None):
+        super().begin(searcher)
+        self.trace = {'iterations': []}
+        if pos is not None:
+            self.trace['board'] = [[x, y, p] for (x, y), p in pos.board.items()]
+            self.trace['to_move'] = pos.to_move
+        if self.memory:
+            import tracemalloc  # the profiling modules load only when they are used
+            tracemalloc.start()
+        if self.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def iteration(self, game, pos, search, move, seconds):
+        if move is None:
+            return
+        pv, score = principal_variation(game, pos, search, move, game.d)
+        self.trace['iterations'].append({'depth': game.d, 'move': move, 'score': score, 'pv': pv,
+                                         'nodes': pos.nodes, 'seconds': seconds})
+
+    def root(self, search):
+        children = sorted(search.root.children, key=lambda nd: nd.visitCount, reverse=True)
+        self.trace['root'] = {'playouts': search.root.visitCount,
+                              'children': [{'move': nd.state.move, 'visits': nd.visitCount,
+                                            'score': nd.winScore / nd.visitCount if nd.visitCount else 0.0}
+                                           for nd in children]}
+
+    def finish(self, move, pos=None):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.trace['profile'] = self.hot_functions(self.profiler)
+            self.profiler = None
+        if self.memory:
+            import tracemalloc
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.trace['memory'] = {'peakBytes': peak,
+                                    'lines': [{'line': str(s.traceback[0]), 'bytes': s.size, 'count': s.count}
+                                              for s in snapshot.statistics('lineno')[:self.top]]}
+        record = super().finish(move, pos)
+        line = dict(record, **self.trace)
+        self.out.write(json.dumps(line) + '\n')
+        self.out.flush()
+        return record
+
+    def hot_functions(self, profiler):
+        import pstats
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return [{'function': '{}:{}({})'.format(*func), 'calls': nc, 'tottime': tt, 'cumtime': ct}
+                for func, (cc, nc, tt, ct, callers) in rows]
+
+    def close(self):
+        self.out.close()
@@ -0,0 +1,309 @@
+"""Asyncio engine service: many game sessions, one bounded pool of search workers
+
+Clients connect over localhost TCP or a Unix socket and send one JSON object
+per line; every request gets one JSON reply line, carrying the request "id"
+back when one was given. Operations:
+
+    {"op": "new", "size": 3, "k": 3}                   -> {"session": 1}
+    {"op": "play", "session": 1, "move": [2, 2]}       -> {"utility": 0, "over": false}
+    {"op": "think", "session": 1, "engine": "alphabeta",
+     "timer": 1.0, "deadline": 5.0}                    -> {"move": [1, 1], "utility": 0, "over": false}
+    {"op": "state", "session": 1}                      -> {"board": [[x, y, "X"], ...], "to_move": "O"}
+    {"op": "close", "session": 1}                      -> {}
+    {"op": "stats"}                                    -> throughput and latency figures
+
+Sessions live in the service process, while searches run in a
+ProcessPoolExecutor whose workers keep their game objects warm between jobs.
+At most `workers` searches run at a time and at most `maxQueue` wait for a
+worker; beyond that "think" is refused with {"error": "busy"}. A "think"
+whose deadline (seconds from its arrival) passes while it is queued or
+running is answered with {"error": "deadline exceeded"}."""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from games import TicTacToe
+from players import PLAYERS, close_engines
+from session import GameSession
+
+# ______________________________________________________________________________
+# Worker side
+
+_workerGames = {}
+MIN_TIMER = 0.01  # seconds; a timer of zero or less would ask the players for an unbounded search
+
+
+def _warm_worker():
+    """Pool initializer: pay the imports once per worker process."""
+    import games, monteCarlo, players  # noqa: F401
+
+
+def search_job(size, k, engine, timer, state):
+    """Run in a worker: return the engine's move for state and the search time."""
+    key = (size, k)
+    if key not in _workerGames:
+        _workerGames[key] = TicTacToe(size, k)
+    game = _workerGames[key]
+    game.timer = timer
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        move = PLAYERS[engine](game, state)
+    return move, time.perf_counter() - start
+
+
+def job_timer(timer, remaining):
+    """The search time of a job that must be answered within remaining seconds (None: no
+    deadline): at most 90% of them, so the reply is in time, and never below MIN_TIMER."""
+    if remaining is None:
+        return timer
+    budget = 0.9 * remaining
+    return max(MIN_TIMER, budget if timer < 0 else min(timer, budget))
+
+
+# ______________________________________________________________________________
+# Service side
+
+class ServiceError(Exception):
+    """A request that cannot be served; reported as {"error": message}."""
+
+
+class EngineService:
+    """Serve game sessions over a socket and dispatch searches to a process pool."""
+
+    def __init__(self, workers=2, maxQueue=16, defaultTimer=1.0, window=1000):
+        self.workers = workers
+        self.maxQueue = maxQueue
+        self.defaultTimer = defaultTimer
+        self.pool = None
+        self.slots = None
+        self.sessions = {}
+        self.games = {}
+        self.nextSession = 1
+        self.waiting = 0
+        self.running = 0
+        self.started = time.perf_counter()
+        self.counts = {'requests': 0, 'searches': 0, 'busy': 0, 'deadline': 0, 'errors': 0}
+        # the latency figures cover the last `window` searches, so memory stays bounded
+        self.queueLatency = collections.deque(maxlen=window)  # seconds from arrival to dispatch
+        self.searchTime = collections.deque(maxlen=window)  # seconds spent in the worker
+        self.server = None
+        self.clients = set()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Start the pool and listen; return the bound address (host, port) or the socket path."""
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_warm_worker)
+        self.slots = asyncio.Semaphore(self.workers)
+        if path:
+            self.server = await asyncio.start_unix_server(self.serve_client, path=path)
+            return path
+        self.server = await asyncio.start_server(self.serve_client, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for task in list(self.clients):
+                task.cancel()
+            await asyncio.gather(*self.clients, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        close_engines()
+
+    async def serve_client(self, reader, writer):
+        task = asyncio.current_task()
+        self.clients.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.handle_line(line)
+                writer.write((json.dumps(reply) + '\n').encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # client gone, or the service is shutting down
+        finally:
+            self.clients.discard(task)
+            writer.close()
+
+    async def handle_line(self, line):
+        self.counts['requests'] += 1
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                request = {}
+                raise ServiceError('a request must be a JSON object')
+            reply = await self.handle(request)
+        except (ServiceError, ValueError, KeyError, TypeError) as e:
+            self.counts['errors'] += 1
+            reply = {'error': str(e)}
+        if 'id' in request:
+            reply['id'] = request['id']
+        return reply
+
+    def session(self, request):
+        sid = request['session']
+        if sid not in self.sessions:
+            raise ServiceError('no session {}'.format(sid))
+        return self.sessions[sid]
+
+    def game(self, size, k):
+        if (size, k) not in self.games:
+            self.games[(size, k)] = TicTacToe(size, k)
+        return self.games[(size, k)]
+
+    async def handle(self, request):
+        op = request.get('op')
+        if op == 'new':
+            size = int(request.get('size', 3))
+            k = int(request.get('k', size))
+            sid = self.nextSession
+            self.nextSession += 1
+            self.sessions[sid] = GameSession(self.game(size, k))
+            return {'session': sid}
+        elif op == 'play':
+            session = self.session(request)
+            move = tuple(request['move'])
+            if not session.legal(move):
+                raise ServiceError('illegal move {}'.format(list(move)))
+            session.play(move)
+            return {'utility': session.position.utility, 'over': session.over()}
+        elif op == 'think':
+            return await self.think(request)
+        elif op == 'state':
+            session = self.session(request)
+            return {'board': [[x, y, p] for (x, y), p in session.board.items()],
+                    'to_move': session.to_move, 'over': session.over()}
+        elif op == 'close':
+            self.sessions.pop(request['session'], None)
+            return {}
+        elif op == 'stats':
+            return self.stats()
+        raise ServiceError('unknown op {}'.format(op))
+
+    async def think(self, request):
+        arrived = time.perf_counter()
+        session = self.session(request)
+        engine = request.get('engine', 'alphabeta')
+        if engine not in PLAYERS:
+            raise ServiceError('unknown engine {}'.format(engine))
+        if session.over():
+            raise ServiceError('the game is over')
+        if self.waiting >= self.maxQueue:
+            self.counts['busy'] += 1
+            return {'error': 'busy'}
+        timer = float(request.get('timer', self.defaultTimer))
+        deadline = request.get('deadline')
+        deadline = arrived + float(deadline) if deadline is not None else None
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), None if deadline is None else deadline - arrived)
+        except asyncio.TimeoutError:
+            self.counts['deadline'] += 1
+            return {'error': 'deadline exceeded'}
+        finally:
+            self.waiting -= 1
+
+        dispatched = time.perf_counter()
+        self.queueLatency.append(dispatched - arrived)
+        if deadline is not None and dispatched >= deadline:
+            self.slots.release()  # expired while it got its slot: never dispatched
+            self.counts['deadline'] += 1
+            return {'error': 'deadline exceeded'}
+        timer = job_timer(timer, None if deadline is None else deadline - dispatched)
+        self.running += 1
+        state = session.state()
+        job = asyncio.get_running_loop().run_in_executor(
+            self.pool, search_job, session.game.size, session.game.k, engine, timer, state)
+        job.add_done_callback(self.job_done)
+        try:
+            move, elapsed = await asyncio.wait_for(
+                asyncio.shield(job), None if deadline is None else max(0.0, deadline - dispatched))
+        except asyncio.TimeoutError:
+            # the worker cannot be interrupted; job_done frees its slot when it finishes
+            self.counts['deadline'] += 1
+            return {'error': 'deadline exceeded'}
+        self.searchTime.append(elapsed)
+        self.counts['searches'] += 1
+        if session.state() is not state:
+            raise ServiceError('the session changed during the search')
+        session.play(tuple(move))
+        return {'move': list(move), 'utility': session.position.utility, 'over': session.over()}
+
+    def job_done(self, job):
+        self.running -= 1
+        self.slots.release()
+
+    def stats(self):
+        """Return counters and throughput since start, and the latency figures of the
+        last `window` searches."""
+        uptime = time.perf_counter() - self.started
+
+        def summary(values):
+            if not values:
+                return {'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+            ordered = sorted(values)
+            return {'mean': statistics.fmean(ordered),
+                    'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                    'max': ordered[-1]}
+
+        return dict(self.counts, sessions=len(self.sessions), waiting=self.waiting, running=self.running,
+                    uptime=uptime, throughput=self.counts['searches'] / uptime if uptime else 0.0,
+                    queueLatency=summary(self.queueLatency), searchTime=summary(self.searchTime))
+
+
+class ServiceClient:
+    """Minimal asyncio client: await client.request(op='new', size=3)."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=None, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, **request):
+        self.writer.write((json.dumps(request) + '\n').encode())
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(args):
+    service = EngineService(args.workers, args.queue, args.timer, args.window)
+    address = await service.start(args.host, args.port, args.unix)
+    print('serving on', address, flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--queue', type=int, default=16, help='searches allowed to wait for a worker')
+    parser.add_argument('--timer', type=float, default=1.0, help='default search time in seconds')
+    parser.add_argument('--window', type=int, default=1000, help='searches the latency figures cover')
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""Game sessions: the state of one game being played, updated move by move"""
+
+from games import GameState, SearchPosition
+
+
+class GameSession:
+    """Own the current state of one game and apply moves incrementally.
+
+    The board lives in a SearchPosition, so play() and undo() only touch the
+    moved cell and the lines through it instead of rebuilding the state.
+    state() hands engines a GameState snapshot, built once per position and
+    reused until the next move. Many sessions may share one game object."""
+
+    def __init__(self, game):
+        self.game = game
+        self.reset()
+
+    def reset(self):
+        """Start a new game."""
+        self.load(self.game.initial)
+
+    def load(self, state):
+        """Continue from state, e.g. one built with gen_state(); undo stops there."""
+        self.base = state
+        self.played = []
+        self.k = self.game.k
+        self.position = SearchPosition(self.game, state)
+        self.snapshot = None
+
+    def refresh(self):
+        """Rebuild the position after game.k was changed, keeping the moves played.
+        Raise ValueError, leaving the session as it was, if they are not a legal
+        game under the new k, e.g. one already won before its last move."""
+        position = SearchPosition(self.game, self.base)
+        for move in self.played:
+            if position.utility != 0 or move not in position.index:
+                raise ValueError('the moves played are not a legal game with k={}'.format(self.game.k))
+            position.make(move)
+        self.k = self.game.k
+        self.position = position
+        self.snapshot = None
+
+    @property
+    def to_move(self):
+        return self.position.to_move
+
+    @property
+    def board(self):
+        return self.position.board
+
+    def legal(self, move):
+        return move in self.position.index and not self.over()
+
+    def play(self, move):
+        """Play move for the side to move; return the utility of the new position."""
+        if self.game.k != self.k:
+            self.refresh()
+        if not self.legal(move):
+            raise ValueError('illegal move {} in this position'.format(move))
+        self.position.make(move)
+        self.played.append(move)
+        self.snapshot = None
+        return self.position.utility
+
+    def undo(self):
+        """Take back the last move; return it, or None at the start of the game."""
+        if not self.played:
+            return None
+        self.position.unmake()
+        self.snapshot = None
+        return self.played.pop()
+
+    def over(self):
+        """True once the game is won or the board is full."""
+        return self.position.utility != 0 or not self.position.moves
+
+    def winner(self):
+        """'X' or 'O' for a won game, None otherwise."""
+        utility = self.position.utility
+        return 'X' if utility > 0 else 'O' if utility < 0 else None
+
+    def state(self):
+        """Return the current position as a GameState, ready to pass to an engine."""
+        if self.snapshot is None:
+            pos = self.position
+            self.snapshot = GameState(to_move=pos.to_move, move=pos.move, utility=pos.utility,
+                                      board=dict(pos.board), moves=list(pos.moves))
+        return self.snapshot
+
+    def __len__(self):
+        return len(self.played)
+
+    def __repr__(self):
+        return '<GameSession {} moves, {} to move>'.format(len(self.played), self.position.to_move)
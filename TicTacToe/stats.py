@@ -0,0 +1,145 @@
+"""Structured per-move search statistics
+
+Set game.stats = SearchStats() to collect them; with game.stats None (the
+default) the searchers skip all of it. The players call begin() when a move's
+search starts and finish() when it returns, so after each move game.stats.last
+holds that move's record and game.stats.history every record so far:
+
+    searcher        'minmax', 'alphabeta' or 'mcts'
+    move, time      the move returned and the seconds it took
+    nodes           positions made during the search (MCTS: tree nodes created)
+    leaves          terminal positions reached, including dead draws
+    evals           cutoff positions scored by the evaluation function
+    cutoffs         alpha-beta cutoffs
+    ttProbes/ttHits transposition table or cache lookups and hits
+    maxDepth        deepest ply below the root that was reached
+    depth           deepest completed iterative-deepening depth
+    branching       average moves searched per interior node
+    pruned          dead draws cut off by terminal_test
+    iterations      MCTS playouts (one rollout each)
+    treeSize        MCTS tree nodes, the root included
+    phases          seconds by phase: eval, aborted (the iteration cut off by
+                    the time limit) and search for alpha-beta; select,
+                    expand, simulate and backprop for MCTS"""
+
+import statistics
+import time
+
+
+class SearchStats:
+    """Collect the statistics of one search at a time and keep the finished records."""
+
+    def __init__(self):
+        self.history = []
+        self.reset()
+
+    def reset(self):
+        self.searcher = None
+        self.started = time.perf_counter()
+        self.nodes = 0
+        self.tests = 0
+        self.leaves = 0
+        self.evals = 0
+        self.cutoffs = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.maxDepth = 0
+        self.depth = 0
+        self.pruned = 0
+        self.iterations = 0
+        self.treeSize = 0
+        self.phases = {}
+
+    def begin(self, searcher, pos=None):
+        """Start counting a new move's search from pos."""
+        self.reset()
+        self.searcher = searcher
+
+    def iteration(self, game, pos, search, move, seconds):
+        """Called after each completed iterative-deepening iteration; see searchTrace."""
+
+    def root(self, search):
+        """Called with the MCTS object when its search ends; see searchTrace."""
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def interior(self):
+        """Positions that were expanded rather than scored."""
+        return self.tests - self.leaves - self.evals
+
+    @property
+    def branching(self):
+        return self.nodes / self.interior if self.interior > 0 else 0.0
+
+    def wrap(self, pos, terminal_test, evaluate):
+        """Return counting versions of terminal_test and evaluate for a search rooted at pos.
+        Searchers call these in place of the originals only when stats are enabled."""
+        root = len(pos.history)
+
+        def counted_terminal_test(state):
+            self.tests += 1
+            depth = len(state.history) - root
+            if depth > self.maxDepth:
+                self.maxDepth = depth
+            if terminal_test(state):
+                self.leaves += 1
+                return True
+            return False
+
+        def counted_evaluate(state):
+            start = time.perf_counter()
+            value = evaluate(state)
+            self.phases['eval'] = self.phases.get('eval', 0.0) + time.perf_counter() - start
+            self.evals += 1
+            return value
+
+        return counted_terminal_test, counted_evaluate
+
+    def finish(self, move, pos=None):
+        """Close the current search; pos, if given, supplies the node and dead-draw counts.
+        Return the record, which is also appended to history."""
+        elapsed = time.perf_counter() - self.started
+        if pos is not None:
+            self.nodes = pos.nodes
+            self.pruned = pos.pruned
+        if self.searcher != 'mcts':
+            self.phases['search'] = max(0.0, elapsed - sum(self.phases.values()))
+        record = self.as_dict()
+        record['move'] = move
+        record['time'] = elapsed
+        self.history.append(record)
+        return record
+
+    def as_dict(self):
+        return {'searcher': self.searcher, 'nodes': self.nodes, 'leaves': self.leaves, 'evals': self.evals,
+                'cutoffs': self.cutoffs, 'ttProbes': self.ttProbes, 'ttHits': self.ttHits,
+                'maxDepth': self.maxDepth, 'depth': self.depth, 'branching': self.branching,
+                'pruned': self.pruned, 'iterations': self.iterations, 'treeSize': self.treeSize,
+                'phases': dict(self.phases)}
+
+    @property
+    def last(self):
+        return self.history[-1] if self.history else None
+
+    def summary(self):
+        """Totals and per-move means over history, e.g. to compare two timer settings."""
+        if not self.history:
+            return {}
+        moves = len(self.history)
+        seconds = sum(r['time'] for r in self.history)
+        nodes = sum(r['nodes'] for r in self.history)
+        phases = {}
+        for r in self.history:
+            for phase, t in r['phases'].items():
+                phases[phase] = phases.get(phase, 0.0) + t
+        return {'moves': moves, 'time': seconds, 'nodes': nodes,
+                'nodesPerSec': nodes / seconds if seconds else 0.0,
+                'meanTime': seconds / moves, 'maxTime': max(r['time'] for r in self.history),
+                'meanDepth': statistics.fmean(r['depth'] or r['maxDepth'] for r in self.history),
+                'cutoffs': sum(r['cutoffs'] for r in self.history),
+                'phases': phases}
+
+    def __repr__(self):
+        return '<SearchStats {} moves, {} nodes this search>'.format(len(self.history), self.nodes)
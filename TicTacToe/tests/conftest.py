@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of the game live flat in TicTacToe/ and import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
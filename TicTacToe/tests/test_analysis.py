@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+
+from analysis import analyze, multipv_search
+from games import TicTacToe, alpha_beta_cutoff, cutoff_searchers
+
+
+def random_state(game, rng, stones):
+    state = game.initial
+    while len(state.board) < stones and not game.terminal_test(state):
+        state = game.result(state, rng.choice(state.moves))
+    return state
+
+
+def exact_values(game, pos):
+    """The full-window alpha_beta_cutoff value of every root move, in root order."""
+    _, min_value = cutoff_searchers(game, pos)
+    values = []
+    for move in list(pos.moves):
+        pos.make(move)
+        values.append((min_value(pos, -math.inf, math.inf, game.d), move))
+        pos.unmake()
+    return values
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('n', [1, 3])
+def test_multipv_lines_are_the_best_moves_with_exact_scores(seed, n):
+    rng = random.Random(seed)
+    game = TicTacToe(4, 3)
+    game.d = 2
+    state = random_state(game, rng, 2 + seed % 3)
+    pos = game.position(state)
+    lines = multipv_search(game, pos, n)
+    assert len(pos.history) == 0
+
+    assert lines[0][1] == alpha_beta_cutoff(game, state)
+    values = exact_values(game, pos)
+    exact = dict((move, value) for value, move in values)
+    assert [score for score, move in lines] == [exact[move] for score, move in lines]  # no bounds
+    best = sorted((value for value, _ in values), reverse=True)[:n]
+    assert [score for score, _ in lines] == best
+    assert len({move for _, move in lines}) == len(lines) == min(n, len(state.moves))
+
+
+def test_analyze_gives_each_line_its_principal_variation():
+    game = TicTacToe(3, 3)
+    state = game.initial
+    for move in ((2, 2), (1, 1), (1, 2)):
+        state = game.result(state, move)
+    lines = analyze(game, state, n=3, depth=3)
+    search = TicTacToe(3, 3)
+    search.d = 3
+    assert len(lines) == 3 and lines[0].move == alpha_beta_cutoff(search, state)
+    for line in lines:
+        assert line.pv[0] == line.move and line.visits is None
+    assert lines[0].score >= lines[1].score >= lines[2].score
+    assert game.d == -1 and game.deadline is None  # the game itself is left untouched
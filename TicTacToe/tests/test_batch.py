@@ -0,0 +1,47 @@
+import pytest
+
+from batch import analyze_batch, analyze_one, parse_position, read_positions
+
+
+def test_parse_compact_and_json():
+    assert parse_position('5:4 3,3 2,2') == (5, 4, 'X', [(3, 3)], [(2, 2)], [(3, 3), (2, 2)])
+    assert parse_position('1,1')[:3] == (3, 3, 'O')
+    size, k, to_move, xs, os_, moves = parse_position(
+        '{"h": 4, "k": 3, "to_move": "O", "x_positions": [[1, 1]], "o_positions": []}')
+    assert (size, k, to_move, xs, os_, moves) == (4, 3, 'O', [(1, 1)], [], None)
+    for bad in ('3 1,1 1,1', '3 4,4', '3 1', '{"h": 3, "v": 4}', '{"to_move": "Z"}'):
+        with pytest.raises(ValueError):
+            parse_position(bad)
+
+
+def test_read_positions_skips_comments_and_blanks():
+    assert list(read_positions(['# x\n', '\n', '3 1,1\n', '  \n', '2,2'])) == [(3, '3 1,1'), (5, '2,2')]
+
+
+def job(text, engine='alphabeta', seconds=0.1, lines=1):
+    return 1, text, engine, seconds, None, lines, 0
+
+
+def test_finished_games_and_errors_get_their_records():
+    assert analyze_one(job('3 1,1 2,2 1,2 3,3 1,3'))['over'] is True
+    assert analyze_one(job('3 1,1 2,2 1,2 3,3 1,3 3,1'))['error'] == 'moves after the end of the game'
+    assert 'error' in analyze_one(job('nonsense'))
+
+
+def test_a_search_without_a_move_is_recorded_not_raised():
+    record = analyze_one(job('3 1,1', 'mcts', 0.0, lines=2))
+    assert record['move'] is None and record['pv'] == [] and record['lines'] == []
+
+
+def test_analysis_records():
+    record = analyze_one(job('3 1,1 2,2 1,2', lines=2))
+    assert record['move'] == (1, 3) and record['pv'][0] == (1, 3) and len(record['lines']) == 2
+    assert analyze_one(job('3 1,1', 'random'))['move'] in [(x, y) for x in (1, 2, 3) for y in (1, 2, 3)]
+
+
+def test_batch_keeps_input_order():
+    positions = [(n, '3 ' + ' '.join('{},{}'.format(*c) for c in cells))
+                 for n, cells in enumerate([[], [(2, 2)], [(1, 1), (2, 2)], [(5, 5)]], 1)]
+    records = list(analyze_batch(positions, 'random', workers=1, window=2))
+    assert [r['line'] for r in records] == [1, 2, 3, 4]
+    assert 'error' in records[3]
@@ -0,0 +1,99 @@
+import math
+import random
+
+import pytest
+
+from games import TicTacToe
+
+np = pytest.importorskip('numpy')
+from convEval import ConvEvaluator  # noqa: E402
+
+
+def random_states(game, rng, count):
+    """States of random games, stopped at random points."""
+    for _ in range(count):
+        state = game.initial
+        for _ in range(rng.randrange(len(game.initial.moves))):
+            if game.terminal_test(state):
+                break
+            state = game.result(state, rng.choice(state.moves))
+        yield state
+
+
+def brute_counts(game, board):
+    """For X and O, the open windows holding m stones, from game.windows()."""
+    xCount, oCount = [0] * (game.k + 1), [0] * (game.k + 1)
+    for window in game.windows()[0]:
+        x = sum(board.get(c) == 'X' for c in window)
+        o = sum(board.get(c) == 'O' for c in window)
+        if o == 0:
+            xCount[x] += 1
+        if x == 0:
+            oCount[o] += 1
+    return xCount, oCount
+
+
+def brute_cell_scores(game, board, orderWeights):
+    scores = {}
+    for window in game.windows()[0]:
+        x = sum(board.get(c) == 'X' for c in window)
+        o = sum(board.get(c) == 'O' for c in window)
+        value = (orderWeights[x] if o == 0 else 0) + (orderWeights[o] if x == 0 else 0)
+        for cell in window:
+            scores[cell] = scores.get(cell, 0) + value
+    return scores
+
+
+@pytest.mark.parametrize('size, k', [(3, 3), (4, 3), (5, 4), (6, 4), (6, 6), (7, 2), (3, 4)])
+def test_counts_and_scores_match_brute_force(size, k):
+    rng = random.Random(size * 10 + k)
+    game = TicTacToe(size, k)
+    evaluator = ConvEvaluator(game)
+    for state in random_states(game, rng, 20):
+        xCount, oCount = evaluator.counts(state)
+        assert (xCount.tolist(), oCount.tolist()) == brute_counts(game, state.board)
+        value = evaluator(state)
+        if abs(state.utility) == k:
+            assert math.isinf(value)
+        else:
+            bx, bo = brute_counts(game, state.board)
+            score = sum(w * (a - b) for w, a, b in zip(evaluator.weights, bx, bo))
+            assert value == (score if state.to_move == 'X' else -score)
+        scores = evaluator.cell_scores(state)
+        brute = brute_cell_scores(game, state.board, evaluator.orderWeights)
+        for x in range(1, size + 1):
+            for y in range(1, size + 1):
+                expected = -math.inf if (x, y) in state.board else brute.get((x, y), 0)
+                assert scores[x - 1, y - 1] == expected
+
+
+def test_ordered_moves_and_priors_follow_the_cell_scores():
+    game = TicTacToe(5, 4)
+    evaluator = ConvEvaluator(game)
+    state = game.initial
+    for move in ((3, 3), (1, 1), (3, 4)):
+        state = game.result(state, move)
+    ordered = evaluator.ordered_moves(state)
+    scores = evaluator.move_scores(state, ordered)
+    assert sorted(ordered) == sorted(state.moves) and list(scores) == sorted(scores, reverse=True)
+    priors = evaluator.priors(state)
+    assert set(priors) == set(state.moves) and math.isclose(sum(priors.values()), 1)
+
+
+def test_evaluator_follows_a_change_of_k():
+    game = TicTacToe(5, 4)
+    evaluator = ConvEvaluator(game)
+    state = game.initial
+    for move in ((1, 1), (5, 5), (1, 2), (5, 4)):
+        state = game.result(state, move)
+    game.k = 3
+    fresh = ConvEvaluator(game)
+    assert evaluator(state) == fresh(state)
+    assert evaluator.k == 3 and len(evaluator.weights) == 4
+    assert np.array_equal(evaluator.cell_scores(state), fresh.cell_scores(state))
+    assert [c.tolist() for c in evaluator.counts(state)] == list(brute_counts(game, state.board))
+
+    weighted = ConvEvaluator(game, weights=[0, 1, 2, 3])
+    game.k = 4
+    with pytest.raises(ValueError):
+        weighted(state)  # the given weights were for k = 3
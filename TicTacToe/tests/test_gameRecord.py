@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from gameRecord import MAGIC, GameRecord, RecordReader, RecordWriter, get_varint, main, put_varint
+
+
+def random_games(n, seed=1):
+    rng = random.Random(seed)
+    games = []
+    for i in range(n):
+        size = rng.choice((3, 5, 15))
+        cells = [(x, y) for x in range(1, size + 1) for y in range(1, size + 1)]
+        rng.shuffle(cells)
+        moves = cells[:rng.randint(0, len(cells))]
+        scores = [rng.choice((None, -2.5, 0.0, 7.0)) for _ in moves] if i % 3 == 0 else None
+        times = [rng.randint(0, 3000000) / 1e6 for _ in moves] if i % 2 == 0 else None
+        games.append(GameRecord(size, min(size, 4), rng.choice(('X', 'O', None)), moves, scores, times))
+    return games
+
+
+def write(path, games, append=False):
+    with RecordWriter(str(path), append=append) as out:
+        for g in games:
+            out.write(g.size, g.k, g.moves, g.winner, g.scores, g.times)
+
+
+def test_varints():
+    for n in (0, 1, 127, 128, 300, 2 ** 35, 2 ** 63):
+        buf = bytearray()
+        put_varint(buf, n)
+        assert get_varint(buf, 0) == (n, len(buf))
+
+
+def test_round_trip_with_append_and_random_access(tmp_path):
+    path = tmp_path / 'games.ttr'
+    games = random_games(60)
+    write(path, games[:40])
+    write(path, games[40:], append=True)
+    with RecordReader(str(path)) as records:
+        assert len(records) == 60
+        assert list(records) == games
+        assert records[45] == games[45] and records[-1] == games[-1]
+        assert list(records.headers()) == [(g.size, g.k, g.winner, len(g.moves)) for g in games]
+
+
+def test_stale_or_missing_index_is_rebuilt(tmp_path):
+    path = tmp_path / 'games.ttr'
+    games = random_games(10)
+    write(path, games)
+    (tmp_path / 'games.ttr.idx').write_bytes(b'\0' * 24)
+    with RecordReader(str(path)) as records:
+        assert [records[i] for i in range(10)] == games
+    (tmp_path / 'games.ttr.idx').unlink()
+    with RecordReader(str(path)) as records:
+        assert records[9] == games[9]
+    assert (tmp_path / 'games.ttr.idx').stat().st_size == 8 * 10
+
+
+def test_empty_file_and_wrong_magic(tmp_path):
+    path = tmp_path / 'empty.ttr'
+    write(path, [])
+    assert path.read_bytes() == MAGIC
+    with RecordReader(str(path)) as records:
+        assert len(records) == 0 and list(records) == []
+    (tmp_path / 'other').write_bytes(b'not a record file')
+    with pytest.raises(ValueError):
+        RecordReader(str(tmp_path / 'other'))
+
+
+def test_summary(tmp_path, capsys):
+    path = tmp_path / 'games.ttr'
+    write(path, random_games(5))
+    main([str(path), '--show', '0'])
+    out = capsys.readouterr().out
+    assert '5 games' in out and out.splitlines()[-1].startswith('0 GameRecord(')
@@ -0,0 +1,263 @@
+import math
+import random
+import threading
+
+import pytest
+
+from games import (EvalCache, GameState, SearchPosition, SearchTimeout, TicTacToe, alpha_beta_cutoff, alpha_beta_player,
+                   cutoff_searchers, iterative_deepening, minmax, minmax_player)
+from searchCache import SearchCache, scored_search
+from stats import SearchStats
+from utils import Cache
+
+
+def stopped_after(game, seconds):
+    timer = threading.Timer(seconds, game.stop)
+    timer.start()
+    return timer
+
+
+def position_fields(pos):
+    return (pos.to_move, pos.move, pos.utility, dict(pos.board), list(pos.moves), dict(pos.index),
+            list(pos.xCount), list(pos.oCount), pos.liveX, pos.liveO, pos.key)
+
+
+def random_state(game, rng, stones):
+    state = game.initial
+    while len(state.board) < stones and not game.terminal_test(state):
+        state = game.result(state, rng.choice(state.moves))
+    return state
+
+
+@pytest.mark.parametrize('size, k', [(3, 3), (4, 3), (5, 4)])
+def test_make_and_unmake_restore_the_position(size, k):
+    rng = random.Random(size * 10 + k)
+    game = TicTacToe(size, k)
+    pos = game.position(game.initial)
+    start = position_fields(pos)
+    states = [game.initial]
+    for _ in range(500):
+        if pos.history and (rng.random() < 0.4 or pos.utility != 0 or not pos.moves):
+            pos.unmake()
+            states.pop()
+        else:
+            move = rng.choice(pos.moves)
+            pos.make(move)
+            states.append(game.result(states[-1], move))
+        # the incremental counts agree with a position built from scratch
+        fresh = SearchPosition(game, states[-1])
+        assert position_fields(pos)[6:] == position_fields(fresh)[6:]
+        assert (pos.to_move, pos.utility, pos.board) == (fresh.to_move, fresh.utility, fresh.board)
+        assert sorted(pos.moves) == sorted(fresh.moves)
+        assert all(pos.moves[i] == m for m, i in pos.index.items())
+    pos.rewind(0)
+    assert position_fields(pos) == start
+
+
+def reference_value(game, state, player, depth=None):
+    """Plain minimax over game.result() states, with the dead-draw rule of SearchPosition
+    decided from the windows; depth None searches to the end."""
+    windows, _ = game.windows()
+    if state.utility != 0 or not state.moves:
+        return game.utility(state, player)
+    if not any(all(state.board.get(c) != side for c in w) for w in windows for side in 'XO'):
+        return 0  # neither side can complete a window
+    if depth == 0:
+        return game.eval1(state)
+    values = [reference_value(game, game.result(state, m), player, None if depth is None else depth - 1)
+              for m in state.moves]
+    return max(values) if state.to_move == player else min(values)
+
+
+def reference_search(game, state, depth=None):
+    """The first root move of greatest value, and the value."""
+    player = state.to_move
+    values = [reference_value(game, game.result(state, m), player, depth) for m in state.moves]
+    best = max(values)
+    return state.moves[values.index(best)], best
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_position_searches_match_result_based_search(seed):
+    rng = random.Random(seed)
+    game = TicTacToe(3, 3)
+    state = random_state(game, rng, 3)
+    move, value = reference_search(game, state)
+    assert minmax(game, state) == move
+
+    game = TicTacToe(4, 3)
+    game.d = 2
+    state = random_state(game, rng, 4)
+    move, value = reference_search(game, state, game.d)
+    assert alpha_beta_cutoff(game, state) == move
+    pos = game.position(state)
+    _, min_value = cutoff_searchers(game, pos)
+    values = []
+    for m in state.moves:
+        pos.make(m)
+        values.append(min_value(pos, -math.inf, math.inf, game.d))
+        pos.unmake()
+    assert max(values) == value
+    assert values == [reference_value(game, game.result(state, m), state.to_move, game.d) for m in state.moves]
+
+
+def board_state(rows, to_move):
+    """A 3x3 GameState from rows of 'X', 'O' and '.', row 1 first."""
+    board = {(x, y): p for x, row in enumerate(rows, 1) for y, p in enumerate(row, 1) if p != '.'}
+    moves = [(x, y) for x in range(1, 4) for y in range(1, 4) if (x, y) not in board]
+    return GameState(to_move=to_move, move=None, utility=0, board=board, moves=moves)
+
+
+def test_dead_draw_is_terminal_only_in_search():
+    game = TicTacToe(3, 3)
+    # every line through the empty corner already holds both X and O
+    dead = board_state(['XOX', 'XOO', 'OX.'], 'X')
+    pos = game.position(dead)
+    assert pos.liveX == pos.liveO == 0 and pos.dead_draw()
+    assert game.terminal_test(pos) and pos.pruned == 1
+    assert game.utility(pos, 'X') == game.utility(pos, 'O') == 0
+    assert not game.terminal_test(dead)  # a GameState is played out to the last cell
+
+    # X can still fill the right column
+    live = board_state(['XOX', 'XO.', 'OX.'], 'O')
+    pos = game.position(live)
+    assert pos.liveX == 1 and pos.liveO == 0 and not pos.dead_draw()
+    assert not game.terminal_test(pos) and pos.pruned == 0
+    assert game.utility(pos, 'X') == 0
+    pos.make((2, 3))  # O blocks it: now dead
+    assert game.terminal_test(pos) and game.utility(pos, 'O') == 0 and pos.pruned == 1
+    pos.unmake()
+    assert not game.terminal_test(pos)
+    assert minmax(game, pos) in live.moves
+    assert pos.pruned == 1 + 2  # either reply by O kills the column
+
+
+class StoppedGame(TicTacToe):
+    """A TicTacToe that calls stop() on its own at the given terminal test."""
+
+    def __init__(self, stopAt):
+        super().__init__(3, 3)
+        self.stopAt = stopAt
+        self.tests = 0
+
+    def terminal_test(self, state):
+        self.tests += 1
+        if self.tests == self.stopAt:
+            self.stop()
+        return super().terminal_test(state)
+
+
+def test_stopped_minmax_keeps_the_best_root_move():
+    # X wins at once with its first move, (1, 3); the stop comes in the search of the next one
+    state = board_state(['XX.', 'OO.', '...'], 'X')
+    assert state.moves[0] == (1, 3)
+    game = StoppedGame(stopAt=2)
+    assert minmax(game, state) == (1, 3)
+    for seed in range(5):
+        game = StoppedGame(stopAt=2)
+        random.seed(seed)
+        assert minmax_player(game, state) == (1, 3)
+        assert game.tests == 2 and game.deadline is None
+
+
+def test_players_report_dead_draws_through_stats(capsys):
+    for player in (alpha_beta_player, minmax_player):
+        game = TicTacToe(3, 3)
+        game.stats = SearchStats()
+        player(game, board_state(['XOX', 'XO.', 'OX.'], 'O'))
+        assert game.stats.pruned == 2
+    assert 'pruned' not in capsys.readouterr().out
+
+
+def test_iterative_deepening_restores_the_callers_deadline():
+    game = TicTacToe(3, 3, 1)
+    pos = game.position(game.initial)
+
+    def search(game, pos):
+        game.stop()
+        raise SearchTimeout
+
+    assert iterative_deepening(game, pos, search) in game.initial.moves
+    assert game.deadline is None
+    game.deadline = 123.0
+    iterative_deepening(game, pos, search)
+    assert game.deadline == 123.0
+
+
+def test_stopped_full_search_does_not_stop_the_next_one():
+    for player in (alpha_beta_player, minmax_player):
+        game = TicTacToe(4, 4, -1)
+        timer = stopped_after(game, 0.05)
+        assert player(game, game.initial) in game.initial.moves
+        timer.join()
+        assert game.deadline is None
+        # X wins with the last empty cell the search tries; a stale deadline stops it before
+        state = game.initial
+        for move in ((4, 1), (1, 1), (4, 2), (1, 2), (4, 3), (1, 3), (2, 1), (2, 2), (3, 3), (3, 2)):
+            state = game.result(state, move)
+        assert player(game, state) == (4, 4)
+
+
+def test_stopped_full_search_with_the_search_cache(tmp_path):
+    game = TicTacToe(4, 4, -1)
+    game.searchCache = SearchCache(str(tmp_path))
+    timer = stopped_after(game, 0.05)
+    assert alpha_beta_player(game, game.initial) in game.initial.moves
+    timer.join()
+    assert game.deadline is None
+    assert game.searchCache.lookup(game, game.initial) is None  # not stored, least of all as solved
+    game.searchCache.close()
+
+
+def test_scored_search_passes_a_timeout_to_iterative_deepening():
+    game = TicTacToe(3, 3)
+    game.d = 3
+    pos = game.position(game.initial)
+    game.stop()
+    with pytest.raises(SearchTimeout):
+        scored_search()(game, pos)
+    pos.rewind(0)  # as iterative_deepening does
+    search = scored_search(keep_best=True)
+    assert search(game, pos) is None and search.stopped
+    assert len(pos.history) == 0
+    game.deadline = None
+
+
+def test_eval_cache_hits_count_as_evaluations():
+    game = TicTacToe(4, 4)
+    game.d = 2
+    game.stats = SearchStats()
+    state = game.result(game.initial, (2, 2))
+    counts = []
+    for _ in range(2):
+        game.stats.begin('alphabeta')
+        move = alpha_beta_cutoff(game, state)
+        counts.append((move, game.stats.tests, game.stats.evals, game.stats.ttProbes, game.stats.ttHits))
+    (move, tests, evals, probes, hits), (again, testsAgain, evalsAgain, probesAgain, hitsAgain) = counts
+    assert again == move
+    assert (testsAgain, evalsAgain, probesAgain) == (tests, evals, probes)
+    assert evals == probes and hitsAgain == evalsAgain > 0  # the second search is all hits
+
+
+@pytest.mark.parametrize('policy', ['lru', 'lfu', 'clock'])
+def test_eval_cache_is_a_bounded_cache(policy):
+    game = TicTacToe(4, 4)
+    cache = EvalCache(maxsize=8, policy=policy)
+    assert isinstance(cache, Cache)
+    calls = []
+
+    def evaluate(pos):
+        calls.append(pos.key)
+        return len(calls)
+
+    cached = cache.wrap(game, evaluate)
+    pos = game.position(game.initial)
+    for move in game.initial.moves:
+        pos.make(move)
+        cached(pos)
+        pos.unmake()
+    assert len(cache) == 8 and cache.evictions == 8 and len(calls) == 16
+    cache.wrap(game, evaluate)
+    assert len(cache) == 8  # same game: kept
+    cache.wrap(TicTacToe(3, 3), evaluate)
+    assert len(cache) == 0 and cache.hits == cache.misses == 0
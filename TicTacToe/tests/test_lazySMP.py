@@ -0,0 +1,66 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pytest
+
+import lazySMP
+from games import TicTacToe
+from lazySMP import LazySMP, TranspositionTable, smp_player, table_search
+from searchCache import scored_search
+
+
+def smp_in_worker():
+    game = TicTacToe(3, 3, 0.1)
+    game.workers = 2
+    move = smp_player(game, game.initial)
+    engines = {workers: (engine.pool, engine.table.name) for workers, engine in lazySMP._engines.items()}
+    lazySMP.close_engines()
+    return move, engines
+
+
+def test_pool_workers_search_in_process():
+    with ProcessPoolExecutor(1) as pool:
+        move, engines = pool.submit(smp_in_worker).result(60)
+    assert move in TicTacToe(3, 3).initial.moves
+    assert engines == {1: (None, None)}
+    with multiprocessing.Pool(1) as pool:  # daemonic workers
+        move, engines = pool.apply(smp_in_worker)
+    assert engines == {1: (None, None)}
+
+
+def test_close_unlinks_the_shared_table():
+    game = TicTacToe(3, 3, 0.2)
+    engine = LazySMP(2, bits=10)
+    name = engine.table.name
+    assert engine.search(game, game.result(game.initial, (2, 2))) in game.initial.moves
+    engine.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+@pytest.mark.parametrize('shared', [True, False])
+def test_table_round_trip(shared):
+    table = TranspositionTable(bits=8, shared=shared)
+    table.store(12345, 3, lazySMP.LOWER, -7, 4)
+    table.store(54321, 2, lazySMP.EXACT, math.inf, None)
+    assert table.probe(12345) == (3, lazySMP.LOWER, -7, 4)
+    assert table.probe(54321) == (2, lazySMP.EXACT, math.inf, None)
+    table.store(12345, 1, lazySMP.EXACT, 0, 0)  # shallower: kept out
+    assert table.probe(12345)[0] == 3
+    assert table.probe(99) is None
+    table.close()
+
+
+def test_table_search_values_agree_with_alpha_beta_cutoff():
+    game = TicTacToe(4, 3)
+    state = game.result(game.result(game.initial, (2, 2)), (1, 1))
+    table = TranspositionTable(bits=12, shared=False)
+    for depth in (1, 2, 3):
+        game.d = depth
+        _, score = table_search(game, game.position(state), table)
+        serial = scored_search()
+        serial(game, game.position(state))
+        assert score == serial.score
+    table.close()
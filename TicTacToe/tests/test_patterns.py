@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import patterns
+from games import TicTacToe
+from patterns import PatternEvaluator, board_lines, build_table, pattern_table
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Keep the generated tables out of the user's cache directory."""
+    monkeypatch.setenv('TICTACTOE_CACHE', str(tmp_path))
+    monkeypatch.setattr(patterns, '_tables', {})
+    return tmp_path
+
+
+def brute_score(game, board, weights):
+    """Sum the window values over game.windows(), from X's point of view."""
+    total = 0
+    for window in game.windows()[0]:
+        x = sum(board.get(c) == 'X' for c in window)
+        o = sum(board.get(c) == 'O' for c in window)
+        total += weights[x] if o == 0 else -weights[o] if x == 0 else 0
+    return total
+
+
+def random_boards(game, rng, count):
+    for _ in range(count):
+        state = game.initial
+        for _ in range(rng.randrange(len(game.initial.moves))):
+            if game.terminal_test(state):
+                break
+            state = game.result(state, rng.choice(state.moves))
+        yield state
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4])
+def test_table_matches_the_decoded_windows(k):
+    weights = [5] + [m * 10 for m in range(1, k + 1)]
+    table = build_table(k, weights)
+    assert len(table) == 3 ** k
+    for index in range(3 ** k):
+        digits = [(index // 3 ** i) % 3 for i in range(k)]
+        x, o = digits.count(1), digits.count(2)
+        assert table[index] == (weights[x] if o == 0 else -weights[o] if x == 0 else 0)
+
+
+def test_tables_are_saved_and_read_back(cache):
+    table = pattern_table(3)
+    assert list(cache.iterdir())
+    patterns._tables.clear()
+    assert pattern_table(3) == table
+    with pytest.raises(ValueError):
+        pattern_table(3, [1, 2])
+
+
+@pytest.mark.parametrize('size, k', [(3, 3), (4, 3), (5, 4), (6, 2), (6, 6)])
+def test_scores_match_brute_force(size, k):
+    rng = random.Random(size * 10 + k)
+    game = TicTacToe(size, k)
+    evaluator = PatternEvaluator(game)
+    weights = patterns.default_weights(k)
+    windows = sum(len(line) - k + 1 for line in board_lines(size, k))
+    assert windows == len(game.windows()[0])
+    for state in random_boards(game, rng, 20):
+        assert evaluator.score(state.board) == brute_score(game, state.board, weights)
+        if state.utility == 0:
+            expected = brute_score(game, state.board, weights)
+            assert evaluator(state) == (expected if state.to_move == 'X' else -expected)
+
+
+def test_evaluator_follows_a_change_of_k():
+    game = TicTacToe(5, 4)
+    evaluator = PatternEvaluator(game)
+    state = game.initial
+    for move in ((1, 1), (5, 5), (1, 2), (5, 4), (2, 2)):
+        state = game.result(state, move)
+    game.k = 3
+    assert evaluator(state) == PatternEvaluator(game)(state) != 0
+    assert evaluator.score(state.board) == brute_score(game, state.board, patterns.default_weights(3))
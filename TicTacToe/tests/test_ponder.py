@@ -0,0 +1,26 @@
+from games import TicTacToe, alpha_beta_player
+from monteCarlo import MCTS
+from ponder import Ponderer
+
+
+def test_mcts_pondering_stops_at_max_nodes():
+    game = TicTacToe(4, 4, 1)
+    ponderer = Ponderer(maxNodes=200)
+    ponderer.start(game, game.initial)
+    ponderer.thread.join(10)
+    assert not ponderer.thread.is_alive()
+    size, _ = ponderer.search.treeShape()
+    assert 100 < size <= 200
+    search = ponderer.take((1, 1))
+    assert isinstance(search, MCTS) and search.game is game
+
+
+def test_pondered_answer_is_returned_on_a_hit():
+    game = TicTacToe(3, 3, 0.2)
+    state = game.result(game.initial, (2, 2))
+    ponderer = Ponderer(maxReplies=1)
+    ponderer.start(game, state, alpha_beta_player)
+    ponderer.thread.join(10)
+    reply = next(iter(ponderer.answers))
+    assert ponderer.take(reply) in game.result(state, reply).moves
+    assert ponderer.hits == 1
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+from protocol import EngineProtocol
+
+
+def engine(*lines):
+    protocol = EngineProtocol(log=io.StringIO())
+    replies = [protocol.handle(line) for line in lines]
+    return protocol, [reply for reply in replies if reply is not None]
+
+
+def coordinates(reply):
+    x, y = (int(v) for v in reply.split(','))
+    return x, y
+
+
+def test_start_begin_turn_takeback_end():
+    protocol, replies = engine('START 3', 'INFO timeout_turn 100', 'BEGIN')
+    assert replies[0] == 'OK'
+    first = coordinates(replies[1])
+    reply = protocol.handle('TURN {},{}'.format(*((1, 1) if first != (1, 1) else (0, 0))))
+    second = coordinates(reply)
+    assert second != first and len(protocol.session) == 3
+    assert protocol.handle('TAKEBACK {},{}'.format(*second)) == 'OK'
+    assert len(protocol.session) == 2
+    assert protocol.handle('TAKEBACK {},{}'.format(*second)).startswith('ERROR')
+    assert protocol.handle('END') is None and protocol.finished
+
+
+def test_errors_and_unknown_commands():
+    protocol, replies = engine('BEGIN', 'START 3', 'TURN 5,5', 'TURN a', 'FOO', 'INFO engine nope')
+    assert replies[0].startswith('ERROR')
+    assert replies[1] == 'OK'
+    assert replies[2].startswith('ERROR illegal move')
+    assert replies[3].startswith('ERROR bad coordinates')
+    assert replies[4] == 'UNKNOWN FOO'
+    assert replies[5].startswith('ERROR unknown engine')
+
+
+def test_board_plays_the_only_move_that_does_not_lose():
+    protocol, replies = engine('START 3', 'INFO timeout_turn 500', 'BOARD', '0,0,2', '1,1,1', '0,1,2', '2,0,1',
+                               'DONE')
+    assert replies == ['OK', '0,2']
+    assert protocol.session.over() and protocol.session.winner() == 'X'
+
+
+def test_timeout_match_after_start_sets_the_clock():
+    protocol, _ = engine('START 5', 'INFO timeout_match 60000')
+    assert protocol.session.game.clock.remaining == 60.0
+    protocol.handle('INFO time_left 12000')
+    assert protocol.session.game.clock.remaining == 12.0
+    protocol.handle('RESTART')
+    assert protocol.session.game.clock.remaining == 60.0  # time_left belonged to the last game
+    protocol.handle('INFO timeout_match 0')
+    assert protocol.session.game.clock is None
+
+
+def test_k_applies_to_an_empty_board_only():
+    protocol, _ = engine('START 5', 'INFO timeout_match 1000', 'INFO k 4')
+    assert protocol.session.game.k == 4
+    assert protocol.session.game.clock.remaining == 1.0
+    protocol.handle('INFO timeout_turn 50')
+    protocol.handle('BEGIN')
+    assert protocol.handle('INFO k 3').startswith('ERROR')
+    assert protocol.session.game.k == 4
+    protocol.handle('RESTART')
+    assert protocol.session.game.k == 4
+
+
+@pytest.mark.parametrize('name', ['random', 'minmax', 'alphabeta', 'mcts'])
+def test_every_engine_answers(name):
+    protocol, replies = engine('START 3', 'INFO timeout_turn 50', 'INFO engine ' + name, 'BEGIN')
+    x, y = coordinates(replies[-1])
+    assert 0 <= x < 3 and 0 <= y < 3
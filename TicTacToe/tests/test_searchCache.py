@@ -0,0 +1,24 @@
+import math
+
+import pytest
+
+from searchCache import CacheFile
+
+
+@pytest.mark.parametrize('bits', [4, 10])
+def test_stores_in_every_page_reach_a_second_mapping(tmp_path, bits):
+    path = str(tmp_path / 'table.cache')
+    table = CacheFile(path, 4, 4, bits)
+    # the first and the last bucket too: the last page of the file is a partial one
+    keys = [(1 << 20) | bucket for bucket in (0, 1, (1 << bits) // 2, (1 << bits) - 1)]
+    for i, key in enumerate(keys):
+        table.store(key, i, 10 * i - 5, i + 1, solved=i % 2 == 1)
+    table.store(keys[0], 3, math.inf, 9, solved=True)
+    table.close()
+
+    again = CacheFile(path, 4, 4, bits)
+    assert again.probe(keys[0]) == (3, math.inf, 9, True)
+    for i, key in enumerate(keys[1:], 1):
+        assert again.probe(key) == (i, 10 * i - 5, i + 1, i % 2 == 1)
+    assert again.probe(12345 << 20) is None
+    again.close()
@@ -0,0 +1,43 @@
+import io
+import json
+
+from games import TicTacToe, alpha_beta_player
+from searchCache import SearchCache, scored_search
+from searchTrace import SearchTrace, principal_variation
+
+
+def late_position(game):
+    state = game.initial
+    for move in ((2, 2), (1, 1), (1, 2), (3, 2)):
+        state = game.result(state, move)
+    return state
+
+
+def test_principal_variation_keeps_the_root_score():
+    game = TicTacToe(3, 3)
+    pos = game.position(late_position(game))
+    search = scored_search()
+    game.d = 2
+    move = search(game, pos)
+    score = search.score
+    pv, _ = principal_variation(game, pos, search, move, game.d)
+    assert pv[0] == move and len(pv) == 3
+    assert search.score == score
+
+
+def test_trace_line_per_move_and_cached_root_score(tmp_path):
+    game = TicTacToe(3, 3, 1)
+    out = io.StringIO()
+    game.stats = SearchTrace(out)
+    game.searchCache = SearchCache(str(tmp_path))
+    state = late_position(game)
+    move = alpha_beta_player(game, state)
+    line = json.loads(out.getvalue())
+    assert line['iterations'] and line['iterations'][-1]['move'] == list(move)
+    assert line['iterations'][-1]['pv'][0] == list(move)
+    hit = game.searchCache.lookup(game, state)
+    check = scored_search()
+    game.stats, game.d = None, hit.depth
+    check(game, game.position(state))
+    assert hit.score == check.score
+    game.searchCache.close()
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+import service
+from players import PLAYERS
+from service import MIN_TIMER, EngineService, ServiceClient, job_timer
+
+CLOSE_AFTER_THINK = '''
+import asyncio, sys
+from service import EngineService, ServiceClient
+
+async def main():
+    service = EngineService(1, 4)
+    client = await ServiceClient.connect(*await service.start(port=0))
+    sid = (await client.request(op='new', size=3, k=3))['session']
+    print(await client.request(op='think', session=sid, engine=sys.argv[1], timer=0.1))
+    await client.close()
+    await service.close()
+
+asyncio.run(main())
+'''
+
+
+def run_service(body, workers=1, maxQueue=4, window=1000):
+    """Start a service on a free port, run body(service, client) and shut everything down."""
+    async def main():
+        service = EngineService(workers, maxQueue, defaultTimer=0.05, window=window)
+        host, port = await service.start(port=0)
+        client = await ServiceClient.connect(host, port)
+        try:
+            return await body(service, client)
+        finally:
+            await client.close()
+            await asyncio.wait_for(service.close(), 30)
+
+    return asyncio.run(main())
+
+
+def test_job_timer_stays_positive_and_inside_the_deadline():
+    assert job_timer(1.0, None) == 1.0
+    assert job_timer(-1, None) == -1
+    assert job_timer(1.0, 10.0) == 1.0
+    assert job_timer(1.0, 0.5) == pytest.approx(0.45)
+    assert job_timer(-1, 2.0) == pytest.approx(1.8)
+    assert job_timer(1.0, 0.0) == MIN_TIMER
+    assert job_timer(1.0, -3.0) == MIN_TIMER
+
+
+def test_session_play_think_state():
+    async def body(service, client):
+        sid = (await client.request(op='new', size=3, k=3, id=7))
+        assert sid['id'] == 7
+        sid = sid['session']
+        assert await client.request(op='play', session=sid, move=[2, 2]) == {'utility': 0, 'over': False}
+        assert 'error' in await client.request(op='play', session=sid, move=[2, 2])
+        reply = await client.request(op='think', session=sid, engine='alphabeta', timer=0.05)
+        assert 'move' in reply
+        state = await client.request(op='state', session=sid)
+        assert len(state['board']) == 2 and state['to_move'] == 'X'
+        assert 'error' in await client.request(op='think', session=sid, engine='nope')
+        assert await client.request(op='close', session=sid) == {}
+        assert 'error' in await client.request(op='state', session=sid)
+        stats = await client.request(op='stats')
+        assert stats['searches'] == 1 and stats['running'] == 0
+
+    run_service(body)
+
+
+def test_latency_figures_keep_only_the_last_searches():
+    async def body(service, client):
+        sid = (await client.request(op='new', size=4, k=4))['session']
+        for _ in range(3):
+            assert 'move' in await client.request(op='think', session=sid, engine='random')
+        stats = await client.request(op='stats')
+        assert stats['searches'] == 3
+        assert len(service.searchTime) == len(service.queueLatency) == 2
+        assert stats['searchTime']['max'] == max(service.searchTime)
+
+    run_service(body, window=2)
+
+
+def test_queued_job_past_its_deadline_is_refused():
+    async def body(service, client):
+        other = await ServiceClient.connect(*service.server.sockets[0].getsockname()[:2])
+        a = (await client.request(op='new', size=4, k=4))['session']
+        b = (await other.request(op='new', size=3, k=3))['session']
+        slow = asyncio.ensure_future(client.request(op='think', session=a, engine='mcts', timer=0.5))
+        await asyncio.sleep(0.1)
+        reply = await other.request(op='think', session=b, engine='alphabeta', timer=1.0, deadline=0.2)
+        assert reply == {'error': 'deadline exceeded'}
+        assert 'move' in await slow
+        await other.close()
+        assert service.slots._value == 1 and service.running == 0
+
+    run_service(body)
+
+
+@pytest.mark.parametrize('engine', sorted(PLAYERS))
+def test_close_after_every_engine(engine):
+    # in a process of its own, since a pool that does not shut down blocks the event loop
+    done = subprocess.run([sys.executable, '-c', CLOSE_AFTER_THINK, engine], capture_output=True, text=True,
+                          timeout=60, cwd=os.path.dirname(os.path.abspath(service.__file__)))
+    assert done.returncode == 0, done.stderr
+    assert "'move'" in done.stdout
+    assert 'leaked' not in done.stderr
@@ -0,0 +1,86 @@
+import pytest
+
+from games import TicTacToe, gen_state
+from session import GameSession
+
+
+def play_all(session, moves):
+    for move in moves:
+        session.play(move)
+
+
+def test_play_and_undo_follow_the_game():
+    game = TicTacToe(3, 3)
+    session = GameSession(game)
+    state = game.initial
+    for move in ((2, 2), (1, 1), (1, 2), (3, 2)):
+        assert session.legal(move)
+        assert session.play(move) == 0
+        state = game.result(state, move)
+        assert session.board == state.board and session.to_move == state.to_move
+    assert len(session) == 4 and not session.legal((2, 2))
+    with pytest.raises(ValueError):
+        session.play((2, 2))
+    assert len(session) == 4
+
+    assert session.undo() == (3, 2) and session.undo() == (1, 2)
+    assert session.to_move == 'X' and (1, 2) not in session.board and session.legal((1, 2))
+    play_all(session, [(1, 3), (1, 2), (3, 1)])
+    assert session.position.utility == 3 and session.over() and session.winner() == 'X'
+    assert not session.legal((2, 1))
+    while session.undo() is not None:
+        pass
+    assert session.board == {} and session.state().moves == game.initial.moves
+
+
+def test_undo_stops_at_the_loaded_state():
+    game = TicTacToe(3, 3)
+    session = GameSession(game)
+    session.load(gen_state(to_move='X', x_positions=[(1, 1)], o_positions=[(2, 2)], h=3, v=3))
+    session.play((3, 3))
+    assert session.undo() == (3, 3)
+    assert session.undo() is None
+    assert session.board == {(1, 1): 'X', (2, 2): 'O'}
+
+
+def test_state_is_a_snapshot_reused_until_the_next_move():
+    game = TicTacToe(3, 3)
+    session = GameSession(game)
+    session.play((2, 2))
+    state = session.state()
+    assert session.state() is state
+    assert state.board == {(2, 2): 'X'} and state.to_move == 'O' and state.move == (2, 2)
+    assert sorted(state.moves) == sorted(set(game.initial.moves) - {(2, 2)})
+    session.play((1, 1))
+    assert session.state() is not state
+    assert state.board == {(2, 2): 'X'} and (1, 1) in state.moves  # the old snapshot is unchanged
+    session.undo()
+    assert session.state().board == state.board
+
+
+def test_refresh_replays_the_moves_under_the_new_k():
+    game = TicTacToe(4, 4)
+    session = GameSession(game)
+    play_all(session, [(1, 1), (4, 4), (1, 2), (4, 3)])
+    game.k = 3
+    session.refresh()
+    assert session.k == 3 and len(session) == 4 and session.position.utility == 0
+    assert session.play((1, 3)) == 3  # three in a row now wins
+    assert session.winner() == 'X'
+
+
+def test_refresh_rejects_a_k_the_moves_do_not_fit():
+    game = TicTacToe(4, 4)
+    session = GameSession(game)
+    moves = [(1, 1), (4, 4), (1, 2), (4, 3), (1, 3), (3, 4)]  # X has three in a row, O moved after
+    play_all(session, moves)
+    board, state = dict(session.board), session.state()
+    game.k = 3
+    with pytest.raises(ValueError):
+        session.refresh()
+    with pytest.raises(ValueError):
+        session.play((2, 2))  # play() refreshes first
+    assert session.k == 4 and session.played == moves and session.board == board
+    assert session.state() is state and session.position.utility == 0
+    game.k = 4
+    assert session.play((2, 2)) == 0
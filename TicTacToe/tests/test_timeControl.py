@@ -0,0 +1,84 @@
+import random
+import types
+
+import pytest
+
+import timeControl
+from games import TicTacToe
+from timeControl import TimeManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake perf_counter for timeControl, moved on by hand."""
+    now = types.SimpleNamespace(t=100.0)
+    monkeypatch.setattr(timeControl, 'time', types.SimpleNamespace(perf_counter=lambda: now.t))
+    return now
+
+
+def states(game, rng):
+    """The states of one random game."""
+    state = game.initial
+    while not game.terminal_test(state):
+        yield state
+        state = game.result(state, rng.choice(state.moves))
+
+
+@pytest.mark.parametrize('total, increment', [(10, 0), (1, 0.5), (0.001, 0), (60, 2)])
+def test_soft_budget_stays_within_the_hard_one(clock, total, increment):
+    rng = random.Random(total)
+    for size, k in ((3, 3), (5, 4), (7, 4)):
+        game = TicTacToe(size, k)
+        manager = TimeManager(total, increment)
+        for state in states(game, rng):
+            deadline = manager.start(game, state)
+            assert manager.minimum <= manager.soft <= manager.hard
+            assert deadline == clock.t + manager.hard
+            clock.t += manager.soft
+            manager.stop()
+
+
+@pytest.mark.parametrize('size, k', [(3, 3), (5, 4), (7, 5)])
+def test_a_game_spends_at_most_the_total_budget(clock, size, k):
+    game = TicTacToe(size, k)
+    total, increment = 5.0, 0.1
+    manager = TimeManager(total, increment)
+    used = []
+    moves = 0
+    for state in states(game, random.Random(size)):
+        manager.start(game, state)
+        clock.t += manager.hard  # the worst case: every search runs into its deadline
+        used.append(manager.stop())
+        moves += 1
+    assert manager.moves == moves
+    assert sum(used) <= total + increment * moves
+    assert manager.remaining > 0
+
+
+def test_check_stops_early_once_the_best_move_is_stable(clock):
+    game = TicTacToe(5, 4)
+    manager = TimeManager(10)
+    manager.start(game, game.initial)
+    soft = manager.soft
+    clock.t += 0.7 * soft
+    assert manager.check((1, 1), predicted=0.05 * soft)  # the first best move may still change
+    assert manager.check((2, 2), predicted=0.05 * soft)  # and it did
+    assert manager.check((2, 2), predicted=0.05 * soft)
+    assert not manager.check((2, 2), predicted=0.05 * soft)  # settled: 0.75 of soft is enough
+
+    manager.start(game, game.initial)
+    clock.t += 0.7 * soft
+    for move in ((1, 1), (2, 2), (1, 1), (2, 2)):
+        assert manager.check(move, predicted=0.05 * soft)  # still changing: keep going
+    clock.t += 0.8 * soft
+    assert not manager.check((1, 1), predicted=0.05 * soft)  # but never past 1.5 times soft
+
+
+def test_check_predicts_the_next_iteration_from_the_last(clock):
+    game = TicTacToe(5, 4)
+    manager = TimeManager(10)
+    manager.start(game, game.initial)
+    clock.t += 0.3 * manager.soft
+    assert manager.check((1, 1))  # 0.3 of soft spent, 0.6 more predicted: within 1.5 soft
+    clock.t += 0.3 * manager.soft
+    assert not manager.check((1, 1))  # stable once: 0.6 spent and 0.6 predicted would pass soft
@@ -0,0 +1,41 @@
+import io
+import math
+
+import pytest
+
+from tournament import MIN_GAMES, elo, play_one, report, schedule
+
+
+def test_elo_is_not_a_measurement_for_few_games():
+    assert elo([1.0]) == (None, None, None)
+    assert elo([0.0] * (MIN_GAMES - 1)) == (None, None, None)
+
+
+def test_elo_of_a_perfect_score_is_a_one_sided_bound():
+    d, lo, hi = elo([1.0] * 10)
+    assert d is None and hi == math.inf and 100 < lo < 200
+    d, lo, hi = elo([0.0] * 10)
+    assert d is None and lo == -math.inf and -200 < hi < -100
+
+
+def test_elo_of_a_mixed_score():
+    d, lo, hi = elo([1.0, 0.0] * 5 + [1.0, 1.0])
+    assert d == pytest.approx(400 * math.log10(7 / 5))
+    assert lo < d < hi
+    assert elo([0.5] * MIN_GAMES)[0] == 0.0
+
+
+def test_schedule_alternates_colours_and_seeds_games():
+    jobs = list(schedule(['a', 'b', 'c'], [(3, 3, 0.1)], 2, seed=1))
+    assert len(jobs) == 6
+    assert [(j['x'], j['o']) for j in jobs[:2]] == [('a', 'b'), ('b', 'a')]
+    assert len({j['seed'] for j in jobs}) == 6
+
+
+def test_games_repeat_from_their_seed_and_report():
+    job = next(schedule(['random', 'alphabeta'], [(3, 3, 0.05)], 1, seed=3))
+    first, second = play_one(job), play_one(job)
+    assert first['moves'] == second['moves'] and first['winner'] == second['winner']
+    out = io.StringIO()
+    report([first], out)
+    assert 'n/a' in out.getvalue()
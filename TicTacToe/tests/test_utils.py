@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+from utils import Cache, IndexedPriorityQueue, cache_scope, cached, clear_caches, freeze
+
+
+def check_heap(queue):
+    heap, position = queue.heap, queue.position
+    assert len(position) == len(heap)
+    for i, (value, item) in enumerate(heap):
+        assert position[item] == i
+        if i:
+            assert not value < heap[(i - 1) // 2][0]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_priority_queue_matches_a_model(seed):
+    rng = random.Random(seed)
+    priority = {item: rng.randrange(10) for item in range(100)}
+    start = rng.sample(range(100), 20)
+    queue = IndexedPriorityQueue(f=lambda item: priority[item], items=start)
+    model = {item: priority[item] for item in start}  # item -> the priority it was queued with
+    for _ in range(2000):
+        op = rng.random()
+        if op < 0.35:
+            item = rng.randrange(100)
+            priority[item] = rng.randrange(10)
+            queue.append(item)
+            model[item] = priority[item]
+        elif op < 0.55 and model:
+            item = rng.choice(sorted(model))
+            priority[item] = rng.randrange(10)
+            queue.update(item)
+            model[item] = priority[item]
+        elif op < 0.7 and model:
+            item = rng.choice(sorted(model))
+            del queue[item]
+            del model[item]
+        elif model:
+            lowest = min(model.values())
+            assert queue[queue.peek()] == lowest
+            assert model.pop(queue.pop()) == lowest
+        check_heap(queue)
+        assert len(queue) == len(model)
+        assert all(item in queue and queue[item] == p for item, p in model.items())
+    drained = [priority[queue.pop()] for _ in range(len(queue))]
+    assert drained == sorted(drained)
+
+
+def test_indexed_priority_queue_max_order_and_errors():
+    queue = IndexedPriorityQueue('max', items=[3, 1, 4, 1, 5])
+    assert len(queue) == 4  # the second 1 replaced the first
+    assert [queue.pop() for _ in range(4)] == [5, 4, 3, 1]
+    with pytest.raises(Exception):
+        queue.pop()
+    with pytest.raises(KeyError):
+        queue.update(7)
+    with pytest.raises(KeyError):
+        del queue[7]
+    with pytest.raises(ValueError):
+        IndexedPriorityQueue('middle')
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = Cache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    assert 'b' not in cache and list(cache.data) == ['c', 'a', 'd']
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_lfu_cache_evicts_the_least_used_oldest_first():
+    cache = Cache(maxsize=3, policy='lfu')
+    for key in 'abc':
+        cache.put(key, 0)
+    cache.get('a')
+    cache.get('a')
+    cache.get('c')
+    cache.put('d', 0)
+    assert 'b' not in cache  # used once, like nothing else
+    cache.put('e', 0)
+    assert 'd' not in cache  # d and e were used once, d first
+    assert set(cache.data) == {'a', 'c', 'e'} and cache.counts == {'a': 3, 'c': 2, 'e': 1}
+
+
+def test_clock_cache_gives_used_entries_a_second_chance():
+    cache = Cache(maxsize=3, policy='clock')
+    for key in 'abc':
+        cache.put(key, 0)
+    cache.get('a')
+    cache.put('d', 0)
+    assert 'a' in cache and 'b' not in cache
+    cache.put('e', 0)
+    assert 'c' not in cache
+    cache.put('f', 0)
+    assert 'd' not in cache
+    cache.put('g', 0)
+    assert 'a' not in cache  # it lost its reference bit when the hand passed it
+    assert list(cache.ring) == ['e', 'f', 'g']
+
+
+@pytest.mark.parametrize('policy', ['lru', 'lfu', 'clock'])
+def test_cache_stays_within_its_bounds(policy):
+    rng = random.Random(1)
+    cache = Cache(maxsize=10, policy=policy)
+    for _ in range(1000):
+        key = rng.randrange(30)
+        if cache.get(key) is None:
+            cache.put(key, key)
+        assert len(cache) <= 10
+        assert all(cache.data[key] == key for key in cache.data)
+    assert cache.hits + cache.misses == 1000 and cache.evictions == cache.misses - len(cache)
+    if policy == 'lfu':
+        assert sorted(cache.counts) == sorted(cache.data)
+        assert sum(len(keys) for keys in cache.buckets.values()) == len(cache)
+    if policy == 'clock':
+        assert sorted(cache.ring) == sorted(cache.data) and cache.referenced <= set(cache.data)
+
+    small = Cache(maxsize=None, maxbytes=1000, policy=policy)
+    for key in range(100):
+        small.put(key, 'x' * 50)
+        assert small.nbytes <= 1000 and small.nbytes == sum(small.sizes.values())
+    assert 0 < len(small) < 100
+    with pytest.raises(ValueError):
+        Cache(policy='fifo')
+
+
+def test_cached_memoizes_and_is_cleared_by_scope():
+    calls = []
+
+    @cached(maxsize=2, key=lambda board: freeze(board))
+    def count(board):
+        calls.append(board)
+        return len(board)
+
+    assert count({(1, 1): 'X'}) == 1
+    assert count({(1, 1): 'X'}) == 1
+    assert len(calls) == 1 and count.cache_info()['hits'] == 1
+    with cache_scope(count):
+        count({(1, 1): 'X', (2, 2): 'O'})
+    assert len(count.cache) == 0
+    count({(1, 1): 'X'})
+    clear_caches()
+    assert len(calls) == 3 and count.cache_info()['size'] == 0
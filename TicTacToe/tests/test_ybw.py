@@ -0,0 +1,45 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import ybw
+from games import TicTacToe, alpha_beta_cutoff
+from ybw import RootSplit, ybw_player
+
+
+def ybw_in_worker():
+    game = TicTacToe(3, 3, 0.1)
+    game.workers = 2
+    move = ybw_player(game, game.result(game.initial, (2, 2)))
+    return move, len(ybw._splitters)
+
+
+def test_pool_workers_search_serially():
+    with ProcessPoolExecutor(1) as pool:
+        move, splitters = pool.submit(ybw_in_worker).result(60)
+    assert move in TicTacToe(3, 3).initial.moves and splitters == 0
+    with multiprocessing.Pool(1) as pool:  # daemonic workers
+        move, splitters = pool.apply(ybw_in_worker)
+    assert splitters == 0
+
+
+def test_root_split_plays_the_serial_move():
+    game = TicTacToe(4, 3)
+    splitter = RootSplit(2)
+    try:
+        state = game.initial
+        for move in ((2, 2), (1, 1), (3, 2)):
+            state = game.result(state, move)
+            for depth in (1, 2):
+                game.d = depth
+                assert splitter.search(game, state) == alpha_beta_cutoff(game, state)
+    finally:
+        splitter.close()
+
+
+def test_close_splitters():
+    game = TicTacToe(3, 3, 0.1)
+    game.workers = 2
+    assert ybw_player(game, game.result(game.initial, (2, 2))) in game.initial.moves
+    assert len(ybw._splitters) == 1
+    ybw.close_splitters()
+    assert not ybw._splitters
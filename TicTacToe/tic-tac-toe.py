@@ -1,39 +1,64 @@
 import os.path
-from tkinter import *
+from tkinter import BOTTOM, LEFT, TOP, BooleanVar, Button, Checkbutton, Entry, Frame, Label, OptionMenu, StringVar, Tk
+import queue
 import sys
+import threading
 import time
 
 
 #sys.path.append('../')
 #sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from games import *
-from monteCarlo import *
+from games import TicTacToe, alpha_beta_player, minmax_player, random_player
+from monteCarlo import MCTS
+from ponder import Ponderer
+from session import GameSession
+from boardView import ButtonBoard, CanvasBoard
+from searchTrace import SearchTrace
+from analysis import analyze
+from gameRecord import RecordWriter
+from searchCache import SearchCache
 
 gBoard = None
 root = None
-buttons = []
-frames = []
-x_pos = []
-o_pos = []
-count = 0
-sym = ""
+view = None  # ButtonBoard, or CanvasBoard with --canvas
+useCanvas = False
+trace = None  # SearchTrace with --trace FILE
+records = None  # RecordWriter with --record FILE
+searchCache = None  # SearchCache with --cache DIR
+session = None  # GameSession holding the game being played
 result = None
 choices = None
+progress = None
 gSize = 3
+worker = None  # thread computing the engine move; None while the human is to move
+workerResult = queue.Queue()
+mcSearch = None
+searchStart = 0
+gameId = 0  # bumped by reset_game so a stale engine move is dropped
+ponderer = Ponderer()
+ponderOn = None
+hintOn = None
+hintResult = queue.Queue()
+hintId = 0  # bumped whenever the position changes, so stale hints are dropped
+HINT_SECONDS = 1.0
+HINT_LINES = 3
 
 def create_frames(root):
     """
     This function creates the necessary structure of the game.
     """
-    global gBoard
+    global gBoard, session
     gBoard = TicTacToe(gSize, gSize, -1)
+    gBoard.stats = trace
+    gBoard.searchCache = searchCache
+    session = GameSession(gBoard)
    
-    for _ in range(gSize):
-        framei = Frame(root)
-        create_buttons(framei)
-        framei.pack(side = BOTTOM)
-        frames.append(framei)
+    global view
+    if useCanvas:
+        view = CanvasBoard(root, gSize, on_click)
+    else:
+        view = ButtonBoard(root, gSize, on_click)
 
     uiFrame = Frame(root)
     buttonExit = Button(uiFrame, height=1, width=4, text="Exit", command=lambda: exit_game(root))
@@ -41,15 +66,29 @@ def create_frames(root):
     uiFrame.pack(side=TOP)
     buttonReset = Button(uiFrame, height=1, width=4, text="Reset", command=lambda: reset_game())
     buttonReset.pack(side=LEFT)
+    buttonStop = Button(uiFrame, height=1, width=4, text="Stop", command=lambda: stop_search())
+    buttonStop.pack(side=LEFT)
+    buttonUndo = Button(uiFrame, height=1, width=4, text="Undo", command=lambda: undo_move())
+    buttonUndo.pack(side=LEFT)
+    global ponderOn
+    ponderOn = BooleanVar(root, value=False)
+    Checkbutton(uiFrame, text="Ponder", variable=ponderOn, command=lambda: ponderer.stop()).pack(side=LEFT)
+    global hintOn
+    hintOn = BooleanVar(root, value=False)
+    Checkbutton(uiFrame, text="Hints", variable=hintOn, command=lambda: start_hints()).pack(side=LEFT)
 
     def matchCallback(event):
         global gBoard
         dstr = event.widget.get().strip()
 
         if dstr.isdigit():
-            if int(dstr) > 0:
+            if int(dstr) > 0 and (len(session) or worker is not None):
+                # the moves played may not be a legal game under another k
+                print("Warning! Reset the game before changing the match count")
+            elif int(dstr) > 0:
                 print("Match count: ", int(dstr))
                 gBoard.k = int(dstr)
+                session.refresh()
             else:
                 print("Warning! Match value must be positive")
         return True
@@ -90,125 +129,229 @@ def create_frames(root):
     timeEntry.pack(side = LEFT)
 
 
-def create_buttons(frame):
+def on_click(x, y):
     """
-    creates the buttons for one row of the board .
+    This function determines the action of a click on cell (x, y).
     """
-    buttons_in_frame = []
+    global gBoard, choices, result
+    if worker is not None or not session.legal((x, y)):
+        return  # the engine is still thinking, or the game is over
+    clear_hints()
+    sym = session.to_move
+    view.mark(x, y, sym, "red")  # For cross
+
+    prepared = ponderer.take((x, y))
 
-    for _ in range(gSize):
-        button = Button(frame, bg = "yellow", height=1, width=2, text=" ", padx=2, pady=2)
-        button.config(command=lambda btn=button: on_click(btn))
-        button.pack(side=LEFT)
-        buttons_in_frame.append(button)
+    #check human player victory:
+    if session.play((x, y)) == gBoard.k:
+        result.set("You win :)")
+        disable_game(session.state())
+        return
 
-    buttons.append(buttons_in_frame)
+    result.set("O Turn!")
 
-def on_click(button):
+    state2 = session.state()
+    if prepared is not None:
+        print(ponderer.report())
+        if isinstance(prepared, tuple) and session.legal(prepared):
+            engine_moved(state2, prepared)  # pondered on this reply: answer at once
+            return
+    start_engine(state2, prepared if isinstance(prepared, MCTS) else None)
+
+
+def engine_player(choice):
     """
-    This function determines the action of any button.
+    Return the player function for a menu choice; None for MonteCarlo.
     """
-    global gBoard, choices, count, sym, result, x_pos, o_pos
-    #print("onClick: button.text=", button['text'])
-    if count % 2 == 0:
-        sym = "X"
+    if "Random" in choice:
+        return random_player
+    elif "MinMax" in choice:
+        return minmax_player
+    elif "AlphaBeta" in choice:
+        return alpha_beta_player
+    return None
+
+
+def start_engine(state, search=None):
+    """
+    Compute the engine move for state in a background thread, so the window stays
+    responsive. poll_engine() picks the move up on the Tk thread. search is an MCTS
+    tree kept from pondering, if there is one.
+    """
+    global worker, mcSearch, searchStart
+    choice = choices.get()
+    player = engine_player(choice)
+    if player is None:
+        mcSearch = search or MCTS(gBoard, state)
     else:
-        sym = "O"
-    count += 1
+        mcSearch = None
+    gBoard.deadline = None
+    searchStart = time.perf_counter()
+
+    def run(game=gameId, search=mcSearch):
+        move = None
+        try:
+            if(len(state.moves) > 0):
+                if search is not None:
+                    # time already spent on this subtree while pondering counts towards the limit
+                    move = search.monteCarloPlayer(max(0.0, 4 - search.pondered))
+                else:
+                    move = player(gBoard, state)
+        finally:
+            workerResult.put((game, state, move))
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    root.after(50, poll_engine)
+
+
+def poll_engine():
+    """
+    Runs on the Tk thread: show the search progress, or play the engine move once it is ready.
+    """
+    global worker, mcSearch
+    try:
+        game, state2, move = workerResult.get_nowait()
+    except queue.Empty:
+        elapsed = time.perf_counter() - searchStart
+        if mcSearch is not None:
+            progress.set("thinking {:.1f}s, iterations: {}".format(elapsed, mcSearch.iterations))
+        else:
+            progress.set("thinking {:.1f}s, depth: {}".format(elapsed, max(gBoard.d, 0)))
+        root.after(50, poll_engine)
+        return
 
-    button.config(text=sym, state='disabled', disabledforeground="red")  # For cross
+    worker = mcSearch = None
+    gBoard.deadline = None  # drop a stop() that came after the search had ended
+    progress.set("")
+    if game != gameId:
+        return  # the board was reset while the engine was thinking
+    engine_moved(state2, move)
 
-    x, y = get_coordinates(button)
-    x += 1
-    y += 1
-    x_pos.append((x, y))
-    state1 = gen_state((x, y), to_move=sym, x_positions=x_pos,  o_positions=o_pos, h=gBoard.k, v=gBoard.k)
 
-    #check human player victory:
-    if gBoard.compute_utility(state1.board.copy(), (x, y), state1.to_move)==gBoard.k:
-        result.set("You win :)")
-        disable_game(state1)
+def engine_moved(state2, move):
+    """
+    Play the engine move on the board and check for the end of the game.
+    """
+    if move is None or not session.legal(move):
+        disable_game(state2)
+        result.set("It is a draw")
         return
 
-    result.set("O Turn!")
-    Tk.update(root)
-    time.sleep(0.5)
+    a, b = move
+    sym = session.to_move
+    view.mark(a, b, sym, "black")
 
-    if count % 2 == 0:  # Used again, will become handy when user is given the choice of turn.
-        sym = "X"
-    else:
-        sym = "O"
-    count += 1
-    state2 = gen_state((x, y), to_move=sym, x_positions=x_pos, o_positions=o_pos, h=gBoard.k, v=gBoard.k)
-    a = b = None
-    #try:
-    if(len(state2.moves) > 0):
-        choice = choices.get()
-        if "Random" in choice:
-            a, b = random_player(gBoard, state2)
-        elif "MinMax" in choice:
-            a, b = minmax_player(gBoard, state2)
-        elif "AlphaBeta" in choice:
-            a, b = alpha_beta_player(gBoard, state2)
-        elif "MonteCarlo" in choice:
-            mcSearch = MCTS(gBoard, state2)
-            a, b = mcSearch.monteCarloPlayer()
-
-    if a == None or b == None:
-        disable_game(state2)
+    if session.play(move) == -gBoard.k:
+        result.set("You lose :(")
+        disable_game(session.state())
+    elif session.over():
+        disable_game(session.state())
         result.set("It is a draw")
+    else:
+        result.set("Your Turn!")
+        start_pondering()
+        start_hints()
+
+
+def start_pondering():
+    """
+    Keep the engine searching on the human's likely replies while they think.
+    """
+    choice = choices.get()
+    if not ponderOn.get() or "Random" in choice:
         return
-    
-    if 1 <= a <= gSize and 1 <= b <= gSize:
-        o_pos.append((a, b))
-        button_to_change = get_button(a - 1, b - 1)
-
-        board = state2.board.copy()
-        move = (a, b)
-        board[move] = sym
-        button_to_change.config(text=sym, state='disabled', disabledforeground="black")
-
-        if gBoard.compute_utility(board, move, sym) == -gBoard.k:
-            result.set("You lose :(")
-            disable_game(state2)
-        elif len(board) == gBoard.maxDepth:
-            disable_game(state2)
-            result.set("It is a draw")
-        else:
-            result.set("Your Turn!")
+    ponderer.start(gBoard, session.state(), engine_player(choice))
+
+
+def start_hints():
+    """
+    With Hints on, rank the human's best moves in a background thread and show them
+    on the board: 1 for the best, with the scores in the progress line.
+    """
+    clear_hints()
+    if not hintOn.get() or worker is not None or session.over():
+        return
+    state = session.state()
+    engine = 'mcts' if "MonteCarlo" in choices.get() else 'alphabeta'
+
+    def run(ticket=hintId):
+        hintResult.put((ticket, analyze(gBoard, state, HINT_LINES, engine, HINT_SECONDS)))
+
+    threading.Thread(target=run, daemon=True).start()
+    root.after(100, poll_hints)
+
+
+def poll_hints():
+    """
+    Runs on the Tk thread: draw the hints once they are ready, unless the position changed.
+    """
+    try:
+        ticket, lines = hintResult.get_nowait()
+    except queue.Empty:
+        root.after(100, poll_hints)
+        return
+    if ticket != hintId or worker is not None:
+        return
+    for rank, line in enumerate(lines, 1):
+        view.hint(line.move[0], line.move[1], str(rank))
+    progress.set("hints: " + ", ".join("{} {}".format(line.move, round(line.score, 2)) for line in lines))
+
+
+def clear_hints():
+    """
+    Remove the hints from the board and drop any that are still being computed.
+    """
+    global hintId
+    hintId += 1
+    if view is not None:
+        view.clear_hints()
+    if progress is not None and progress.get().startswith("hints"):
+        progress.set("")
 
 
-def get_coordinates(button):
+def undo_move():
     """
-    This function returns the coordinates of the button clicked.
+    Take back the engine's last move and the human move before it.
     """
-    for x in range(len(buttons)):
-        for y in range(len(buttons[x])):
-            if buttons[x][y] == button:
-                return x, y
+    if worker is not None:
+        return
+    ponderer.stop()
+    for _ in range(2 if session.to_move == 'X' else 1):
+        move = session.undo()
+        if move is None:
+            break
+        view.clear(*move)
+    view.enable()
+    result.set("Your Turn!")
+    start_hints()
+
 
-def get_button(x, y):
+def stop_search():
     """
-    This function returns the button location corresponding to a coordinate.
+    Stop the running engine search; it plays the best move found so far.
     """
-    return buttons[x][y]
+    if worker is not None:
+        gBoard.stop()
+        if mcSearch is not None:
+            mcSearch.stop()
 
 
 def reset_game():
     """
     This function will reset all the tiles to the initial null value.
     """
-    global gBoard, x_pos, o_pos, frames, count
+    global gBoard, gameId
 
-    count = 0
-    x_pos = []
-    o_pos = []
+    stop_search()
+    ponderer.stop()
+    gameId += 1
     result.set("Your Turn!")
-    for x in frames:
-        for y in x.winfo_children():
-            y.config(text=" ", state='normal')
-    
+    clear_hints()
+    view.reset()
     gBoard.reset()
+    session.reset()
+    start_hints()
 
 
 def disable_game(st):
@@ -217,10 +360,10 @@ def disable_game(st):
     """
     global gBoard
     gBoard.display(st)
-    global frames
-    for x in frames:
-        for y in x.winfo_children():
-            y.config(state='disabled')
+    view.disable()
+    if records is not None:
+        records.write(gBoard.size, gBoard.k, session.played, session.winner())
+        records.flush()
 
 
 def exit_game(root):
@@ -231,19 +374,40 @@ def exit_game(root):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) == 2:
-        gSize = int(sys.argv[1])
-        gSize =  int(sys.argv[1])
-        gkmatch = int(sys.argv[1])
+    # usage: tic-tac-toe.py [size] [--canvas] [--trace FILE [--profile]] [--record FILE] [--cache DIR]
+    args = sys.argv[1:]
+    useCanvas = "--canvas" in args
+    if "--trace" in args:
+        # every engine move appends its search trace to FILE; --profile adds cProfile and tracemalloc
+        i = args.index("--trace")
+        trace = SearchTrace(args[i + 1], profile="--profile" in args, memory="--profile" in args)
+        del args[i:i + 2]
+    if "--record" in args:
+        # every finished game is appended to FILE in the gameRecord format
+        i = args.index("--record")
+        records = RecordWriter(args[i + 1], append=True)
+        del args[i:i + 2]
+    if "--cache" in args:
+        # alpha-beta results are kept in DIR, so positions solved in earlier sessions are played at once
+        i = args.index("--cache")
+        searchCache = SearchCache(args[i + 1])
+        del args[i:i + 2]
+    args = [a for a in args if a not in ("--canvas", "--profile")]
+    if len(args) == 1:
+        gSize = int(args[0])
+        gkmatch = int(args[0])
     else:
-        gSize = 3
         gSize = 3
         gkmatch = 3
 
     root = Tk()
     root.title("TicTacToe")
-    width = gSize * 80
-    height = gSize * 80
+    if useCanvas:
+        width = gSize * max(16, min(40, 760 // gSize))
+        height = width + 160
+    else:
+        width = gSize * 80
+        height = gSize * 80
     geoStr = str(width) + "x" + str(height)
     root.geometry(geoStr)  
     root.resizable(1, 1)  # To remove the maximize window option
@@ -251,6 +415,8 @@ if __name__ == "__main__":
     result.set("Your Turn!")
     w = Label(root, textvariable=result, fg = "brown")
     w.pack(side=BOTTOM)
+    progress = StringVar()
+    Label(root, textvariable=progress, fg="gray").pack(side=BOTTOM)
     create_frames(root)
     choices = StringVar(root)
     choices.set("Random")
@@ -0,0 +1,90 @@
+"""Time control: budget per-move search time across a whole game"""
+
+import math
+import time
+
+
+class TimeManager:
+    """Split a total game budget plus a per-move increment into per-move search times.
+
+    Set it as game.clock and the players ask it for time instead of using the
+    flat game.timer. For every move start() computes two budgets:
+    - soft: the time we aim to spend. It is the remaining time shared over the
+      moves we still expect to play, scaled by the game phase (openings are
+      cheap, the middle game is where the result is decided) and by the
+      branching factor compared with an empty board.
+    - hard: an absolute limit, at most a fixed fraction of what is left, which
+      the search enforces through game.deadline.
+    Between units of work (a deepening iteration, a batch of MCTS playouts) the
+    player calls check(best): a best move that stays the same lets the search
+    stop before the soft budget, one that keeps changing extends it towards the
+    hard limit. Since every move uses at most maxFraction of the remaining
+    time, the total for the game stays within total plus the increments."""
+
+    def __init__(self, total, increment=0.0, minimum=0.01, maxFraction=0.3, growth=2.0):
+        self.remaining = float(total)
+        self.increment = float(increment)
+        self.minimum = minimum
+        self.maxFraction = maxFraction
+        self.growth = growth  # expected cost ratio of the next deepening iteration to the last one
+        self.moves = 0
+        self.soft = self.hard = 0.0
+        self.started = self.lastCheck = None
+        self.best = None
+        self.stable = 0
+
+    def phase_factor(self, game, state):
+        """Weight of a move by how far the game has gone: low in the opening, high in the middle."""
+        cells = game.size * game.size
+        filled = (cells - len(state.moves)) / cells
+        return 0.5 + math.sin(math.pi * min(1.0, filled * 1.5))
+
+    def branching_factor(self, game, state):
+        """Weight of a move by its branching factor, relative to an average position."""
+        cells = game.size * game.size
+        return max(0.5, min(1.5, math.sqrt(2 * len(state.moves) / cells)))
+
+    def expected_moves(self, game, state):
+        """Number of our moves still expected in the game, including this one."""
+        return max(1, math.ceil(len(state.moves) / 2))
+
+    def start(self, game, state):
+        """Start the clock for a move; return the absolute hard deadline."""
+        available = max(self.minimum, self.remaining + self.increment)
+        share = available / self.expected_moves(game, state)
+        self.soft = share * self.phase_factor(game, state) * self.branching_factor(game, state)
+        self.hard = max(self.minimum, available * self.maxFraction)
+        self.soft = max(self.minimum, min(self.soft, self.hard))
+        self.started = self.lastCheck = time.perf_counter()
+        self.best = None
+        self.stable = 0
+        return self.started + self.hard
+
+    def check(self, best, predicted=None):
+        """Report the current best move after a unit of work; return True to keep searching.
+        predicted is the expected duration of the next unit, by default growth times the last one."""
+        now = time.perf_counter()
+        if predicted is None:
+            predicted = (now - self.lastCheck) * self.growth
+        self.lastCheck = now
+        if best == self.best:
+            self.stable += 1
+        else:
+            self.best = best
+            self.stable = 0
+        # an unstable best move is worth more time, a settled one less
+        target = self.soft * (1.5 if self.stable == 0 else 1.0 if self.stable == 1 else 0.6)
+        target = min(target, self.hard)
+        return now - self.started + predicted < target
+
+    def stop(self):
+        """Stop the clock for the move; return the time it used."""
+        used = time.perf_counter() - self.started
+        self.remaining += self.increment - used
+        self.moves += 1
+        self.started = None
+        return used
+
+    def __repr__(self):
+        return '<TimeManager remaining={:.2f}s increment={}s moves={}>'.format(
+            self.remaining, self.increment, self.moves)
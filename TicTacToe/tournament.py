@@ -0,0 +1,189 @@
+"""Self-play tournaments between engines over a process pool, with Elo and speed reports
+
+    python tournament.py --engines alphabeta mcts random --games 20 \
+        --grid 3:3:0.5 4:4:1 --workers 4 --seed 1 --out results.jsonl
+
+Every pair of engines plays --games games on every size:k:timer entry of
+the grid, alternating who plays X. Each game gets its own seed derived from
+--seed and its position in the schedule, so a run can be repeated. Results,
+with a stats.SearchStats summary per side, stream to the JSONL file as games
+finish; at the end the report gives, per grid entry, the Elo difference of
+every pairing and every engine's Elo performance against the field (both
+with 95% confidence intervals; n/a where there are fewer than MIN_GAMES
+games or the score is perfect), its average time per move and its nodes per
+second. --records also writes every game's moves and move times to a
+gameRecord file, in the order the games finish."""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from gameRecord import RecordWriter
+from games import TicTacToe
+from players import PLAYERS, close_engines
+from stats import SearchStats
+
+
+def schedule(engines, grid, games, seed):
+    """Yield one job per game, in a fixed order."""
+    index = 0
+    for size, k, timer in grid:
+        for a, b in itertools.combinations(engines, 2):
+            for i in range(games):
+                x, o = (a, b) if i % 2 == 0 else (b, a)
+                yield {'index': index, 'size': size, 'k': k, 'timer': timer,
+                       'x': x, 'o': o, 'seed': seed * 1000003 + index}
+                index += 1
+
+
+def play_one(job):
+    """Play the game described by job and return its result record."""
+    random.seed(job['seed'])
+    game = TicTacToe(job['size'], job['k'], job['timer'])
+    names = {'X': job['x'], 'O': job['o']}
+    used = {'X': [0, 0.0, 0], 'O': [0, 0.0, 0]}  # moves, seconds, nodes
+    stats = {'X': SearchStats(), 'O': SearchStats()}
+    state = game.initial
+    forfeit = None
+    moves, times = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not game.terminal_test(state):
+            side = state.to_move
+            game.nodes = 0
+            game.stats = stats[side]
+            start = time.perf_counter()
+            move = PLAYERS[names[side]](game, state)
+            seconds = time.perf_counter() - start
+            used[side][0] += 1
+            used[side][1] += seconds
+            used[side][2] += game.nodes
+            if move not in state.moves:
+                forfeit = side
+                break
+            moves.append(move)
+            times.append(seconds)
+            state = game.result(state, move)
+    if forfeit:
+        winner = 'O' if forfeit == 'X' else 'X'
+    else:
+        winner = 'X' if state.utility > 0 else 'O' if state.utility < 0 else None
+    record = dict(job, winner=winner, plies=len(state.board), forfeit=forfeit, moves=moves, times=times)
+    for side in 'XO':
+        moves, seconds, nodes = used[side]
+        record[side.lower() + 'Moves'] = moves
+        record[side.lower() + 'Time'] = seconds
+        record[side.lower() + 'Nodes'] = nodes
+        record[side.lower() + 'Stats'] = stats[side].summary()
+    return record
+
+
+MIN_GAMES = 5  # fewer games than this get no rating at all
+
+
+def elo(scores):
+    """Return (Elo difference, low, high) for a list of per-game scores in [0, 1],
+    with a 95% confidence interval from the normal approximation. The difference
+    is None when it is infinite (all wins or all losses), and the interval is then
+    the exact binomial bound; all three are None for fewer than MIN_GAMES games."""
+    n = len(scores)
+    if n < MIN_GAMES:
+        return None, None, None
+    mean = sum(scores) / n
+
+    def to_elo(s):
+        if s <= 0 or s >= 1:
+            return math.copysign(math.inf, s - 0.5)
+        return 400 * math.log10(s / (1 - s))
+
+    if mean in (0.0, 1.0):
+        bound = 0.025 ** (1 / n)  # the score at which n straight wins happen 2.5% of the time
+        return (None, to_elo(bound), math.inf) if mean == 1.0 else (None, -math.inf, to_elo(1 - bound))
+    var = sum((s - mean) ** 2 for s in scores) / n
+    se = math.sqrt(var / n)
+    return to_elo(mean), to_elo(mean - 1.96 * se), to_elo(mean + 1.96 * se)
+
+
+def format_elo(d, lo, hi):
+    if lo is None:
+        return '{:>7}'.format('n/a').ljust(25)
+    return '{:>7} [{:+.1f}, {:+.1f}]'.format('n/a' if d is None else '{:+.1f}'.format(d), lo, hi).ljust(25)
+
+
+def report(records, out=sys.stdout):
+    """Print the pairing, rating and speed tables, one block per grid entry."""
+    configs = sorted({(r['size'], r['k'], r['timer']) for r in records})
+    for config in configs:
+        games = [r for r in records if (r['size'], r['k'], r['timer']) == config]
+        print('size {} k {} timer {}: {} games'.format(*config, len(games)), file=out)
+        pairs = {}
+        field = {}
+        speed = {}
+        for r in games:
+            score = 1.0 if r['winner'] == 'X' else 0.0 if r['winner'] == 'O' else 0.5
+            for name, other, s in ((r['x'], r['o'], score), (r['o'], r['x'], 1 - score)):
+                field.setdefault(name, []).append(s)
+                if name < other:
+                    pairs.setdefault((name, other), []).append(s)
+            for side, name in (('x', r['x']), ('o', r['o'])):
+                moves, seconds, nodes = speed.get(name, (0, 0.0, 0))
+                speed[name] = (moves + r[side + 'Moves'], seconds + r[side + 'Time'], nodes + r[side + 'Nodes'])
+        for (a, b), scores in sorted(pairs.items()):
+            d, lo, hi = elo(scores)
+            wins, draws = scores.count(1.0), scores.count(0.5)
+            print('  {:>10} vs {:<10} +{} ={} -{}  Elo {}'.format(
+                a, b, wins, draws, len(scores) - wins - draws, format_elo(d, lo, hi).rstrip()), file=out)
+        for name in sorted(field):
+            d, lo, hi = elo(field[name])
+            moves, seconds, nodes = speed[name]
+            print('  {:>10}: score {:.3f}  Elo vs field {}  '
+                  '{:.4f}s/move  {:.0f} nodes/s'.format(
+                      name, sum(field[name]) / len(field[name]), format_elo(d, lo, hi),
+                      seconds / moves if moves else 0.0, nodes / seconds if seconds else 0.0), file=out)
+
+
+def grid_entry(text):
+    """Parse size:k:timer, e.g. 4:3:0.5."""
+    size, k, timer = text.split(':')
+    return int(size), int(k), float(timer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Self-play tournament between engines.')
+    parser.add_argument('--engines', nargs='+', default=['alphabeta', 'mcts', 'random'], choices=sorted(PLAYERS))
+    parser.add_argument('--grid', nargs='+', type=grid_entry, default=[(3, 3, 0.5)], help='size:k:timer entries')
+    parser.add_argument('--games', type=int, default=10, help='games per pairing and grid entry')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='tournament.jsonl', help='JSONL file the results stream to')
+    parser.add_argument('--records', help='gameRecord file for the moves of every game')
+    args = parser.parse_args(argv)
+
+    jobs = list(schedule(args.engines, args.grid, args.games, args.seed))
+    records = []
+    start = time.perf_counter()
+    try:
+        with open(args.out, 'w') as out, Pool(args.workers) as pool, \
+                RecordWriter(args.records) if args.records else contextlib.nullcontext() as games:
+            for record in pool.imap_unordered(play_one, jobs):
+                moves, times = record.pop('moves'), record.pop('times')
+                if games is not None:
+                    games.write(record['size'], record['k'], moves, record['winner'], times=times)
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+                records.append(record)
+    finally:
+        close_engines()  # the workers search in-process; this releases any engine started here
+    elapsed = time.perf_counter() - start
+    print('{} games in {:.1f}s ({:.2f} games/s)'.format(len(records), elapsed, len(records) / elapsed))
+    report(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,42 @@
 import bisect
 import collections
 import collections.abc
+import contextlib
 import functools
 import heapq
+import importlib
 import operator
 import os.path
 import random
+import sys
+import weakref
 from itertools import chain, combinations
-from statistics import mean
 
-import numpy as np
+
+class LazyModule:
+    """Stand in for a module and import it on first attribute access, so that
+    importing utils does not pay for NumPy or statistics unless they are used."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return '<LazyModule {}{}>'.format(self._name, '' if self._module is None else ', loaded')
+
+
+np = LazyModule('numpy')
+statistics = LazyModule('statistics')
+
+
+def mean(data):
+    """statistics.mean, imported on first use."""
+    return statistics.mean(data)
 
 
 # ______________________________________________________________________________
@@ -405,10 +432,10 @@ class injection:
         globals().update(self.old)
 
 
-def memoize(fn, slot=None, maxsize=32):
+def memoize(fn, slot=None, maxsize=1024, key=None, policy='lru'):
     """Memoize fn: make it remember the computed value for any argument list.
     If slot is specified, store result in that slot of first argument.
-    If slot is false, use lru_cache for caching the values."""
+    If slot is false, keep the values in a Cache of maxsize entries; see cached()."""
     if slot:
         def memoized_fn(obj, *args):
             if hasattr(obj, slot):
@@ -418,13 +445,189 @@ def memoize(fn, slot=None, maxsize=32):
                 setattr(obj, slot, val)
                 return val
     else:
-        @functools.lru_cache(maxsize=maxsize)
-        def memoized_fn(*args):
-            return fn(*args)
+        memoized_fn = cached(maxsize, key=key, policy=policy)(fn)
 
     return memoized_fn
 
 
+# ______________________________________________________________________________
+# Bounded caches
+
+
+_caches = weakref.WeakSet()  # every live Cache, for clear_caches()
+_MISSING = object()
+
+
+class Cache:
+    """A bounded mapping that evicts entries by policy and counts its hits, misses and evictions.
+    maxsize bounds the number of entries and maxbytes their approximate size
+    (sys.getsizeof of keys and values, not of what they refer to); either may be
+    None. policy is 'lru' (least recently used goes first), 'lfu' (least
+    frequently used, the older of equals first) or 'clock' (a cheaper LRU
+    approximation: entries used since the hand last passed get a second chance)."""
+
+    def __init__(self, maxsize=1024, maxbytes=None, policy='lru'):
+        if policy not in ('lru', 'lfu', 'clock'):
+            raise ValueError("Policy must be 'lru', 'lfu' or 'clock'.")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.policy = policy
+        self.clear()
+        _caches.add(self)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self.data = collections.OrderedDict() if self.policy == 'lru' else {}
+        self.sizes = {}  # key -> approximate bytes, with maxbytes
+        self.nbytes = 0
+        self.counts = {}  # lfu: key -> uses
+        self.buckets = collections.defaultdict(collections.OrderedDict)  # lfu: uses -> keys, oldest first
+        self.ring = collections.deque()  # clock: keys in hand order
+        self.referenced = set()  # clock: keys used since the hand passed them
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the value for key, counting a hit, or default, counting a miss."""
+        value = self.data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.touch(key)
+        return value
+
+    def touch(self, key):
+        if self.policy == 'lru':
+            self.data.move_to_end(key)
+        elif self.policy == 'clock':
+            self.referenced.add(key)
+        else:
+            count = self.counts[key]
+            del self.buckets[count][key]
+            if not self.buckets[count]:
+                del self.buckets[count]
+            self.counts[key] = count + 1
+            self.buckets[count + 1][key] = None
+
+    def put(self, key, value):
+        """Store value for key, evicting other entries as needed to stay within bounds."""
+        if key in self.data:
+            self.data[key] = value
+            self.touch(key)
+        else:
+            self.data[key] = value
+            if self.policy == 'lfu':
+                self.counts[key] = 1
+                self.buckets[1][key] = None
+            elif self.policy == 'clock':
+                self.ring.append(key)
+        if self.maxbytes is not None:
+            self.nbytes -= self.sizes.get(key, 0)
+            self.sizes[key] = sys.getsizeof(key) + sys.getsizeof(value)
+            self.nbytes += self.sizes[key]
+        while self.data and ((self.maxsize is not None and len(self.data) > self.maxsize) or
+                             (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+            self.evict()
+
+    def evict(self):
+        """Remove the entry the policy picks."""
+        if self.policy == 'lru':
+            key = next(iter(self.data))
+        elif self.policy == 'clock':
+            ring, referenced = self.ring, self.referenced
+            while ring[0] in referenced:
+                referenced.discard(ring[0])
+                ring.rotate(-1)
+            key = ring.popleft()
+        else:
+            count = min(self.buckets)
+            key = next(iter(self.buckets[count]))
+            del self.buckets[count][key]
+            if not self.buckets[count]:
+                del self.buckets[count]
+            del self.counts[key]
+        del self.data[key]
+        self.nbytes -= self.sizes.pop(key, 0)
+        self.evictions += 1
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def info(self):
+        """The counters and the current size, as a dict."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hitRate': self.hit_rate, 'size': len(self.data), 'bytes': self.nbytes,
+                'maxsize': self.maxsize, 'maxbytes': self.maxbytes, 'policy': self.policy}
+
+    def __repr__(self):
+        return '<Cache {} {} entries, {} hits, {} misses, {} evictions>'.format(
+            self.policy, len(self.data), self.hits, self.misses, self.evictions)
+
+
+def cached(maxsize=1024, maxbytes=None, policy='lru', key=None):
+    """Decorator: memoize a function in a Cache(maxsize, maxbytes, policy).
+    key(*args, **kwargs) gives the cache key; by default the arguments are the key,
+    so they must be hashable. For states with dict boards, key can be e.g.
+    lambda game, state: (state.to_move, freeze(state.board)).
+    The function gets .cache, .cache_info() and .cache_clear()."""
+    def decorator(fn):
+        cache = Cache(maxsize, maxbytes, policy)
+
+        @functools.wraps(fn)
+        def cached_fn(*args, **kwargs):
+            if key is not None:
+                k = key(*args, **kwargs)
+            else:
+                k = (args, frozenset(kwargs.items())) if kwargs else args
+            value = cache.get(k, _MISSING)
+            if value is _MISSING:
+                value = fn(*args, **kwargs)
+                cache.put(k, value)
+            return value
+
+        cached_fn.cache = cache
+        cached_fn.cache_info = cache.info
+        cached_fn.cache_clear = cache.clear
+        return cached_fn
+
+    return decorator
+
+
+def freeze(x):
+    """Return a hashable copy of x: dicts and sets become frozensets, lists and tuples tuples."""
+    if isinstance(x, dict):
+        return frozenset((k, freeze(v)) for k, v in x.items())
+    if isinstance(x, (set, frozenset)):
+        return frozenset(freeze(v) for v in x)
+    if isinstance(x, (list, tuple)):
+        return tuple(freeze(v) for v in x)
+    return x
+
+
+def clear_caches(*caches):
+    """Clear the given caches (Cache objects or functions made by cached()), or every cache."""
+    for cache in caches or list(_caches):
+        getattr(cache, 'cache', cache).clear()
+
+
+@contextlib.contextmanager
+def cache_scope(*caches):
+    """Clear the caches (default: all of them) when the block ends, e.g. around one game:
+        with cache_scope(): play_game()"""
+    try:
+        yield
+    finally:
+        clear_caches(*caches)
+
+
 def name(obj):
     """Try to find some reasonable name for the object."""
     return (getattr(obj, 'name', 0) or getattr(obj, '__name__', 0) or
@@ -714,9 +917,9 @@ class hashabledict(dict):
 
 
 # ______________________________________________________________________________
-# Queues: Stack, FIFOQueue, PriorityQueue
+# Queues: Stack, FIFOQueue, PriorityQueue, IndexedPriorityQueue
 # Stack and FIFOQueue are implemented as list and collection.deque
-# PriorityQueue is implemented here
+# PriorityQueue and IndexedPriorityQueue are implemented here
 
 
 class PriorityQueue:
@@ -777,6 +980,144 @@ class PriorityQueue:
         heapq.heapify(self.heap)
 
 
+class IndexedPriorityQueue:
+    """A PriorityQueue with a position map from each item to its place in the heap,
+    for best-first searches that change priorities as they go.
+    Membership is O(1); append, pop, update and deletion are O(log n); items
+    given to the constructor are heapified in O(n). Items must be hashable and
+    each is held once: appending an item equal to one already queued replaces
+    it and its priority. Items with equal priority come out in no set order."""
+
+    def __init__(self, order='min', f=lambda x: x, items=()):
+        if order == 'min':
+            self.f = f
+        elif order == 'max':  # now item with max f(x)
+            self.f = lambda x: -f(x)  # will be popped first
+        else:
+            raise ValueError("Order must be either 'min' or 'max'.")
+        self.heap = []
+        self.position = {}
+        for item in items:
+            if item in self.position:
+                self.heap[self.position.pop(item)] = None
+            self.position[item] = len(self.heap)
+            self.heap.append((self.f(item), item))
+        if len(self.position) < len(self.heap):
+            self.heap = [entry for entry in self.heap if entry is not None]
+            self.position = {item: i for i, (_, item) in enumerate(self.heap)}
+        for i in reversed(range(len(self.heap) // 2)):
+            self._sift_down(i)
+
+    def _sift_up(self, i):
+        heap, position = self.heap, self.position
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            above = heap[parent]
+            if not entry[0] < above[0]:
+                break
+            heap[i] = above
+            position[above[1]] = i
+            i = parent
+        heap[i] = entry
+        position[entry[1]] = i
+
+    def _sift_down(self, i):
+        heap, position = self.heap, self.position
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if not heap[child][0] < entry[0]:
+                break
+            heap[i] = heap[child]
+            position[heap[i][1]] = i
+            i = child
+        heap[i] = entry
+        position[entry[1]] = i
+
+    def append(self, item):
+        """Insert item at its correct position, or move it there if it is already queued."""
+        i = self.position.pop(item, None)
+        if i is None:
+            self.heap.append((self.f(item), item))
+            self._sift_up(len(self.heap) - 1)
+            return
+        self.heap[i] = (self.f(item), item)
+        self._sift_up(i)
+        self._sift_down(self.position[item])
+
+    def extend(self, items):
+        """Insert each item in items at its correct position."""
+        for item in items:
+            self.append(item)
+
+    def update(self, item):
+        """Recompute the priority of a queued item, e.g. after its f value changed."""
+        if item not in self.position:
+            raise KeyError(str(item) + " is not in the priority queue")
+        self.append(item)
+
+    def pop(self):
+        """Pop and return the item (with min or max f(x) value)
+        depending on the order."""
+        heap = self.heap
+        if not heap:
+            raise Exception('Trying to pop from empty PriorityQueue.')
+        item = heap[0][1]
+        del self.position[item]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            self._sift_down(0)
+        return item
+
+    def peek(self):
+        """Return the item pop() would return, leaving it queued."""
+        if not self.heap:
+            raise Exception('Trying to peek into empty PriorityQueue.')
+        return self.heap[0][1]
+
+    def _remove(self, i):
+        heap = self.heap
+        entry = heap[i]
+        del self.position[entry[1]]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self._sift_up(i)
+            self._sift_down(self.position[last[1]])
+        return entry
+
+    def __len__(self):
+        """Return current capacity of PriorityQueue."""
+        return len(self.heap)
+
+    def __contains__(self, key):
+        """Return True if the key is in PriorityQueue."""
+        return key in self.position
+
+    def __getitem__(self, key):
+        """Returns the value associated with key in PriorityQueue.
+        Raises KeyError if key is not present."""
+        try:
+            return self.heap[self.position[key]][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+
+    def __delitem__(self, key):
+        """Delete key."""
+        try:
+            i = self.position[key]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+        self._remove(i)
+
+
 # ______________________________________________________________________________
 # Useful Shorthands
 
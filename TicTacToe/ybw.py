@@ -0,0 +1,196 @@
+"""Young Brothers Wait root split: alpha_beta_cutoff with the root moves spread over a process pool
+
+    python ybw.py --sizes 4 5 --depth 3 --workers 2 4
+
+RootSplit.search(game, state) is a drop-in for alpha_beta_cutoff(game, state)
+and returns the same move. The first root move (the eldest brother) is
+searched here, which gives the bound the younger brothers wait for; they then
+go to the pool in root order, at most one per worker at a time. Each is
+searched with alpha set to the best exact value among the earlier moves that
+have returned, so a later move can start with a tighter bound than the
+moves still running before it.
+
+The move is picked by walking the results in root order with the serial
+rule, value > alpha. A move searched with a lower alpha than the serial
+search would have had returns either its exact value, when that is above
+its alpha, or a value no greater than its alpha, which the serial search
+would not have picked either, so ties resolve exactly as in the serial
+search. Only the root is split. Workers evaluate with eval1, so when
+game.evaluator is set the search stays serial. So does ybw_player inside a
+pool worker (games.in_worker_process); elsewhere it keeps its pools until
+close_splitters(), which the service and tournament call when they end.
+
+Run as a script, it times serial and split searches on the benchmark
+positions and checks that they agree."""
+
+import argparse
+import atexit
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from games import (GameState, SearchTimeout, TicTacToe, alpha_beta_cutoff, cutoff_searchers, in_worker_process,
+                   iterative_deepening)
+
+_games = {}
+
+
+def brother_value(size, k, state, player, alpha, depth, seconds):
+    """Run in a worker: the min_value of alpha_beta_cutoff for the root child state,
+    valued for the root player; return (value, nodes). seconds (None: no limit)
+    bounds the search, which raises SearchTimeout past it."""
+    if (size, k) not in _games:
+        _games[(size, k)] = TicTacToe(size, k)
+    game = _games[(size, k)]
+    game.deadline = None if seconds is None else time.perf_counter() + seconds
+    pos = game.position(state)
+    try:
+        _, min_value = cutoff_searchers(game, pos, player)
+        return min_value(pos, alpha, math.inf, depth), pos.nodes
+    finally:
+        game.deadline = None
+
+
+def snapshot(pos):
+    return GameState(to_move=pos.to_move, move=pos.move, utility=pos.utility,
+                     board=dict(pos.board), moves=list(pos.moves))
+
+
+class RootSplit:
+    """A process pool searching root moves for alpha_beta_cutoff; close() shuts it down."""
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.pool = ProcessPoolExecutor(self.workers)
+
+    def search(self, game, state):
+        state = game.position(state)
+        actions = list(game.moveOrder(state) if game.moveOrder else game.actions(state))
+        if game.evaluator is not None or len(actions) < 2:
+            return alpha_beta_cutoff(game, state)
+        player = state.to_move
+        _, min_value = cutoff_searchers(game, state)
+
+        # the eldest brother, searched serially
+        state.make(actions[0])
+        values = [min_value(state, -math.inf, math.inf, game.d)]
+        state.unmake()
+        exact = [True]
+        values += [None] * (len(actions) - 1)
+        exact += [False] * (len(actions) - 1)
+
+        def bound(i):
+            """The best exact value among the moves before i."""
+            return max((values[j] for j in range(i) if exact[j]), default=-math.inf)
+
+        running = {}
+        alphas = {}
+        following = 1
+        try:
+            while following < len(actions) or running:
+                while following < len(actions) and len(running) < self.workers:
+                    i = following
+                    following += 1
+                    seconds = None
+                    if game.deadline is not None:
+                        seconds = game.deadline - time.perf_counter()
+                        if seconds <= 0:
+                            raise SearchTimeout
+                    state.make(actions[i])
+                    child = snapshot(state)
+                    state.unmake()
+                    alphas[i] = bound(i)
+                    running[self.pool.submit(brother_value, game.size, game.k, child, player,
+                                             alphas[i], game.d, seconds)] = i
+                timeout = None if game.deadline is None else max(0.0, game.deadline - time.perf_counter())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise SearchTimeout
+                for future in done:
+                    i = running.pop(future)
+                    value, nodes = future.result()  # re-raises a worker's SearchTimeout
+                    values[i] = value
+                    exact[i] = value > alphas[i]
+                    state.nodes += nodes
+        except SearchTimeout:
+            for future in running:
+                future.cancel()
+            raise
+
+        alpha = -math.inf
+        best_action = None
+        for action, value in zip(actions, values):
+            if value > alpha:
+                alpha = value
+                best_action = action
+        return best_action
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+_splitters = {}
+
+
+def ybw_player(game, state):
+    """Iterative deepening over RootSplit.search, with game.workers processes (None: one per core);
+    inside a pool worker, over the serial alpha_beta_cutoff."""
+    if in_worker_process():
+        search = alpha_beta_cutoff
+    else:
+        workers = game.workers or os.cpu_count() or 1
+        if workers not in _splitters:
+            _splitters[workers] = RootSplit(workers)
+        search = _splitters[workers].search
+    pos = game.position(state)
+    if game.stats is not None:
+        game.stats.begin('ybw', pos)
+    move = iterative_deepening(game, pos, search)
+    game.nodes = pos.nodes
+    print("root split depth: ", game.d)
+    if game.stats is not None:
+        game.stats.finish(move, pos)
+    game.d = 0
+    return move
+
+
+@atexit.register
+def close_splitters():
+    """Shut down the pools of the ybw_player splitters."""
+    for splitter in _splitters.values():
+        splitter.close()
+    _splitters.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Speedup of the root split over serial alpha_beta_cutoff.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[4, 5])
+    parser.add_argument('--depth', type=int, default=2, help='alpha_beta_cutoff depth (game.d)')
+    parser.add_argument('--workers', nargs='+', type=int, default=[2, 4])
+    parser.add_argument('--positions', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    import bench  # the benchmark positions; not needed to search
+    for size in args.sizes:
+        game = TicTacToe(size, bench.K[size])
+        game.d = args.depth
+        states = bench.make_positions(game, max(2, size * size // 3), args.positions, 2024 + size)
+        start = time.perf_counter()
+        serial = [alpha_beta_cutoff(game, s) for s in states]
+        serialTime = time.perf_counter() - start
+        print('{0}x{0} k{1} d={2}: serial {3:.3f}s'.format(size, game.k, args.depth, serialTime))
+        for workers in args.workers:
+            splitter = RootSplit(workers)
+            splitter.search(game, states[0])  # start the workers before timing
+            start = time.perf_counter()
+            split = [splitter.search(game, s) for s in states]
+            elapsed = time.perf_counter() - start
+            splitter.close()
+            print('  {} workers: {:.3f}s, speedup {:.2f}x, {}'.format(
+                workers, elapsed, serialTime / elapsed, 'same moves' if split == serial else 'MOVES DIFFER'))
+    print('({} cores here)'.format(os.cpu_count()))
+
+
+if __name__ == "__main__":
+    main()